@@ -9,6 +9,7 @@ from .models import (
     LoanProduct,
     MortgageLoanOption,
     CreditLoanOption,
+    TermRate,
 )
 from .serializers import (
     FinancialProductSerializer,
@@ -19,11 +20,83 @@ from .serializers import (
     SavingProductDetailSerializer,
     LoanProductDetailSerializer,
 )
-from django.db.models import Q
+from .leaderboards import invalidate_leaderboards
+from .search import invalidate_search_index, search_products
+from .autocomplete import publish_changes
+from .calculator import invalidate_maturity_table
+from .repayment import invalidate_repayment_rankings
+from .credit_grades import invalidate_credit_grade_index
+from .recommender import invalidate_recommendations
+from .statistics import materialize_statistics
+from .queries import loan_queryset
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
 
-class AdminFinancialProductViewSet(viewsets.ModelViewSet):
+def sync_term_rate(detail):
+    """
+    Upsert the TermRate row of an edited deposit or saving detail row, so
+    term lists, leaderboards, the calculator and statistics show the edit
+    """
+    TermRate.objects.update_or_create(
+        product_id=detail.product_id,
+        save_trm=detail.save_trm,
+        intr_rate_type=detail.intr_rate_type,
+        rsrv_type=getattr(detail, "rsrv_type", ""),
+        defaults={
+            "category": detail.category,
+            "fin_co_no": detail.fin_co_no,
+            "dcls_month": detail.dcls_month,
+            "intr_rate": detail.intr_rate,
+            "intr_rate2": detail.intr_rate2,
+            "content_hash": "",
+        },
+    )
+
+
+class ProductCacheInvalidationMixin:
+    """
+    Drop the rate leaderboards, search indexes and in-memory rate tables and
+    take a new statistics snapshot after any admin edit
+
+    Edited rows lose their content hash, so the next refresh does not skip
+    them as unchanged. Deposit and saving edits are copied to TermRate,
+    which the term based views read instead of the detail rows.
+    """
+
+    def invalidate_caches(self):
+        invalidate_leaderboards()
+        invalidate_search_index()
+        publish_changes()
+        invalidate_maturity_table()
+        invalidate_repayment_rankings()
+        invalidate_credit_grade_index()
+        invalidate_recommendations()
+        materialize_statistics()
+
+    def save_edit(self, serializer):
+        # An edited row matches no upstream fingerprint, so the next refresh
+        # compares it in full and rewrites it
+        with transaction.atomic():
+            instance = serializer.save(content_hash="")
+            if isinstance(instance, (DepositProduct, SavingProduct)):
+                sync_term_rate(instance)
+        self.invalidate_caches()
+
+    def perform_create(self, serializer):
+        self.save_edit(serializer)
+
+    def perform_update(self, serializer):
+        self.save_edit(serializer)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        self.invalidate_caches()
+
+
+class AdminFinancialProductViewSet(
+    ProductCacheInvalidationMixin, viewsets.ModelViewSet
+):
     """
     ViewSet for administrators to manage financial products
     """
@@ -44,10 +117,12 @@ class AdminFinancialProductViewSet(viewsets.ModelViewSet):
 
         queryset = self.queryset
 
+        ranking = None
         if query:
-            queryset = queryset.filter(
-                Q(fin_prdt_nm__icontains=query) | Q(kor_co_nm__icontains=query)
-            )
+            ranking = {
+                code: rank for rank, (code, score) in enumerate(search_products(query))
+            }
+            queryset = queryset.filter(fin_prdt_cd__in=list(ranking))
 
         if category:
             if category.lower() == "deposit":
@@ -57,11 +132,17 @@ class AdminFinancialProductViewSet(viewsets.ModelViewSet):
             elif category.lower() == "loan":
                 queryset = queryset.filter(loan_product__isnull=False)
 
+        if ranking is not None:
+            # Best matches first
+            queryset = sorted(
+                queryset, key=lambda product: ranking[product.fin_prdt_cd]
+            )
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
 
-class AdminDepositProductViewSet(viewsets.ModelViewSet):
+class AdminDepositProductViewSet(ProductCacheInvalidationMixin, viewsets.ModelViewSet):
     queryset = DepositProduct.objects.all().select_related("product")
     permission_classes = [IsAdminUser]
 
@@ -71,7 +152,7 @@ class AdminDepositProductViewSet(viewsets.ModelViewSet):
         return DepositProductSerializer
 
 
-class AdminSavingProductViewSet(viewsets.ModelViewSet):
+class AdminSavingProductViewSet(ProductCacheInvalidationMixin, viewsets.ModelViewSet):
     queryset = SavingProduct.objects.all().select_related("product")
     permission_classes = [IsAdminUser]
 
@@ -81,8 +162,8 @@ class AdminSavingProductViewSet(viewsets.ModelViewSet):
         return SavingProductSerializer
 
 
-class AdminLoanProductViewSet(viewsets.ModelViewSet):
-    queryset = LoanProduct.objects.all().select_related("product")
+class AdminLoanProductViewSet(ProductCacheInvalidationMixin, viewsets.ModelViewSet):
+    queryset = loan_queryset()
     permission_classes = [IsAdminUser]
 
     def get_serializer_class(self):
@@ -0,0 +1,218 @@
+"""
+Language model backends of the AI recommendations
+
+A backend turns a system and a user prompt into text, whole or streamed.
+AI_BACKEND selects it: "openai" (default) calls the OpenAI API, "local"
+answers from the product tables of the prompt without any network, so the
+AI views can be load tested and benchmarked offline. A dotted path to a
+backend class is accepted as well.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import namedtuple
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+import openai  # Import the openai module directly for 0.28.0 version
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKENS = 1500
+
+TEMPERATURE = 0.7
+
+# text, model that wrote it, prompt tokens billed (None when not reported)
+Completion = namedtuple("Completion", ["text", "model", "prompt_tokens"])
+
+
+def get_api_key():
+    """
+    OpenAI API key from settings or the environment, empty when not set
+    """
+    return getattr(settings, "OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY", ""))
+
+
+def usage_prompt_tokens(response):
+    """
+    Prompt tokens billed for a response, None when OpenAI did not report it
+    """
+    try:
+        return response["usage"]["prompt_tokens"]
+    except (KeyError, TypeError):
+        return None
+
+
+class OpenAIBackend:
+    """
+    GPT-4o chat completions, text-davinci-003 when the chat call fails
+    """
+
+    name = "openai"
+    model = "gpt-4o"
+    fallback_model = "text-davinci-003"
+
+    def configure(self):
+        api_key = get_api_key()
+        if not api_key:
+            logger.error("OpenAI API key is not set")
+            raise ImproperlyConfigured(
+                "OpenAI API key is not configured. Please set the OPENAI_API_KEY."
+            )
+        # Set API key for OpenAI 0.28.0
+        openai.api_key = api_key
+
+    def messages(self, system, prompt):
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt},
+        ]
+
+    def complete(self, system, prompt):
+        self.configure()
+        try:
+            response = openai.ChatCompletion.create(
+                model=self.model,
+                messages=self.messages(system, prompt),
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+            )
+            return Completion(
+                response.choices[0].message["content"],
+                self.model,
+                usage_prompt_tokens(response),
+            )
+        except Exception as api_error:
+            logger.error(f"Error calling OpenAI API: {str(api_error)}")
+
+            try:
+                logger.info(f"Trying fallback to {self.fallback_model} model")
+                response = openai.Completion.create(
+                    model=self.fallback_model,
+                    prompt=f"{system}\n\n{prompt}",
+                    max_tokens=MAX_TOKENS,
+                    temperature=TEMPERATURE,
+                )
+                return Completion(
+                    response.choices[0].text.strip(),
+                    self.fallback_model,
+                    usage_prompt_tokens(response),
+                )
+            except Exception:
+                raise RuntimeError(
+                    f"Error calling OpenAI API (both main and fallback): {str(api_error)}"
+                )
+
+    def stream(self, system, prompt):
+        """
+        Text pieces as they arrive; closing the generator closes the response
+        """
+        self.configure()
+        response = openai.ChatCompletion.create(
+            model=self.model,
+            messages=self.messages(system, prompt),
+            max_tokens=MAX_TOKENS,
+            temperature=TEMPERATURE,
+            stream=True,
+        )
+        try:
+            for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+        finally:
+            close = getattr(response, "close", None)
+            if close is not None:
+                close()
+
+
+class LocalBackend:
+    """
+    Deterministic stand-in that recommends the first rows of every product
+    table of the prompt in the answer format the prompt asks for
+
+    AI_LOCAL_LATENCY seconds are spent before answering and spread over the
+    streamed pieces, to stand in for the model's time.
+    """
+
+    name = "local"
+    model = "local-template"
+
+    # Recommended rows of every product type, tables are ranked best first
+    PICKS = 2
+
+    HEADER = re.compile(r"^\[(?P<kind>[^\]]+)\] (?P<columns>.+)$")
+
+    def __init__(self):
+        self.latency = getattr(settings, "AI_LOCAL_LATENCY", 0)
+
+    def tables(self, prompt):
+        """
+        Rows of every product table in the prompt, as dicts per type
+        """
+        tables = {}
+        columns = None
+        for line in prompt.splitlines():
+            header = self.HEADER.match(line)
+            if header:
+                columns = header["columns"].split("|")
+                rows = tables.setdefault(header["kind"], [])
+            elif columns and "|" in line:
+                rows.append(dict(zip(columns, line.split("|"))))
+            else:
+                columns = None
+        return tables
+
+    def answer(self, prompt):
+        lines = []
+        for kind, rows in self.tables(prompt).items():
+            for row in rows[: self.PICKS]:
+                if kind == "대출":
+                    lines.append(
+                        f"- {row.get('name')} ({kind}) - 금리: {row.get('interest_rate_min')}%"
+                    )
+                    lines.append(f"- 추천 사유: {row.get('bank')}의 낮은 금리 상품")
+                else:
+                    lines.append(
+                        f"- {row.get('name')} ({kind}) - 금리: {row.get('interest_rate')}%, "
+                        f"기간: {row.get('period_months')}개월"
+                    )
+                    lines.append(f"- 추천 사유: {row.get('bank')}의 높은 금리 상품")
+                    if row.get("maturity_amount", "-") != "-":
+                        lines.append(f"- (환산 금액: {row['maturity_amount']}원)")
+                lines.append("")
+        return "\n".join(lines).strip() or "추천할 상품이 없습니다."
+
+    def complete(self, system, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        return Completion(self.answer(prompt), self.model, None)
+
+    def stream(self, system, prompt):
+        pieces = self.answer(prompt).splitlines(keepends=True)
+        for piece in pieces:
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            yield piece
+
+
+BACKENDS = {
+    "openai": OpenAIBackend,
+    "local": LocalBackend,
+}
+
+
+def get_backend():
+    """
+    Backend selected by the AI_BACKEND setting
+    """
+    name = getattr(settings, "AI_BACKEND", "openai")
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        try:
+            backend_class = import_string(name)
+        except ImportError:
+            raise ImproperlyConfigured(f"Unknown AI_BACKEND: {name}")
+    return backend_class()
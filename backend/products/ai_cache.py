@@ -0,0 +1,127 @@
+"""
+Response cache and request coalescing for AI recommendations
+
+A recommendation depends on the user's salary and money, the period, the
+product type and the candidate products sent in the prompt. The amounts
+are rounded to two significant digits before the prompt is built, so every
+request of a bucket sends the same prompt and can share the answer of the
+first one without seeing another user's figures. Answers are kept in a
+per-process LRU with a TTL, and identical requests arriving while an answer
+is generated wait for that one upstream call instead of starting their own.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from .singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Seconds an answer is reused
+AI_CACHE_TTL = getattr(settings, "AI_RECOMMENDATION_CACHE_TTL", 30 * 60)
+
+# Answers kept per process, the least recently used is evicted first
+AI_CACHE_SIZE = getattr(settings, "AI_RECOMMENDATION_CACHE_SIZE", 256)
+
+
+def bucket_amount(amount):
+    """
+    Round an amount in won to two significant digits
+    """
+    amount = int(amount or 0)
+    if amount <= 0:
+        return 0
+    digits = len(str(amount)) - 2
+    if digits <= 0:
+        return amount
+    return round(amount, -digits)
+
+
+def recommendation_key(salary, money, period, product_type, product_data):
+    """
+    Hash of everything an AI recommendation depends on
+
+    The amounts are the bucketed ones sent in the prompt. The candidate
+    products stand for the product data version: any refresh that changes
+    what the prompt lists changes the key.
+    """
+    payload = json.dumps(
+        [salary, money, period, product_type, product_data],
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class TTLCache:
+    """
+    Thread-safe LRU mapping whose entries expire after ttl seconds
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expires at, value)
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+recommendation_cache = TTLCache(AI_CACHE_SIZE, AI_CACHE_TTL)
+recommendation_flights = SingleFlight()
+
+
+def cached_recommendation(key, generate):
+    """
+    Answer of generate() for key, from the cache or shared with identical
+    requests in flight. Only successful answers are cached.
+    Returns the answer and how it was served: "hit", "shared" or "miss"
+    """
+    answer = recommendation_cache.get(key)
+    if answer is not None:
+        return answer, "hit"
+
+    def generate_and_store():
+        # A request that just finished may have stored it meanwhile
+        answer = recommendation_cache.get(key)
+        if answer is None:
+            started = time.time()
+            answer = generate()
+            logger.info(
+                f"Generated AI recommendation {key[:8]} in {time.time() - started:.2f} seconds"
+            )
+            if answer.get("status") == "success":
+                recommendation_cache.set(key, answer)
+        return answer
+
+    answer, shared = recommendation_flights.do(key, generate_and_store)
+    return answer, "shared" if shared else "miss"
@@ -0,0 +1,224 @@
+"""
+Background AI recommendation jobs
+
+A job request stores its inputs as an AIRecommendationJob row and returns
+at once; the OpenAI round trip runs on a thread pool of the process and
+the client polls the job for its result. Jobs are claimed with a
+conditional update, so a job runs once even when several processes try
+it, and because their state lives in the database, jobs left pending or
+running by a process that stopped are picked up again by the next pool
+that starts, or by the next poll of a job that waited too long.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from .ai_cache import cached_recommendation, recommendation_cache
+from .ai_services import get_ai_product_recommendations
+from .models import AIRecommendationJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which a running job is considered lost and run again
+JOB_TIMEOUT = getattr(settings, "AI_JOB_TIMEOUT", 5 * 60)
+
+# Seconds a job may stay pending before a poll submits it again
+PENDING_TIMEOUT = getattr(settings, "AI_JOB_PENDING_TIMEOUT", 30)
+
+# Runs of a job lost with its process before it is given up
+MAX_ATTEMPTS = 3
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def worker_count():
+    # 0 runs jobs inline, in the request that enqueued them
+    return getattr(settings, "AI_JOB_WORKERS", 4)
+
+
+def get_executor():
+    """
+    Thread pool of this process, recovering lost jobs when it starts
+    """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=worker_count(), thread_name_prefix="ai-job"
+                )
+                for job_id in recover_jobs():
+                    _executor.submit(run_job, job_id)
+    return _executor
+
+
+def submit(job_id):
+    if worker_count() <= 0:
+        run_job(job_id)
+    else:
+        get_executor().submit(run_job, job_id)
+
+
+def recover_jobs(job_ids=None):
+    """
+    Move jobs whose run was lost back to pending, return every pending job
+    Only the given jobs are considered when job_ids is set
+
+    A job lost MAX_ATTEMPTS times fails instead, it may be what stops its
+    workers.
+    """
+    jobs = AIRecommendationJob.objects.all()
+    if job_ids is not None:
+        jobs = jobs.filter(id__in=job_ids)
+    cutoff = timezone.now() - timedelta(seconds=JOB_TIMEOUT)
+    lost = jobs.filter(status=AIRecommendationJob.RUNNING, started_at__lt=cutoff)
+    lost.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status=AIRecommendationJob.ERROR,
+        result={"status": "error", "message": "AI recommendation job was lost"},
+        finished_at=timezone.now(),
+    )
+    lost = lost.update(status=AIRecommendationJob.PENDING)
+    job_ids = list(
+        jobs.filter(status=AIRecommendationJob.PENDING)
+        .order_by("created_at")
+        .values_list("id", flat=True)
+    )
+    if job_ids:
+        logger.info(f"Recovered {len(job_ids)} AI jobs ({lost} lost while running)")
+    return job_ids
+
+
+def resume_stalled_job(job):
+    """
+    Submit a job again when the process that had it may have stopped:
+    pending for PENDING_TIMEOUT or running for JOB_TIMEOUT seconds
+    Returns whether it was submitted
+    """
+    now = timezone.now()
+    if job.status == AIRecommendationJob.PENDING:
+        stalled = job.created_at < now - timedelta(seconds=PENDING_TIMEOUT)
+    elif job.status == AIRecommendationJob.RUNNING:
+        stalled = job.started_at < now - timedelta(seconds=JOB_TIMEOUT)
+    else:
+        stalled = False
+    # A job still queued here is only claimed once, but do not queue it
+    # again on every poll
+    if not stalled or not cache.add(
+        f"products:ai-job:resumed:{job.id}", True, PENDING_TIMEOUT
+    ):
+        return False
+
+    resumed = recover_jobs([job.id])
+    for job_id in resumed:
+        logger.info(f"Resuming stalled AI job {job_id}")
+        submit(job_id)
+    return bool(resumed)
+
+
+def enqueue_recommendation(user, key, inputs):
+    """
+    Job for a user's recommendation, reusing the user's unfinished job for
+    the same prompt. A cached answer completes the job at once, otherwise it
+    is submitted once the transaction commits.
+    """
+    answer = recommendation_cache.get(key)
+    if answer is not None:
+        now = timezone.now()
+        return AIRecommendationJob.objects.create(
+            user=user,
+            key=key,
+            inputs=inputs,
+            status=AIRecommendationJob.SUCCESS,
+            result={**answer, "cache": "hit"},
+            started_at=now,
+            finished_at=now,
+        )
+
+    job = (
+        AIRecommendationJob.objects.filter(
+            user=user,
+            key=key,
+            status__in=[AIRecommendationJob.PENDING, AIRecommendationJob.RUNNING],
+        )
+        .order_by("-created_at")
+        .first()
+    )
+    if job is not None:
+        return job
+
+    job = AIRecommendationJob.objects.create(user=user, key=key, inputs=inputs)
+    transaction.on_commit(lambda: submit(job.id))
+    return job
+
+
+def claim(job_id):
+    """
+    Mark a pending job running, False when another worker has it
+    """
+    return bool(
+        AIRecommendationJob.objects.filter(
+            id=job_id, status=AIRecommendationJob.PENDING
+        ).update(
+            status=AIRecommendationJob.RUNNING,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+    )
+
+
+def run_job(job_id):
+    """
+    Generate the recommendation of a job and store it, shared with identical
+    requests through the recommendation cache
+    """
+    try:
+        if not claim(job_id):
+            return
+        job = AIRecommendationJob.objects.get(id=job_id)
+        inputs = job.inputs
+        try:
+            answer, served = cached_recommendation(
+                job.key,
+                lambda: get_ai_product_recommendations(
+                    inputs["salary"],
+                    inputs["money"],
+                    inputs["period"],
+                    inputs["product_data"],
+                ),
+            )
+        except Exception as e:
+            logger.error(f"AI job {job_id} failed: {str(e)}")
+            answer, served = {"status": "error", "message": str(e)}, "miss"
+
+        if answer.get("status") == "success":
+            status = AIRecommendationJob.SUCCESS
+        else:
+            status = AIRecommendationJob.ERROR
+        # Only while this attempt still holds the job, a stalled worker must
+        # not overwrite a run that was requeued and claimed again
+        finished = AIRecommendationJob.objects.filter(
+            id=job_id, status=AIRecommendationJob.RUNNING, attempts=job.attempts
+        ).update(
+            status=status,
+            result={**answer, "cache": served},
+            finished_at=timezone.now(),
+        )
+        if not finished:
+            logger.warning(
+                f"AI job {job_id} was requeued during attempt {job.attempts}, "
+                f"its result is dropped"
+            )
+            return
+        logger.info(f"AI job {job_id} finished: {status} ({served})")
+    finally:
+        # Pool threads open their own connection, do not leak it
+        if threading.current_thread().name.startswith("ai-job"):
+            connection.close()
@@ -0,0 +1,225 @@
+"""
+Compact product tables and token budgeting for AI recommendation prompts
+
+Candidates are ranked and deduplicated locally before the prompt is built:
+one row per product, deposits and savings by their maturity amount (or
+rate), loans by their lowest rate. Each product type is encoded as one
+header line and a pipe-separated row per product, with free-text fields
+cut short, instead of indented JSON. The prompt size is estimated before
+it is sent and the lowest ranked rows are dropped until it fits the token
+budget. Size and latency of every call are kept for the admin metrics.
+"""
+
+import logging
+import math
+import threading
+from collections import deque
+from django.conf import settings
+from .statistics import percentile
+
+logger = logging.getLogger(__name__)
+
+# Estimated tokens a prompt may use, the answer has its own max_tokens
+PROMPT_TOKEN_BUDGET = getattr(settings, "AI_PROMPT_TOKEN_BUDGET", 2000)
+
+# Calls kept for the metrics summary
+METRICS_WINDOW = getattr(settings, "AI_METRICS_WINDOW", 500)
+
+# Characters kept of free-text fields such as join_member
+TEXT_LIMIT = 20
+
+# Rows kept of every product type however small the budget
+MIN_ROWS_PER_TYPE = 1
+
+# Encoded columns per product type, in order
+COLUMNS = {
+    "예금": [
+        "name",
+        "bank",
+        "interest_rate",
+        "period_months",
+        "interest_rate_type",
+        "maturity_amount",
+        "join_member",
+    ],
+    "적금": [
+        "name",
+        "bank",
+        "interest_rate",
+        "period_months",
+        "interest_rate_type",
+        "savings_type",
+        "maturity_amount",
+        "join_member",
+    ],
+    "대출": [
+        "name",
+        "bank",
+        "loan_type",
+        "interest_rate_min",
+        "interest_rate_max",
+        "mortgage_type",
+        "credit_product_type",
+        "repayment_type",
+        "join_member",
+    ],
+}
+
+TEXT_FIELDS = {"join_member"}
+
+
+def estimate_tokens(text):
+    """
+    Token count of text for GPT-4o class tokenizers, rounded up
+
+    ASCII runs average about four characters per token, Hangul and other
+    characters count as one token each.
+    """
+    ascii_chars = sum(1 for char in text if char < "\x80")
+    return math.ceil(ascii_chars / 4) + len(text) - ascii_chars
+
+
+def rank_candidates(product_data, period=None):
+    """
+    Candidates per product type, best first and one row per product
+
+    A product listed for several terms keeps the term closest to period,
+    then the best rate.
+    """
+
+    def preference(item):
+        distance = abs(item.get("period_months", 0) - period) if period else 0
+        if item["type"] == "대출":
+            return (distance, item.get("interest_rate_min") or math.inf)
+        return (distance, -(item.get("interest_rate") or 0))
+
+    best = {}
+    for item in product_data:
+        key = (item["type"], item["bank"], item["name"])
+        if key not in best or preference(item) < preference(best[key]):
+            best[key] = item
+
+    ranked = {kind: [] for kind in COLUMNS}
+    for item in best.values():
+        ranked.setdefault(item["type"], []).append(item)
+    for kind, items in ranked.items():
+        if kind == "대출":
+            items.sort(key=lambda item: item.get("interest_rate_min") or math.inf)
+        else:
+            items.sort(
+                key=lambda item: (
+                    -(item.get("maturity_amount") or 0),
+                    -(item.get("interest_rate") or 0),
+                )
+            )
+    return {kind: items for kind, items in ranked.items() if items}
+
+
+def encode_value(field, value):
+    if value is None or value == "":
+        return "-"
+    text = " ".join(str(value).split()).replace("|", "/")
+    if field in TEXT_FIELDS and len(text) > TEXT_LIMIT:
+        text = text[: TEXT_LIMIT - 1] + "…"
+    return text
+
+
+def encode_row(kind, item):
+    return "|".join(encode_value(field, item.get(field)) for field in COLUMNS[kind])
+
+
+def encode_header(kind):
+    return f"[{kind}] " + "|".join(COLUMNS[kind])
+
+
+def encode_tables(ranked):
+    """
+    Header and rows of every product type
+    """
+    lines = []
+    for kind, items in ranked.items():
+        lines.append(encode_header(kind))
+        lines.extend(encode_row(kind, item) for item in items)
+    return "\n".join(lines)
+
+
+def fit_to_budget(ranked, fixed_tokens, budget=PROMPT_TOKEN_BUDGET):
+    """
+    Drop the lowest ranked rows, from the type with the most rows first,
+    until the estimated prompt fits the budget
+
+    Returns the kept rows per type and the number of dropped rows.
+    """
+    row_tokens = {
+        kind: [estimate_tokens(encode_row(kind, item)) + 1 for item in items]
+        for kind, items in ranked.items()
+    }
+    total = fixed_tokens + sum(
+        estimate_tokens(encode_header(kind)) + 1 + sum(tokens)
+        for kind, tokens in row_tokens.items()
+    )
+    kept = {kind: len(items) for kind, items in ranked.items()}
+    dropped = 0
+    while total > budget:
+        kind = max(kept, key=kept.get)
+        if kept[kind] <= MIN_ROWS_PER_TYPE:
+            break
+        kept[kind] -= 1
+        total -= row_tokens[kind][kept[kind]]
+        dropped += 1
+    return {kind: ranked[kind][: kept[kind]] for kind in ranked}, dropped
+
+
+class CallMetrics:
+    """
+    Prompt size and latency of the latest AI calls of this process
+    """
+
+    def __init__(self, size):
+        self.calls = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def record(self, **call):
+        with self.lock:
+            self.calls.append(call)
+        logger.info(
+            f"AI call {call.get('mode')} ({call.get('backend')}): {call.get('status')} in {call.get('latency', 0):.2f} seconds, "
+            f"prompt {call.get('prompt_chars')} chars ~{call.get('prompt_tokens')} tokens, "
+            f"{call.get('products')} products ({call.get('dropped')} dropped)"
+        )
+
+    def clear(self):
+        with self.lock:
+            self.calls.clear()
+
+    def summary(self):
+        """
+        Counts and latency and prompt size percentiles of the kept calls
+        """
+        with self.lock:
+            calls = list(self.calls)
+        summary = {
+            "calls": len(calls),
+            "errors": sum(1 for call in calls if call.get("status") == "error"),
+            "cancelled": sum(1 for call in calls if call.get("status") == "cancelled"),
+        }
+        for field in [
+            "latency",
+            "first_token_latency",
+            "prompt_tokens",
+            "usage_prompt_tokens",
+        ]:
+            values = sorted(
+                call[field] for call in calls if call.get(field) is not None
+            )
+            if values:
+                summary[field] = {
+                    "avg": round(sum(values) / len(values), 3),
+                    "p50": round(percentile(values, 50), 3),
+                    "p95": round(percentile(values, 95), 3),
+                    "max": values[-1],
+                }
+        return summary
+
+
+call_metrics = CallMetrics(METRICS_WINDOW)
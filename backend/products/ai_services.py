@@ -3,49 +3,51 @@ AI services for product recommendations
 """
 
 import logging
-from django.conf import settings
-import json
-import os
 import traceback
-import openai  # Import the openai module directly for 0.28.0 version
+import time
+from django.core.exceptions import ImproperlyConfigured
+from .ai_backends import get_backend
+from .ai_prompts import (
+    PROMPT_TOKEN_BUDGET,
+    call_metrics,
+    encode_tables,
+    estimate_tokens,
+    fit_to_budget,
+    rank_candidates,
+)
 
 logger = logging.getLogger(__name__)
 
 
-def get_ai_product_recommendations(user_salary, user_money, period, product_data):
-    """
-    Get AI-driven financial product recommendations using OpenAI
+SYSTEM_PROMPT = "당신은 재무설계에 전문적인 금융 조언가입니다."
 
-    Args:
-        user_salary (int): User's monthly salary (원)
-        user_money (int): User's current possession (원)
-        period (int): Desired investment/loan period in months
-        product_data (list): List of financial product data for consideration
 
-    Returns:
-        dict: AI recommendations with reasoning
+def build_recommendation_prompt(
+    user_salary, user_money, period, product_data, budget=PROMPT_TOKEN_BUDGET
+):
     """
-    try:
-        # Get API key from settings or environment variable
-        api_key = getattr(
-            settings, "OPENAI_API_KEY", os.environ.get("OPENAI_API_KEY", "")
-        )
-
-        if not api_key:
-            logger.error("OpenAI API key is not set")
-            return {
-                "status": "error",
-                "message": "OpenAI API key is not configured. Please set the OPENAI_API_KEY.",
-            }
-
-        # Set API key for OpenAI 0.28.0
-        openai.api_key = api_key
+    User prompt of a recommendation request and its size
 
-        # Format product data for the prompt
-        product_data_str = json.dumps(product_data, ensure_ascii=False, indent=2)
-
-        # Generate prompt for OpenAI
-        prompt = f"""
+    Products are ranked, deduplicated and encoded as compact tables, trimmed
+    to the token budget.
+    """
+    ranked = rank_candidates(product_data, period)
+    fixed_tokens = estimate_tokens(
+        recommendation_prompt(user_salary, user_money, period, "")
+    )
+    kept, dropped = fit_to_budget(ranked, fixed_tokens, budget)
+    prompt = recommendation_prompt(user_salary, user_money, period, encode_tables(kept))
+    return prompt, {
+        "products": sum(len(items) for items in kept.values()),
+        "dropped": dropped,
+        "prompt_chars": len(prompt),
+        "prompt_tokens": estimate_tokens(prompt),
+    }
+
+
+def recommendation_prompt(user_salary, user_money, period, product_tables):
+    # Generate prompt for OpenAI
+    prompt = f"""
 당신은 금융 전문가이며, 사용자의 상황에 맞는 금융 상품을 추천해주는 AI입니다.
 
 사용자 정보:
@@ -53,8 +55,8 @@ def get_ai_product_recommendations(user_salary, user_money, period, product_data
 - 현재 자산: {user_money}원
 - 원하는 기간(개월 수): {period}개월
 
-금융 상품 데이터:
-{product_data_str}
+금융 상품 데이터 (상품 유형별 표, 첫 줄은 열 이름, 값은 |로 구분, -는 정보 없음):
+{product_tables}
 
 상품 종류는 예금, 적금, 대출이 있습니다.
 
@@ -62,7 +64,7 @@ def get_ai_product_recommendations(user_salary, user_money, period, product_data
 1. 사용자의 연봉과 자산 정보가 있을 경우:
     - 해당 조건과 비슷한 재무 상황을 가진 사람이 선호할 만한 상품을 추천하세요.
     - 기간에 맞는 상품 중 이자율이 높은 예·적금, 낮은 금리의 대출 상품을 우선 추천합니다.
-    - 또한 사용자의 자산을 이용하여 예·적금 상품 가입 시 얻을 수 있는 금액을 환산하여 주세요.
+    - 예·적금 상품의 환산 금액은 직접 계산하지 말고 상품 데이터의 maturity_amount(세후 만기 수령액, 적금은 자산을 기간 동안 매월 나누어 납입한 경우)를 그대로 사용하세요.
 
 2. 사용자의 연봉 및 자산 정보가 없는 경우:
     - 예금/적금은 가장 높은 금리,
@@ -73,51 +75,93 @@ def get_ai_product_recommendations(user_salary, user_money, period, product_data
 - 추천 사유: [간단한 이유]
 - (환산 금액: X.X원)
 """
+    return prompt
 
-        try:
-            # Call OpenAI API with GPT-4o model using OpenAI 0.28.0 API format
-            response = openai.ChatCompletion.create(
-                model="gpt-4o",  # Using GPT-4o model for advanced financial analysis
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "당신은 재무설계에 전문적인 금융 조언가입니다.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=1500,
-                temperature=0.7,
-            )
 
-            # Extract content from response - OpenAI 0.28.0 format
-            recommendation_text = response.choices[0].message["content"]
+def get_ai_product_recommendations(user_salary, user_money, period, product_data):
+    """
+    Get AI-driven financial product recommendations from the AI backend
+
+    Args:
+        user_salary (int): User's monthly salary (원)
+        user_money (int): User's current possession (원)
+        period (int): Desired investment/loan period in months
+        product_data (list): List of financial product data for consideration
 
-            # Return the AI-generated recommendations
-            return {"status": "success", "recommendations": recommendation_text}
+    Returns:
+        dict: AI recommendations with reasoning
+    """
+    try:
+        backend = get_backend()
+        prompt, prompt_info = build_recommendation_prompt(
+            user_salary, user_money, period, product_data
+        )
+        started = time.time()
 
+        try:
+            completion = backend.complete(SYSTEM_PROMPT, prompt)
+        except ImproperlyConfigured as e:
+            return {"status": "error", "message": str(e)}
         except Exception as api_error:
-            logger.error(f"Error calling OpenAI API: {str(api_error)}")
-            error_details = traceback.format_exc()
-            logger.error(f"API error details: {error_details}")
-
-            # Try fallback to simpler model
-            try:
-                logger.info("Trying fallback to text-davinci-003 model")
-                response = openai.Completion.create(
-                    model="text-davinci-003",
-                    prompt=f"당신은 재무설계에 전문적인 금융 조언가입니다.\n\n{prompt}",
-                    max_tokens=1500,
-                    temperature=0.7,
-                )
-                recommendation_text = response.choices[0].text.strip()
-                return {"status": "success", "recommendations": recommendation_text}
-            except Exception as fallback_error:
-                return {
-                    "status": "error",
-                    "message": f"Error calling OpenAI API (both main and fallback): {str(api_error)}",
-                }
+            call_metrics.record(
+                mode="complete",
+                backend=backend.name,
+                status="error",
+                latency=time.time() - started,
+                **prompt_info,
+            )
+            return {"status": "error", "message": str(api_error)}
+
+        call_metrics.record(
+            mode="complete",
+            backend=backend.name,
+            model=completion.model,
+            status="success",
+            latency=time.time() - started,
+            usage_prompt_tokens=completion.prompt_tokens,
+            **prompt_info,
+        )
+        return {"status": "success", "recommendations": completion.text}
 
     except Exception as e:
         error_details = traceback.format_exc()
         logger.error(f"Error getting AI recommendations: {str(e)}\n{error_details}")
         return {"status": "error", "message": f"AI recommendation failed: {str(e)}"}
+
+
+def stream_ai_product_recommendations(user_salary, user_money, period, product_data):
+    """
+    Yield the text of an AI recommendation piece by piece as the backend
+    streams it
+
+    Closing the generator (the client went away) closes the backend stream,
+    so the model stops generating tokens nobody will read.
+    """
+    backend = get_backend()
+    prompt, prompt_info = build_recommendation_prompt(
+        user_salary, user_money, period, product_data
+    )
+    started = time.time()
+    first_token = None
+    outcome = "error"
+
+    pieces = backend.stream(SYSTEM_PROMPT, prompt)
+    try:
+        for piece in pieces:
+            if first_token is None:
+                first_token = time.time() - started
+            yield piece
+        outcome = "success"
+    except GeneratorExit:
+        outcome = "cancelled"
+        raise
+    finally:
+        pieces.close()
+        call_metrics.record(
+            mode="stream",
+            backend=backend.name,
+            status=outcome,
+            latency=time.time() - started,
+            first_token_latency=first_token,
+            **prompt_info,
+        )
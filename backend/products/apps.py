@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        # Connect the products_refreshed receivers
+        from . import (  # noqa: F401
+            autocomplete,
+            calculator,
+            credit_grades,
+            recommender,
+            repayment,
+            search,
+        )
@@ -0,0 +1,215 @@
+"""
+Typeahead suggestions for product and institution names
+
+Every word start of a name is kept, normalized and in choseong form, in a
+sorted array searched with bisect. A refresh publishes the codes it
+changed next to a new version in the database; a process holding the
+previous version only re-reads those products, any other process
+rebuilds the whole array.
+"""
+
+import copy
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from django.dispatch import receiver
+from .models import FinancialProduct
+from .search import normalize, to_choseong, has_choseong
+from .signals import products_refreshed
+from .versioning import bump_version, get_published
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:autocomplete"
+
+# Larger refreshes make every process rebuild instead of replaying codes
+MAX_CHANGED_CODES = 1000
+
+
+def word_keys(label):
+    """
+    Normalized and choseong keys of every word start of a label
+    """
+    words = (label or "").split()
+    keys = set()
+    for start in range(len(words)):
+        key = normalize("".join(words[start:]))
+        if key:
+            keys.add(key)
+            keys.add(to_choseong(key))
+    return keys
+
+
+class AutocompleteIndex:
+    """
+    Sorted (key, type, id, label) entries of product and institution names
+    """
+
+    def __init__(self, products, version=None):
+        self.version = version
+        self.entries = []
+        self.product_entries = {}
+        self.institution_entries = {}
+        self.institution_codes = {}
+        for product in products:
+            self.add(product)
+        self.entries.sort()
+
+    def entries_of(self, kind, id, label):
+        return [(key, kind, id, label) for key in word_keys(label)]
+
+    def insert(self, entries, keep_sorted):
+        for entry in entries:
+            if keep_sorted:
+                insort(self.entries, entry)
+            else:
+                self.entries.append(entry)
+
+    def delete(self, entries):
+        for entry in entries:
+            position = bisect_left(self.entries, entry)
+            if position < len(self.entries) and self.entries[position] == entry:
+                del self.entries[position]
+
+    def add(self, product, keep_sorted=False):
+        code = product["fin_prdt_cd"]
+        institution = product["kor_co_nm"]
+        entries = self.entries_of("product", code, product["fin_prdt_nm"])
+        self.product_entries[code] = (institution, entries)
+        self.insert(entries, keep_sorted)
+
+        # One set of institution entries, kept while it has products
+        if institution:
+            codes = self.institution_codes.setdefault(institution, set())
+            if not codes:
+                institution_entries = self.entries_of(
+                    "institution", institution, institution
+                )
+                self.institution_entries[institution] = institution_entries
+                self.insert(institution_entries, keep_sorted)
+            codes.add(code)
+
+    def remove(self, code):
+        institution, entries = self.product_entries.pop(code, (None, []))
+        self.delete(entries)
+
+        codes = self.institution_codes.get(institution)
+        if codes is not None:
+            codes.discard(code)
+            if not codes:
+                del self.institution_codes[institution]
+                self.delete(self.institution_entries.pop(institution))
+
+    def update(self, products, codes):
+        """
+        Replace the entries of codes by those of products (missing = deleted)
+        """
+        for code in codes:
+            self.remove(code)
+        for product in products:
+            self.add(product, keep_sorted=True)
+
+    def updated(self, products, codes, version):
+        """
+        Copy of the index with the entries of codes replaced, so that
+        readers of this index are not disturbed
+        """
+        index = copy.copy(self)
+        index.version = version
+        index.entries = list(self.entries)
+        index.product_entries = dict(self.product_entries)
+        index.institution_entries = dict(self.institution_entries)
+        index.institution_codes = {
+            institution: set(codes)
+            for institution, codes in self.institution_codes.items()
+        }
+        index.update(products, codes)
+        return index
+
+    def suggest(self, query, limit=10):
+        """
+        Distinct (type, id, label) entries whose key starts with query
+        """
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        if has_choseong(prefix):
+            prefix = to_choseong(prefix)
+
+        suggestions = []
+        seen = set()
+        position = bisect_left(self.entries, (prefix,))
+        while position < len(self.entries) and len(suggestions) < limit:
+            key, kind, id, label = self.entries[position]
+            if not key.startswith(prefix):
+                break
+            if (kind, id) not in seen:
+                seen.add((kind, id))
+                suggestions.append({"type": kind, "id": id, "label": label})
+            position += 1
+        return suggestions
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def read_products(codes=None):
+    products = FinancialProduct.objects.values(
+        "fin_prdt_cd", "fin_prdt_nm", "kor_co_nm"
+    )
+    if codes is not None:
+        products = products.filter(fin_prdt_cd__in=codes)
+    return products
+
+
+def publish_changes(codes=None):
+    """
+    Publish a new version listing the product codes that changed
+    Without codes (or too many) every process rebuilds its whole index
+    """
+    if codes is None or len(codes) > MAX_CHANGED_CODES:
+        changed = None
+    else:
+        changed = list(codes)
+    bump_version(VERSION_KEY, changed=changed)
+
+
+def get_autocomplete_index():
+    """
+    Index of this process, brought up to the published version
+    """
+    global _index
+
+    version, previous, changed = get_published(VERSION_KEY)
+
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            if (
+                _index is not None
+                and _index.version == previous
+                and changed is not None
+            ):
+                _index = _index.updated(read_products(changed), changed, version)
+            else:
+                build_start = time.time()
+                _index = AutocompleteIndex(read_products(), version)
+                logger.info(
+                    f"Built autocomplete index of {len(_index.entries)} keys in {time.time() - build_start:.3f} seconds"
+                )
+        return _index
+
+
+def suggest(query, limit=10):
+    return get_autocomplete_index().suggest(query, limit)
+
+
+@receiver(products_refreshed)
+def refresh_autocomplete_index(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        publish_changes(sorted(change_set.changed_products))
@@ -0,0 +1,225 @@
+"""
+Vectorized maturity calculator for deposits and savings
+
+Every TermRate row (one per product, term, rate type and reserve type) is
+kept in NumPy arrays, so the after-tax payout of the whole catalogue for a
+principal or a monthly installment is computed in one pass. Deposits earn
+on the principal for the whole term; savings earn on each monthly
+installment from its payment to maturity. Simple (S) and monthly compound
+(M) interest follow the finlife calculator; free (F) reserve savings are
+computed on the same monthly plan as fixed (S) ones.
+"""
+
+import logging
+import time
+import numpy as np
+from django.dispatch import receiver
+from .models import TermRate
+from .queries import SAVING_CATEGORY
+from .signals import products_refreshed
+from .versioning import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:calculator"
+
+# 이자소득세 14% + 지방소득세 1.4%, 세금우대 9.5%, 비과세
+TAX_RATES = {"normal": 0.154, "preferential": 0.095, "free": 0.0}
+
+COMPOUND_RATE_TYPE = "M"
+
+
+def interest(is_saving, terms, compound, rates, principal, installment):
+    """
+    Gross interest of every row
+
+    rates are annual percentages, terms months. Deposit rows earn on
+    principal, saving rows on installment paid every month.
+    """
+    terms = np.asarray(terms, dtype=float)
+    monthly = np.asarray(rates, dtype=float) / 1200
+    growth = np.power(1 + monthly, terms)
+
+    deposit_simple = principal * monthly * terms
+    deposit_compound = principal * (growth - 1)
+
+    saving_simple = installment * monthly * terms * (terms + 1) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        saving_compound = np.where(
+            monthly > 0,
+            installment * ((1 + monthly) * (growth - 1) / monthly - terms),
+            0.0,
+        )
+
+    return np.where(
+        is_saving,
+        np.where(compound, saving_compound, saving_simple),
+        np.where(compound, deposit_compound, deposit_simple),
+    )
+
+
+def payouts(is_saving, terms, compound, rates, principal, installment, tax_rate):
+    """
+    (paid in, interest after tax, tax, payout at maturity) arrays in won
+    """
+    terms = np.asarray(terms)
+    paid = np.where(is_saving, installment * terms, principal).astype(np.int64)
+    gross = np.floor(
+        interest(is_saving, terms, compound, rates, principal, installment)
+    )
+    tax = np.floor(gross * tax_rate)
+    net = (gross - tax).astype(np.int64)
+    return paid, net, tax.astype(np.int64), paid + net
+
+
+def add_maturity_amounts(product_data, money, tax_rate=TAX_RATES["normal"]):
+    """
+    Set the after-tax maturity_amount of the deposits and savings of an AI
+    prompt's product data in one pass, so the model does not compute it
+
+    Deposits take money as principal, savings spread it over their term as
+    equal monthly installments.
+    """
+    items = [item for item in product_data if item["type"] in ("예금", "적금")]
+    if not items or money <= 0:
+        return product_data
+
+    is_saving = np.array([item["type"] == "적금" for item in items], dtype=bool)
+    terms = np.array([max(item["period_months"], 1) for item in items])
+    _, _, _, payout = payouts(
+        is_saving,
+        terms,
+        np.array([item["interest_rate_type"] == COMPOUND_RATE_TYPE for item in items]),
+        np.array([item["interest_rate"] for item in items], dtype=float),
+        money,
+        money // terms,
+        tax_rate,
+    )
+    for item, amount in zip(items, payout):
+        item["maturity_amount"] = int(amount)
+    return product_data
+
+
+class MaturityTable:
+    """
+    Term options of every deposit and saving as parallel arrays
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        rows = list(rows)
+        column = lambda name: [row[name] for row in rows]
+
+        self.codes = column("product_id")
+        self.names = column("product__fin_prdt_nm")
+        self.companies = column("product__kor_co_nm")
+        self.rate_types = column("intr_rate_type")
+        self.rsrv_types = column("rsrv_type")
+        self.is_saving = np.array(
+            [category == SAVING_CATEGORY for category in column("category")],
+            dtype=bool,
+        )
+        self.terms = np.array(column("save_trm"), dtype=np.int64)
+        self.compound = np.array(
+            [rate_type == COMPOUND_RATE_TYPE for rate_type in self.rate_types],
+            dtype=bool,
+        )
+        self.rates = np.array(column("intr_rate"), dtype=float)
+        self.max_rates = np.array(column("intr_rate2"), dtype=float)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def rank(
+        self,
+        principal=0,
+        installment=0,
+        term=None,
+        saving=None,
+        use_max_rate=True,
+        tax_rate=TAX_RATES["normal"],
+        limit=20,
+    ):
+        """
+        Rows with the highest payouts, computed for the whole table at once
+
+        saving selects savings (True), deposits (False) or both (None).
+        """
+        rates = self.max_rates if use_max_rate else self.rates
+        paid, net, tax, payout = payouts(
+            self.is_saving,
+            self.terms,
+            self.compound,
+            rates,
+            principal,
+            installment,
+            tax_rate,
+        )
+
+        mask = np.ones(len(self), dtype=bool)
+        if term is not None:
+            mask &= self.terms == term
+        if saving is not None:
+            mask &= self.is_saving == saving
+        positions = np.flatnonzero(mask)
+        # Rows are sorted by product code, a stable sort keeps it for ties
+        order = positions[np.argsort(-payout[positions], kind="stable")][:limit]
+
+        return [
+            {
+                "fin_prdt_cd": self.codes[i],
+                "fin_prdt_nm": self.names[i],
+                "kor_co_nm": self.companies[i],
+                "save_trm": int(self.terms[i]),
+                "intr_rate_type": self.rate_types[i],
+                "rsrv_type": self.rsrv_types[i],
+                "rate": float(rates[i]),
+                "paid": int(paid[i]),
+                "interest": int(net[i]),
+                "tax": int(tax[i]),
+                "payout": int(payout[i]),
+            }
+            for i in order
+        ]
+
+
+def build_maturity_table(version=None):
+    build_start = time.time()
+    rows = TermRate.objects.order_by(
+        "product_id", "save_trm", "intr_rate_type", "rsrv_type"
+    ).values(
+        "product_id",
+        "product__fin_prdt_nm",
+        "product__kor_co_nm",
+        "category",
+        "save_trm",
+        "intr_rate_type",
+        "rsrv_type",
+        "intr_rate",
+        "intr_rate2",
+    )
+    table = MaturityTable(rows, version)
+    logger.info(
+        f"Built maturity table of {len(table)} term options in {time.time() - build_start:.3f} seconds"
+    )
+    return table
+
+
+maturity_table = VersionedIndex(VERSION_KEY, build_maturity_table)
+
+
+def invalidate_maturity_table():
+    maturity_table.invalidate()
+
+
+def get_maturity_table():
+    """
+    Table of this process, rebuilt when the catalogue version moved
+    """
+    return maturity_table.get()
+
+
+@receiver(products_refreshed)
+def refresh_maturity_table(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        invalidate_maturity_table()
@@ -0,0 +1,143 @@
+"""
+Per-grade index of credit loan rates
+
+CreditLoanOption keeps one column per credit score band. The index holds
+the loan rates (crdt_lend_rate_type "A", the rate actually charged) of
+every option as an (options x grades) array and, for each grade, the
+option positions sorted by rate with one option per product. The best
+loans of a grade are the first entries of its array, so no request sorts
+or reads the database. The index is rebuilt per data version, which every
+refresh and admin edit moves.
+"""
+
+import logging
+import time
+import numpy as np
+from django.db.models import F
+from django.dispatch import receiver
+from .models import CreditLoanOption
+from .signals import products_refreshed
+from .versioning import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:credit-grades"
+
+# Credit grade -> rate column, as published by finlife
+GRADE_FIELDS = {
+    "1": "crdt_grad_1",
+    "4": "crdt_grad_4",
+    "5": "crdt_grad_5",
+    "6": "crdt_grad_6",
+    "10": "crdt_grad_10",
+    "11": "crdt_grad_11",
+    "12": "crdt_grad_12",
+    "13": "crdt_grad_13",
+    "avg": "crdt_grad_avg",
+}
+
+GRADE_COLUMNS = {grade: column for column, grade in enumerate(GRADE_FIELDS)}
+
+# 대출금리; B, C and D are its base, spread and adjustment parts
+LOAN_RATE_TYPE = "A"
+
+
+class CreditGradeIndex:
+    """
+    Loan rates of credit options and their order for every grade
+    """
+
+    def __init__(self, options, version=None):
+        self.version = version
+        self.options = list(options)
+        self.rates = np.array(
+            [
+                [
+                    np.nan if option[field] is None else option[field]
+                    for field in GRADE_FIELDS.values()
+                ]
+                for option in self.options
+            ],
+            dtype=float,
+        ).reshape(len(self.options), len(GRADE_FIELDS))
+
+        self.orders = {}
+        for grade, column in GRADE_COLUMNS.items():
+            rates = self.rates[:, column]
+            positions = np.flatnonzero(~np.isnan(rates) & (rates > 0))
+            # Options are sorted by product code, a stable sort keeps it for ties
+            positions = positions[np.argsort(rates[positions], kind="stable")]
+            seen = set()
+            best = []
+            for position in positions.tolist():
+                code = self.options[position]["fin_prdt_cd"]
+                if code not in seen:
+                    seen.add(code)
+                    best.append(position)
+            self.orders[grade] = np.array(best, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.options)
+
+    def row(self, position, grade):
+        option = self.options[position]
+        return {
+            "fin_prdt_cd": option["fin_prdt_cd"],
+            "fin_prdt_nm": option["fin_prdt_nm"],
+            "kor_co_nm": option["kor_co_nm"],
+            "crdt_prdt_type": option["crdt_prdt_type"],
+            "grade": grade,
+            "rate": float(self.rates[position, GRADE_COLUMNS[grade]]),
+        }
+
+    def best(self, grade, limit=10):
+        """
+        Products with the lowest loan rate for a grade, lowest first
+        """
+        return [self.row(position, grade) for position in self.orders[grade][:limit]]
+
+    def leaderboard(self, limit=10):
+        """
+        best() of every grade
+        """
+        return {grade: self.best(grade, limit) for grade in GRADE_FIELDS}
+
+
+def build_credit_grade_index(version=None):
+    build_start = time.time()
+    options = (
+        CreditLoanOption.objects.filter(crdt_lend_rate_type=LOAN_RATE_TYPE)
+        .order_by("product_id", "crdt_prdt_type")
+        .values(
+            "crdt_prdt_type",
+            *GRADE_FIELDS.values(),
+            fin_prdt_cd=F("product_id"),
+            fin_prdt_nm=F("product__fin_prdt_nm"),
+            kor_co_nm=F("product__kor_co_nm"),
+        )
+    )
+    index = CreditGradeIndex(options, version)
+    logger.info(
+        f"Built credit grade index of {len(index)} options in {time.time() - build_start:.3f} seconds"
+    )
+    return index
+
+
+credit_grade_index = VersionedIndex(VERSION_KEY, build_credit_grade_index)
+
+
+def invalidate_credit_grade_index():
+    credit_grade_index.invalidate()
+
+
+def get_credit_grade_index():
+    """
+    Index of this process, rebuilt when the data version moved
+    """
+    return credit_grade_index.get()
+
+
+@receiver(products_refreshed)
+def refresh_credit_grade_index(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        invalidate_credit_grade_index()
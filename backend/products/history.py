@@ -0,0 +1,104 @@
+"""
+Rate history of deposit, saving and loan options
+
+Refreshes overwrite the option rows in place, so the ingestion engine also
+appends a RateHistory row for every option whose rates moved, keyed by
+(product, option, dcls_month). A series is a step function: a point marks
+the month from which its rates apply. Series are read with one range query
+on the covering ratehistory_series_idx and downsampled for charts.
+"""
+
+import re
+from .models import RateHistory
+
+MONTH_FORMAT = re.compile(r"^\d{4}(0[1-9]|1[0-2])$")
+
+# Points per series returned by default and at most
+DEFAULT_SERIES_POINTS = 120
+MAX_SERIES_POINTS = 1000
+
+
+def option_key(key_values):
+    """
+    Option name of a history row, the option's natural key joined by |
+    """
+    return "|".join(str(value) for value in key_values)
+
+
+def month_index(month):
+    """
+    Months since year 0 of a YYYYMM disclosure month
+    """
+    return int(month[:4]) * 12 + int(month[4:6]) - 1
+
+
+def point_value(point):
+    return point["max_rate"] if point["max_rate"] is not None else point["rate"]
+
+
+def downsample(points, size):
+    """
+    Keep size points of a series with Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept; from each bucket in between
+    the point forming the largest triangle with its neighbours is kept, so
+    rate jumps survive while flat stretches are thinned out. Sizes below 3
+    leave the series as it is.
+    """
+    if size < 3 or size >= len(points):
+        return points
+
+    coordinates = [
+        (month_index(point["dcls_month"]), point_value(point) or 0.0)
+        for point in points
+    ]
+    kept = [points[0]]
+    previous = coordinates[0]
+    bucket_size = (len(points) - 2) / (size - 2)
+    for bucket in range(size - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average of the next bucket, the last point for the last bucket
+        following = coordinates[end : int((bucket + 2) * bucket_size) + 1] or [
+            coordinates[-1]
+        ]
+        next_x = sum(x for x, _ in following) / len(following)
+        next_y = sum(y for _, y in following) / len(following)
+
+        best, best_area = start, -1.0
+        for position in range(start, end):
+            x, y = coordinates[position]
+            area = abs(
+                (previous[0] - next_x) * (y - previous[1])
+                - (previous[0] - x) * (next_y - previous[1])
+            )
+            if area > best_area:
+                best, best_area = position, area
+        kept.append(points[best])
+        previous = coordinates[best]
+    kept.append(points[-1])
+    return kept
+
+
+def rate_series(fin_prdt_cd, start=None, end=None, option=None):
+    """
+    History points of a product per option, oldest first
+    """
+    rows = RateHistory.objects.filter(product_id=fin_prdt_cd)
+    if option is not None:
+        rows = rows.filter(option=option)
+    if start:
+        rows = rows.filter(dcls_month__gte=start)
+    if end:
+        rows = rows.filter(dcls_month__lte=end)
+    rows = rows.order_by("option", "dcls_month").values_list(
+        "option", "dcls_month", "rate", "max_rate"
+    )
+
+    series = {}
+    for name, dcls_month, rate, max_rate in rows:
+        series.setdefault(name, []).append(
+            {"dcls_month": dcls_month, "rate": rate, "max_rate": max_rate}
+        )
+    return series
@@ -0,0 +1,814 @@
+"""
+Bulk ingestion engine for finlife API payloads
+
+Each product type parses a whole baseList/optionList into in-memory rows,
+diffs them against a single read of the existing keys and writes everything
+with bulk_create/bulk_update inside one transaction.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from django.db import transaction
+from .models import (
+    FinancialProduct,
+    DepositProduct,
+    SavingProduct,
+    LoanProduct,
+    MortgageLoanOption,
+    CreditLoanOption,
+    RequirementOption,
+    DepositProduct_JoinWay,
+    LoanProduct_JoinWay,
+    LendingRateOption,
+    TermRate,
+    RateHistory,
+)
+from .history import option_key
+
+logger = logging.getLogger(__name__)
+
+CREDIT_GRADE_FIELDS = [
+    "crdt_grad_1",
+    "crdt_grad_4",
+    "crdt_grad_5",
+    "crdt_grad_6",
+    "crdt_grad_10",
+    "crdt_grad_11",
+    "crdt_grad_12",
+    "crdt_grad_13",
+    "crdt_grad_avg",
+]
+
+
+def to_float(value, default=0.0):
+    """
+    Convert an API value to float, falling back to default
+    """
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def to_int(value, default=0):
+    """
+    Convert an API value to int, falling back to default
+    """
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return default
+
+
+def split_join_ways(join_way):
+    """
+    Split a comma separated join_way string into distinct entries
+    """
+    if not join_way:
+        return []
+    return [s.strip() for s in join_way.split(",") if s.strip()]
+
+
+def content_hash(values):
+    """
+    Fingerprint of a row's content, used to skip rows that did not change
+    """
+    payload = json.dumps(values, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ChangeSet:
+    """
+    Rows inserted, updated, unchanged and deleted by one refresh of a product type
+
+    Every page of a refresh records into the same change set. Caches and
+    search indexes can use changed_products to refresh only what moved.
+    """
+
+    STATUSES = ("inserted", "updated", "unchanged", "deleted")
+
+    def __init__(self, product_type):
+        self.product_type = product_type
+        self.tables = {}  # table name -> {key: status}
+
+    def record(self, table, key, status):
+        statuses = self.tables.setdefault(table, {})
+        current = statuses.get(key)
+        # A row inserted or updated by one page stays so if a later page
+        # sees it again unchanged
+        if current is None or self.STATUSES.index(status) < self.STATUSES.index(
+            current
+        ):
+            statuses[key] = status
+
+    def keys(self, table, *statuses):
+        return {
+            key
+            for key, status in self.tables.get(table, {}).items()
+            if status in statuses
+        }
+
+    def seen(self, table):
+        return self.keys(table, "inserted", "updated", "unchanged")
+
+    def counts(self):
+        counts = {}
+        for table, statuses in self.tables.items():
+            counts[table] = {status: 0 for status in self.STATUSES}
+            for status in statuses.values():
+                counts[table][status] += 1
+        return counts
+
+    @property
+    def changed_products(self):
+        """
+        Product codes with at least one inserted, updated or deleted row
+        """
+        codes = set()
+        for table in self.tables:
+            for key in self.keys(table, "inserted", "updated", "deleted"):
+                codes.add(key[0] if isinstance(key, tuple) else key)
+        return codes
+
+    @property
+    def deleted_products(self):
+        """
+        Product codes no longer published for this product type
+        """
+        return self.keys("details", "deleted")
+
+    def as_dict(self):
+        return {
+            "product_type": self.product_type,
+            "counts": self.counts(),
+            "changed_products": sorted(self.changed_products),
+            "deleted_products": sorted(self.deleted_products),
+        }
+
+
+class OptionTable:
+    """
+    In-memory view of an option model keyed by its natural key
+
+    Existing rows for a set of products are loaded with a single query,
+    changes are staged in memory and flushed with bulk_create/bulk_update.
+    Rows whose content hash did not change are left untouched.
+    """
+
+    def __init__(self, model, key_fields, value_fields):
+        self.model = model
+        self.key_fields = tuple(key_fields)
+        self.value_fields = tuple(value_fields)
+        self.rows = {}  # (product_id, *key) -> {"id": ..., **values}
+        self.by_product = {}  # product_id -> [key, ...]
+        self.loaded = {}  # (product_id, *key) -> row as stored before this run
+        self.touched = set()
+
+    def make_key(self, row):
+        return (row["product_id"],) + tuple(row[f] for f in self.key_fields)
+
+    def load(self, product_ids):
+        if not product_ids:
+            return
+        existing = self.model.objects.filter(product_id__in=product_ids).values(
+            "id", "product_id", "content_hash", *self.key_fields, *self.value_fields
+        )
+        for row in existing:
+            key = self.make_key(row)
+            self._remember(key, row)
+            self.loaded[key] = dict(row)
+
+    def _remember(self, key, row):
+        if key not in self.rows:
+            self.by_product.setdefault(key[0], []).append(key)
+        self.rows[key] = row
+
+    def upsert(self, product_id, key_values, values):
+        key = (product_id,) + tuple(key_values[f] for f in self.key_fields)
+        row = dict(self.rows.get(key, {"id": None, "content_hash": ""}))
+        row.update(values)
+        self._remember(key, row)
+        self.touched.add(key)
+
+    def update_product(self, product_id, values):
+        """
+        Update every row of a product, returns False if it has none
+        """
+        keys = self.by_product.get(product_id, [])
+        for key in keys:
+            self.rows[key].update(values)
+            self.touched.add(key)
+        return bool(keys)
+
+    def flush(self, name, changes):
+        to_create, to_update = [], []
+        for key in self.touched:
+            row = self.rows[key]
+            values = {f: row.get(f) for f in self.value_fields}
+            digest = content_hash(values)
+            if row["id"] is not None and row["content_hash"] == digest:
+                changes.record(name, key, "unchanged")
+                continue
+
+            fields = dict(zip(self.key_fields, key[1:]), **values)
+            instance = self.model(
+                id=row["id"], product_id=key[0], content_hash=digest, **fields
+            )
+            if row["id"] is None:
+                to_create.append(instance)
+                changes.record(name, key, "inserted")
+            else:
+                to_update.append(instance)
+                changes.record(name, key, "updated")
+
+        if to_create:
+            self.model.objects.bulk_create(to_create)
+        if to_update:
+            self.model.objects.bulk_update(
+                to_update, list(self.value_fields) + ["content_hash"]
+            )
+
+    def delete_unseen(self, product_ids, seen_keys):
+        """
+        Delete rows of the given products whose key was not seen
+        Returns the deleted keys
+        """
+        if not product_ids:
+            return []
+        existing = self.model.objects.filter(product_id__in=product_ids).values(
+            "id", "product_id", *self.key_fields
+        )
+        stale = {row["id"]: self.make_key(row) for row in existing}
+        stale = {pk: key for pk, key in stale.items() if key not in seen_keys}
+        if stale:
+            self.model.objects.filter(id__in=list(stale)).delete()
+        return list(stale.values())
+
+
+def write_keyed_rows(model, key_attr, unique_field, rows, existing, name, changes):
+    """
+    Upsert rows of a model keyed by its primary key, skipping unchanged rows
+
+    existing maps the keys already stored to their content hash.
+    """
+    to_write = []
+    update_fields = set()
+    for key, fields in rows.items():
+        digest = content_hash(fields)
+        if existing.get(key) == digest:
+            changes.record(name, key, "unchanged")
+            continue
+
+        changes.record(name, key, "updated" if key in existing else "inserted")
+        update_fields.update(fields)
+        to_write.append(model(**{key_attr: key}, content_hash=digest, **fields))
+
+    if to_write:
+        model.objects.bulk_create(
+            to_write,
+            update_conflicts=True,
+            unique_fields=[unique_field],
+            update_fields=sorted(update_fields) + ["content_hash"],
+        )
+
+
+class ProductIngestor:
+    """
+    Base class for ingesting one finlife product type
+
+    Subclasses describe the detail model, join way model and option tables,
+    and how individual baseList/optionList items map onto them.
+    """
+
+    product_type = None
+    label = None
+    loan_type = None
+    detail_model = None
+    join_way_model = None
+    option_tables = {}
+    # Option table name -> (rate field, max rate field) kept in RateHistory
+    history_tables = {}
+
+    def __init__(self):
+        self.products = {}  # fin_prdt_cd -> FinancialProduct fields
+        self.details = {}  # fin_prdt_cd -> detail model fields
+        self.join_ways = set()  # (fin_prdt_cd, join_way)
+        self.options = []  # (fin_prdt_cd, raw option item) in API order
+        self.tables = {
+            name: OptionTable(*spec) for name, spec in self.option_tables.items()
+        }
+        self.timings = {}
+
+    # Parsing
+    def parse(self, data):
+        result = data.get("result", {})
+        for item in result.get("baseList", []) or []:
+            fin_prdt_cd = item.get("fin_prdt_cd")
+            if not fin_prdt_cd:
+                logger.warning(
+                    f"Skipping {self.label.lower()} product with no product code"
+                )
+                continue
+
+            product = {
+                "kor_co_nm": item.get("kor_co_nm", ""),
+                "fin_prdt_nm": item.get("fin_prdt_nm", ""),
+                "join_way": item.get("join_way", ""),
+                "join_member": item.get("join_member", ""),
+            }
+            if self.loan_type:
+                product["loan_type"] = self.loan_type
+            self.products[fin_prdt_cd] = product
+
+            base_detail = self.parse_base_detail(item)
+            if base_detail is not None:
+                self.details[fin_prdt_cd] = base_detail
+
+            for join_way in split_join_ways(item.get("join_way", "")):
+                self.join_ways.add((fin_prdt_cd, join_way))
+
+        for item in result.get("optionList", []) or []:
+            fin_prdt_cd = item.get("fin_prdt_cd")
+            if not fin_prdt_cd:
+                logger.warning(
+                    f"Skipping {self.label.lower()} option with no product code"
+                )
+                continue
+            self.options.append((fin_prdt_cd, item))
+
+    def parse_base_detail(self, item):
+        """
+        Detail row derived from a baseList item (loan products)
+        """
+        return None
+
+    def apply_option(self, fin_prdt_cd, item):
+        """
+        Stage the rows derived from one optionList item
+        """
+        raise NotImplementedError
+
+    # Diffing
+    def diff(self):
+        option_codes = {code for code, _ in self.options}
+        candidate_codes = set(self.products) | option_codes
+        self.existing_products = dict(
+            FinancialProduct.objects.filter(
+                fin_prdt_cd__in=candidate_codes
+            ).values_list("fin_prdt_cd", "content_hash")
+        )
+        known_codes = set(self.existing_products) | set(self.products)
+
+        for table in self.tables.values():
+            table.load(known_codes & option_codes)
+
+        self.existing_join_ways = {
+            (product_id, join_way): pk
+            for pk, product_id, join_way in self.join_way_model.objects.filter(
+                product_id__in=set(self.products)
+            ).values_list("id", "product_id", "join_way")
+        }
+        self.existing_details = dict(
+            self.detail_model.objects.filter(product_id__in=known_codes).values_list(
+                "product_id", "content_hash"
+            )
+        )
+
+        for fin_prdt_cd, item in self.options:
+            if fin_prdt_cd not in known_codes:
+                logger.warning(
+                    f"Product with ID {fin_prdt_cd} not found for {self.label.lower()} option"
+                )
+                continue
+            self.apply_option(fin_prdt_cd, item)
+
+    # Writing
+    def write(self, changes):
+        with transaction.atomic():
+            write_keyed_rows(
+                FinancialProduct,
+                "fin_prdt_cd",
+                "fin_prdt_cd",
+                self.products,
+                self.existing_products,
+                "products",
+                changes,
+            )
+            write_keyed_rows(
+                self.detail_model,
+                "product_id",
+                "product",
+                self.details,
+                self.existing_details,
+                "details",
+                changes,
+            )
+
+            # Join ways are fully described by the baseList item
+            new_join_ways = self.join_ways - set(self.existing_join_ways)
+            if new_join_ways:
+                self.join_way_model.objects.bulk_create(
+                    [
+                        self.join_way_model(product_id=code, join_way=join_way)
+                        for code, join_way in sorted(new_join_ways)
+                    ]
+                )
+            stale_join_ways = {
+                key: pk
+                for key, pk in self.existing_join_ways.items()
+                if key not in self.join_ways
+            }
+            if stale_join_ways:
+                self.join_way_model.objects.filter(
+                    id__in=list(stale_join_ways.values())
+                ).delete()
+            for key in self.join_ways:
+                changes.record(
+                    "join_ways",
+                    key,
+                    "inserted" if key in new_join_ways else "unchanged",
+                )
+            for key in stale_join_ways:
+                changes.record("join_ways", key, "deleted")
+
+            for name, table in self.tables.items():
+                table.flush(name, changes)
+            self.write_history(changes)
+
+    def write_history(self, changes):
+        """
+        Append a RateHistory row for every written option whose rates moved
+
+        A new option or a change of rates records the option's disclosure
+        month; a rewrite of the same month keeps only its latest rates.
+        """
+        entries = []
+        for name, (rate_field, max_rate_field) in self.history_tables.items():
+            table = self.tables[name]
+            written = changes.keys(name, "inserted", "updated") & table.touched
+            for key in written:
+                row = table.rows[key]
+                rates = (row.get(rate_field), row.get(max_rate_field))
+                before = table.loaded.get(key)
+                if before is not None and rates == (
+                    before[rate_field],
+                    before[max_rate_field],
+                ):
+                    continue
+                entries.append((key, row.get("dcls_month"), rates))
+        if not entries:
+            return
+
+        # Loan options carry no month, it comes from the product's detail row
+        months = {
+            code: detail.get("dcls_month", "") for code, detail in self.details.items()
+        }
+        missing = {key[0] for key, month, _ in entries if month is None} - set(months)
+        if missing:
+            months.update(
+                self.detail_model.objects.filter(product_id__in=missing).values_list(
+                    "product_id", "dcls_month"
+                )
+            )
+
+        history = {}
+        for key, month, (rate, max_rate) in entries:
+            month = month if month is not None else months.get(key[0], "")
+            if not month:
+                continue
+            history[(key[0], option_key(key[1:]), month)] = RateHistory(
+                product_id=key[0],
+                option=option_key(key[1:]),
+                dcls_month=month,
+                rate=rate,
+                max_rate=max_rate,
+            )
+        if history:
+            RateHistory.objects.bulk_create(
+                list(history.values()),
+                update_conflicts=True,
+                unique_fields=["product", "option", "dcls_month"],
+                update_fields=["rate", "max_rate"],
+            )
+
+    def ingest(self, data, changes=None):
+        """
+        Parse, diff and write a finlife payload
+        Returns row counts per table, timings per phase and the change set
+        """
+        if changes is None:
+            changes = ChangeSet(self.product_type)
+
+        phase_start = time.time()
+        self.parse(data)
+        self.timings["parse"] = time.time() - phase_start
+
+        phase_start = time.time()
+        self.diff()
+        self.timings["diff"] = time.time() - phase_start
+
+        phase_start = time.time()
+        self.write(changes)
+        self.timings["write"] = time.time() - phase_start
+
+        return {
+            "rows": changes.counts(),
+            "timings": dict(self.timings),
+            "changes": changes,
+        }
+
+    @classmethod
+    def delete_stale(cls, changes):
+        """
+        Remove rows that a complete refresh did not see
+
+        Detail and option rows of products no longer published for this
+        type are deleted, as well as options no longer offered for products
+        that are still published. FinancialProduct rows are kept so that
+        users' favorites survive.
+        """
+        seen_products = changes.seen("products")
+        if not seen_products:
+            logger.warning(
+                f"{cls.label} refresh returned no products, skipping stale row cleanup"
+            )
+            return
+
+        details = cls.detail_model.objects.all()
+        if cls.loan_type:
+            details = details.filter(product__loan_type=cls.loan_type)
+        stale_products = (
+            set(details.values_list("product_id", flat=True)) - seen_products
+        )
+        if stale_products:
+            cls.detail_model.objects.filter(product_id__in=stale_products).delete()
+            for code in stale_products:
+                changes.record("details", code, "deleted")
+
+        for name, spec in cls.option_tables.items():
+            table = OptionTable(*spec)
+            deleted = table.delete_unseen(
+                seen_products | stale_products, changes.seen(name)
+            )
+            for key in deleted:
+                changes.record(name, key, "deleted")
+
+
+class _TermProductIngestor(ProductIngestor):
+    """
+    Shared option handling for deposit and saving products
+
+    Every term option is kept in RequirementOption and TermRate, while the
+    detail row carries the product's best (highest intr_rate2) option.
+    """
+
+    category = None
+    has_rsrv_type = False
+    join_way_model = DepositProduct_JoinWay
+    option_tables = {
+        "requirement_options": (
+            RequirementOption,
+            ("save_trm", "intr_rate_type"),
+            ("rsrv_type", "intr_rate", "intr_rate2"),
+        ),
+        "term_rates": (
+            TermRate,
+            ("save_trm", "intr_rate_type", "rsrv_type"),
+            ("category", "fin_co_no", "dcls_month", "intr_rate", "intr_rate2"),
+        ),
+    }
+    history_tables = {"term_rates": ("intr_rate", "intr_rate2")}
+
+    def rsrv_type(self, item):
+        return ""
+
+    def apply_option(self, fin_prdt_cd, item):
+        intr_rate = to_float(item.get("intr_rate"))
+        intr_rate2 = to_float(item.get("intr_rate2"))
+        save_trm = to_int(item.get("save_trm", 0))
+        intr_rate_type = item.get("intr_rate_type", "")
+        rsrv_type = self.rsrv_type(item)
+
+        detail = {
+            "fin_co_no": item.get("fin_co_no", ""),
+            "dcls_month": item.get("dcls_month", ""),
+            "category": self.category,
+            "intr_rate_type": intr_rate_type,
+            "save_trm": save_trm,
+            "intr_rate": intr_rate,
+            "intr_rate2": intr_rate2,
+        }
+        if self.has_rsrv_type:
+            detail["rsrv_type"] = rsrv_type
+        current = self.details.get(fin_prdt_cd)
+        if current is None or intr_rate2 > current["intr_rate2"]:
+            self.details[fin_prdt_cd] = detail
+
+        self.tables["requirement_options"].upsert(
+            fin_prdt_cd,
+            {"save_trm": save_trm, "intr_rate_type": intr_rate_type},
+            {
+                "rsrv_type": rsrv_type,
+                "intr_rate": intr_rate,
+                "intr_rate2": intr_rate2,
+            },
+        )
+        self.tables["term_rates"].upsert(
+            fin_prdt_cd,
+            {
+                "save_trm": save_trm,
+                "intr_rate_type": intr_rate_type,
+                "rsrv_type": rsrv_type,
+            },
+            {
+                "category": self.category,
+                "fin_co_no": detail["fin_co_no"],
+                "dcls_month": detail["dcls_month"],
+                "intr_rate": intr_rate,
+                "intr_rate2": intr_rate2,
+            },
+        )
+
+
+class DepositIngestor(_TermProductIngestor):
+    product_type = "deposit"
+    label = "Deposit"
+    category = "예금"
+    detail_model = DepositProduct
+
+
+class SavingIngestor(_TermProductIngestor):
+    product_type = "saving"
+    label = "Saving"
+    category = "적금"
+    detail_model = SavingProduct
+    has_rsrv_type = True
+
+    def rsrv_type(self, item):
+        return item.get("rsrv_type", "")
+
+
+class _LoanIngestor(ProductIngestor):
+    """
+    Shared base handling for loan products
+    """
+
+    detail_model = LoanProduct
+    join_way_model = LoanProduct_JoinWay
+
+    def parse_base_detail(self, item):
+        return {
+            "fin_co_no": item.get("fin_co_no", ""),
+            "dcls_month": item.get("dcls_month", ""),
+            "loan_inci_expn": item.get("loan_inci_expn", ""),
+            "erly_rpay_fee": item.get("erly_rpay_fee", ""),
+            "dly_rate": item.get("dly_rate", ""),
+            "loan_lmt": item.get("loan_lmt", ""),
+        }
+
+
+LENDING_RATE_TABLE = (
+    LendingRateOption,
+    ("rpay_type", "lend_rate_type"),
+    ("lend_rate_min", "lend_rate_max", "lend_rate_avg"),
+)
+
+
+class MortgageLoanIngestor(_LoanIngestor):
+    product_type = "mortgage"
+    label = "Mortgage Loan"
+    loan_type = "주택담보대출"
+    option_tables = {
+        "mortgage_options": (
+            MortgageLoanOption,
+            ("mrtg_type", "rpay_type", "lend_rate_type"),
+            ("lend_rate_min", "lend_rate_max", "lend_rate_avg"),
+        ),
+        "lending_rate_options": LENDING_RATE_TABLE,
+    }
+    # Lending rate options repeat the mortgage rates
+    history_tables = {"mortgage_options": ("lend_rate_min", "lend_rate_max")}
+
+    def apply_option(self, fin_prdt_cd, item):
+        rates = {
+            "lend_rate_min": to_float(item.get("lend_rate_min")),
+            "lend_rate_max": to_float(item.get("lend_rate_max")),
+            "lend_rate_avg": to_float(item.get("lend_rate_avg"), None),
+        }
+
+        if "mrtg_type" in item and "rpay_type" in item and "lend_rate_type" in item:
+            self.tables["mortgage_options"].upsert(
+                fin_prdt_cd,
+                {
+                    "mrtg_type": item.get("mrtg_type", ""),
+                    "rpay_type": item.get("rpay_type", ""),
+                    "lend_rate_type": item.get("lend_rate_type", ""),
+                },
+                rates,
+            )
+
+        lending = self.tables["lending_rate_options"]
+        if "rpay_type" in item and "lend_rate_type" in item:
+            lending.upsert(
+                fin_prdt_cd,
+                {
+                    "rpay_type": item.get("rpay_type", ""),
+                    "lend_rate_type": item.get("lend_rate_type", ""),
+                },
+                rates,
+            )
+        elif rates["lend_rate_avg"] is not None:
+            # Entries with only lend_rate_avg update every existing option,
+            # or create a default option carrying just the average rate
+            avg = rates["lend_rate_avg"]
+            if not lending.update_product(fin_prdt_cd, {"lend_rate_avg": avg}):
+                lending.upsert(
+                    fin_prdt_cd,
+                    {"rpay_type": "DEFAULT", "lend_rate_type": "DEFAULT"},
+                    {"lend_rate_min": avg, "lend_rate_max": avg, "lend_rate_avg": avg},
+                )
+
+
+class RentHouseLoanIngestor(_LoanIngestor):
+    product_type = "rent"
+    label = "Rent House Loan"
+    loan_type = "전세자금대출"
+    option_tables = {"lending_rate_options": LENDING_RATE_TABLE}
+    history_tables = {"lending_rate_options": ("lend_rate_min", "lend_rate_max")}
+
+    def apply_option(self, fin_prdt_cd, item):
+        self.tables["lending_rate_options"].upsert(
+            fin_prdt_cd,
+            {
+                # Default to "S" for 만기일시상환방식 and "F" for 고정금리
+                "rpay_type": item.get("rpay_type", "S"),
+                "lend_rate_type": item.get("lend_rate_type", "F"),
+            },
+            {
+                "lend_rate_min": to_float(item.get("lend_rate_min")),
+                "lend_rate_max": to_float(item.get("lend_rate_max")),
+                "lend_rate_avg": to_float(item.get("lend_rate_avg"), None),
+            },
+        )
+
+
+class CreditLoanIngestor(_LoanIngestor):
+    product_type = "credit"
+    label = "Credit Loan"
+    loan_type = "신용대출"
+    option_tables = {
+        "credit_options": (
+            CreditLoanOption,
+            ("crdt_prdt_type", "crdt_lend_rate_type"),
+            tuple(CREDIT_GRADE_FIELDS),
+        ),
+    }
+    history_tables = {"credit_options": ("crdt_grad_1", "crdt_grad_10")}
+
+    def parse_base_detail(self, item):
+        # Credit loan API doesn't provide the cost/limit values
+        return {
+            "fin_co_no": item.get("fin_co_no", ""),
+            "dcls_month": item.get("dcls_month", ""),
+            "loan_inci_expn": "",
+            "erly_rpay_fee": "",
+            "dly_rate": "",
+            "loan_lmt": "",
+        }
+
+    def apply_option(self, fin_prdt_cd, item):
+        self.tables["credit_options"].upsert(
+            fin_prdt_cd,
+            {
+                # Default to "1" for 일반신용대출 and "A" for 대출금리
+                "crdt_prdt_type": item.get("crdt_prdt_type", "1"),
+                "crdt_lend_rate_type": item.get("crdt_lend_rate_type", "A"),
+            },
+            {field: to_float(item.get(field), None) for field in CREDIT_GRADE_FIELDS},
+        )
+
+
+INGESTORS = {
+    ingestor.product_type: ingestor
+    for ingestor in (
+        DepositIngestor,
+        SavingIngestor,
+        MortgageLoanIngestor,
+        RentHouseLoanIngestor,
+        CreditLoanIngestor,
+    )
+}
+
+
+def ingest_payload(product_type, data, changes=None):
+    """
+    Ingest a finlife API payload for the given product type
+    Pages of the same refresh share one change set
+    """
+    return INGESTORS[product_type]().ingest(data, changes)
@@ -0,0 +1,153 @@
+"""
+Precomputed rate leaderboards for the top-rate endpoints
+
+Boards are rendered to JSON once per version and kept in memory by every
+process, so a request only joins already rendered items. The version is
+published in the database; a process that sees it move takes the boards
+from Django's cache when it is shared, or renders them itself.
+"""
+
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from .models import TermRate
+from .queries import (
+    DEPOSIT_CATEGORY,
+    SAVING_CATEGORY,
+    top_deposits,
+    top_savings,
+    top_term_rates,
+    top_rate_loans,
+    lowest_rate_loans,
+)
+from .versioning import bump_version, get_version
+from .serializers import (
+    DepositProductSerializer,
+    SavingProductSerializer,
+    LoanProductDetailSerializer,
+    TermRateSerializer,
+)
+
+logger = logging.getLogger(__name__)
+
+# Number of rows kept per board, larger limits are answered from the database
+LEADERBOARD_SIZE = getattr(settings, "RATE_LEADERBOARD_SIZE", 50)
+
+VERSION_KEY = "products:leaderboards"
+
+# Seconds a replaced version stays readable for requests that already saw it
+REPLACED_VERSION_TTL = 60
+
+# Seconds rendered boards stay in Django's cache, processes holding them in
+# memory keep using them
+BOARDS_TTL = getattr(settings, "RATE_LEADERBOARD_TTL", 60 * 60)
+
+# (version, boards) of this process, replaced as a whole
+_local_boards = (None, {})
+
+
+def boards_key(version):
+    return f"products:leaderboards:{version}"
+
+
+def render_rows(serializer_class, rows):
+    """
+    Render each serialized row to JSON bytes, as the API would return it
+    """
+    renderer = JSONRenderer()
+    return [renderer.render(item) for item in serializer_class(rows, many=True).data]
+
+
+def build_leaderboards(size=LEADERBOARD_SIZE):
+    """
+    Render every board from the database
+    Returns a dict of board name -> list of JSON encoded rows
+    """
+    boards = {
+        "deposit": render_rows(DepositProductSerializer, top_deposits(size)),
+        "saving": render_rows(SavingProductSerializer, top_savings(size)),
+        "loan": render_rows(LoanProductDetailSerializer, top_rate_loans(size)),
+        "lowest-loan": render_rows(
+            LoanProductDetailSerializer, lowest_rate_loans(size)
+        ),
+    }
+
+    for name, category in [("deposit", DEPOSIT_CATEGORY), ("saving", SAVING_CATEGORY)]:
+        terms = (
+            TermRate.objects.filter(category=category)
+            .values_list("save_trm", flat=True)
+            .distinct()
+        )
+        for term in terms:
+            boards[f"{name}:{term}"] = render_rows(
+                TermRateSerializer, top_term_rates(category, term, size)
+            )
+
+    return boards
+
+
+def rebuild_leaderboards():
+    """
+    Render every board and publish them under a new version
+    The version is moved only once the boards are stored
+    """
+    global _local_boards
+
+    build_start = time.time()
+    boards = build_leaderboards()
+    previous = get_version(VERSION_KEY)
+    version = time.time_ns()
+
+    cache.set(boards_key(version), boards, BOARDS_TTL)
+    _local_boards = (version, boards)
+    bump_version(VERSION_KEY, version)
+    cache.touch(boards_key(previous), REPLACED_VERSION_TTL)
+
+    logger.info(
+        f"Rebuilt {len(boards)} rate leaderboards in {time.time() - build_start:.3f} seconds"
+    )
+    return version
+
+
+def invalidate_leaderboards():
+    """
+    Move the version so that every process renders the boards again
+    """
+    bump_version(VERSION_KEY)
+
+
+def get_leaderboard(name):
+    """
+    Rendered rows of a board, rendering the boards of a version this process
+    does not hold yet
+    """
+    global _local_boards
+
+    version = get_version(VERSION_KEY)
+    local_version, boards = _local_boards
+    if local_version != version:
+        boards = cache.get(boards_key(version))
+        if boards is None:
+            build_start = time.time()
+            boards = build_leaderboards()
+            cache.set(boards_key(version), boards, BOARDS_TTL)
+            logger.info(
+                f"Rendered {len(boards)} rate leaderboards in {time.time() - build_start:.3f} seconds"
+            )
+        _local_boards = (version, boards)
+    return boards.get(name, [])
+
+
+def leaderboard_response(name, limit):
+    """
+    JSON response with the first limit rows of a board
+    Returns None when limit is outside 0 to LEADERBOARD_SIZE, which the
+    boards do not cover
+    """
+    if not 0 <= limit <= LEADERBOARD_SIZE:
+        return None
+    rows = get_leaderboard(name)[:limit]
+    return HttpResponse(b"[" + b",".join(rows) + b"]", content_type="application/json")
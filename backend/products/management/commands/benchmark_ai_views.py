@@ -0,0 +1,132 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from products.ai_cache import recommendation_cache
+from products.statistics import percentile
+from products.views import get_ai_recommendations_page, stream_ai_recommendations
+
+VIEWS = {
+    "page": get_ai_recommendations_page,
+    "stream": stream_ai_recommendations,
+}
+
+
+class Command(BaseCommand):
+    help = "Measures AI recommendation view latency and throughput against the local AI backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests", type=int, default=100, help="Requests per view"
+        )
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="Requests sent at once"
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds the local backend spends per answer, standing in for the model",
+        )
+        parser.add_argument("--period", type=int, default=12)
+        parser.add_argument(
+            "--type",
+            dest="product_type",
+            default="all",
+            choices=["deposit", "saving", "loan", "all"],
+        )
+        parser.add_argument(
+            "--cached",
+            action="store_true",
+            help="Send one profile so answers come from the cache after the first",
+        )
+        parser.add_argument(
+            "--views",
+            default=",".join(VIEWS),
+            help=f"Comma separated views to measure: {', '.join(VIEWS)}",
+        )
+
+    def handle(self, *args, **options):
+        names = [name for name in options["views"].split(",") if name]
+        unknown = [name for name in names if name not in VIEWS]
+        if unknown:
+            raise CommandError(f"Unknown views: {', '.join(unknown)}")
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+
+        with override_settings(AI_BACKEND="local", AI_LOCAL_LATENCY=options["latency"]):
+            for name in names:
+                recommendation_cache.clear()
+                self.measure(name, VIEWS[name], options)
+        recommendation_cache.clear()
+
+    def money(self, index, cached):
+        """
+        Assets of the index-th request, in a cache bucket of its own unless
+        cached
+        """
+        if cached:
+            return 10_000_000
+        return (10 + index % 90) * 10 ** (6 + index // 90)
+
+    def send(self, view, index, options):
+        """
+        Seconds to the first byte and to the end of one response, status code
+        """
+        user = get_user_model()(
+            username=f"bench{index}",
+            salary=3_000_000,
+            money=self.money(index, options["cached"]),
+        )
+        request = APIRequestFactory().get(
+            "/", {"period": options["period"], "type": options["product_type"]}
+        )
+        force_authenticate(request, user=user)
+
+        try:
+            start = time.perf_counter()
+            response = view(request)
+            if response.streaming:
+                first_byte = None
+                for _ in response.streaming_content:
+                    if first_byte is None:
+                        first_byte = time.perf_counter() - start
+                response.close()
+            else:
+                response.render()
+                first_byte = time.perf_counter() - start
+            return first_byte, time.perf_counter() - start, response.status_code
+        finally:
+            # Like a request, do not keep the thread's connection
+            connection.close()
+
+    def measure(self, name, view, options):
+        total = options["requests"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(
+                pool.map(lambda index: self.send(view, index, options), range(total))
+            )
+        elapsed = time.perf_counter() - start
+
+        errors = sum(1 for _, _, code in results if code >= 400)
+        latencies = sorted(latency for _, latency, _ in results)
+        first_bytes = sorted(first for first, _, _ in results if first is not None)
+        ms = lambda values, rank: f"{percentile(values, rank) * 1000:.1f}"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{name}: {total} requests, concurrency {options['concurrency']}, "
+                f"{errors} errors, {total / elapsed:.1f} req/s"
+            )
+        )
+        self.stdout.write(
+            f"  latency ms p50 {ms(latencies, 50)}, p95 {ms(latencies, 95)}, "
+            f"max {latencies[-1] * 1000:.1f}"
+        )
+        if first_bytes:
+            self.stdout.write(
+                f"  first byte ms p50 {ms(first_bytes, 50)}, p95 {ms(first_bytes, 95)}"
+            )
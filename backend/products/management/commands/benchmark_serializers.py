@@ -0,0 +1,136 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from products.models import FinancialProduct, DepositProduct, SavingProduct
+from products.serializers import (
+    DepositProductSerializer,
+    SavingProductSerializer,
+    flat_serializer,
+)
+
+BENCH_PREFIX = "BENCH"
+
+
+class RollbackBenchmark(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compares the nested and the flat product list serializers on data.json scaled up"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fixture",
+            type=str,
+            default=str(settings.BASE_DIR / "data.json"),
+            help="Fixture providing the products to copy",
+        )
+        parser.add_argument(
+            "--scale",
+            type=int,
+            default=100,
+            help="Number of copies of each fixture product",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per serializer, the fastest one is reported",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["fixture"], encoding="utf-8") as fixture:
+                objects = json.load(fixture)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read fixture: {e}")
+
+        # Copies are written inside a transaction that is always rolled back
+        try:
+            with transaction.atomic():
+                self.load_copies(objects, options["scale"])
+                for model, serializer_class in [
+                    (DepositProduct, DepositProductSerializer),
+                    (SavingProduct, SavingProductSerializer),
+                ]:
+                    self.compare(model, serializer_class, options["repeat"])
+                raise RollbackBenchmark()
+        except RollbackBenchmark:
+            pass
+
+    def load_copies(self, objects, scale):
+        rows = {
+            model: []
+            for model in [
+                "products.financialproduct",
+                "products.depositproduct",
+                "products.savingproduct",
+            ]
+        }
+        for obj in objects:
+            if obj["model"] in rows:
+                rows[obj["model"]].append(obj)
+
+        products, deposits, savings = [], [], []
+        for copy in range(scale):
+            code = lambda pk: f"{BENCH_PREFIX}{copy:03d}-{pk}"
+            for obj in rows["products.financialproduct"]:
+                products.append(
+                    FinancialProduct(fin_prdt_cd=code(obj["pk"]), **obj["fields"])
+                )
+            for obj in rows["products.depositproduct"]:
+                deposits.append(
+                    DepositProduct(product_id=code(obj["pk"]), **obj["fields"])
+                )
+            for obj in rows["products.savingproduct"]:
+                savings.append(
+                    SavingProduct(product_id=code(obj["pk"]), **obj["fields"])
+                )
+
+        FinancialProduct.objects.bulk_create(products, batch_size=500)
+        DepositProduct.objects.bulk_create(deposits, batch_size=500)
+        SavingProduct.objects.bulk_create(savings, batch_size=500)
+        self.stdout.write(
+            f"Loaded {len(deposits)} deposits and {len(savings)} savings ({scale}x)"
+        )
+
+    def time_runs(self, render, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = render()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
+
+    def compare(self, model, serializer_class, repeat):
+        queryset = (
+            model.objects.filter(product__fin_prdt_cd__startswith=BENCH_PREFIX)
+            .select_related("product")
+            .order_by("-intr_rate2", "product")
+        )
+        renderer = JSONRenderer()
+
+        nested_output, nested_time = self.time_runs(
+            lambda: renderer.render(serializer_class(queryset.all(), many=True).data),
+            repeat,
+        )
+        flat_output, flat_time = self.time_runs(
+            lambda: renderer.render(
+                flat_serializer(serializer_class).serialize(queryset.all())
+            ),
+            repeat,
+        )
+
+        if nested_output != flat_output:
+            raise CommandError(f"{serializer_class.__name__}: outputs differ")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{serializer_class.__name__}: nested {nested_time:.3f}s, "
+                f"flat {flat_time:.3f}s (x{nested_time / flat_time:.1f}), "
+                f"{len(flat_output)} identical bytes"
+            )
+        )
@@ -0,0 +1,60 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from products.queries import hot_queries
+
+# "SCAN table" without "USING ... INDEX" reads every row of the table
+FULL_SCAN = re.compile(r"\bSCAN (\w+)(?!.*\bUSING\b)")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE FOR (\w[\w ]*)")
+
+
+def full_scans(plan):
+    """
+    Tables read with a full scan in an EXPLAIN QUERY PLAN output
+    """
+    return [match.group(1) for match in FULL_SCAN.finditer(plan)]
+
+
+class Command(BaseCommand):
+    help = "Runs EXPLAIN QUERY PLAN on the hot product queries and fails on full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verbose",
+            action="store_true",
+            help="Print the query plan of every query",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError(
+                f"Query plans can only be checked on SQLite, not {connection.vendor}"
+            )
+
+        failures = []
+        for name, queryset in hot_queries():
+            plan = queryset.explain()
+            scanned = full_scans(plan)
+
+            if scanned:
+                failures.append(name)
+                self.stdout.write(
+                    self.style.ERROR(f"FULL SCAN: {name} - {', '.join(scanned)}")
+                )
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK: {name}"))
+
+            for sort in TEMP_SORT.findall(plan):
+                self.stdout.write(
+                    self.style.WARNING(f"  {name} sorts with a temp b-tree ({sort})")
+                )
+            if options["verbose"]:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(
+                f"{len(failures)} hot queries scan a whole table: {', '.join(failures)}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"All {len(hot_queries())} hot queries use an index")
+        )
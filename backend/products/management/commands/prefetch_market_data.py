@@ -0,0 +1,62 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from products.market_data import (
+    TTLS,
+    cache_key,
+    prefetched_requests,
+    refresh,
+)
+
+# Seconds before a failed source is tried again
+RETRY_AFTER = 60
+
+# Longest sleep, so that requests keyed by day move on soon after midnight
+MAX_SLEEP = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Keeps the dashboard market data snapshots refreshed on each source's cadence"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Refresh every source once and exit",
+        )
+
+    def handle(self, *args, **options):
+        due = {}  # cache key -> time of its next refresh
+        while True:
+            close_old_connections()
+            now = time.time()
+            for request in prefetched_requests():
+                key = cache_key(request)
+                if due.get(key, 0) > now:
+                    continue
+                due[key] = now + self.refresh(request)
+
+            if options["once"]:
+                return
+            # Keys of past days are never due again
+            current = {cache_key(request) for request in prefetched_requests()}
+            due = {key: at for key, at in due.items() if key in current}
+            time.sleep(max(1, min(min(due.values()) - time.time(), MAX_SLEEP)))
+
+    def refresh(self, request):
+        """
+        Refresh one request, seconds until it is due again
+        """
+        started = time.perf_counter()
+        try:
+            data = refresh(request)
+        except Exception as e:
+            # A failing source must not stop the others
+            self.stderr.write(f"{cache_key(request)}: {e}")
+            return min(RETRY_AFTER, TTLS[request.source])
+        self.stdout.write(
+            f"{cache_key(request)}: {len(data)} entries in {time.perf_counter() - started:.2f}s"
+        )
+        return TTLS[request.source]
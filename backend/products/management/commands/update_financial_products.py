@@ -15,6 +15,11 @@ class Command(BaseCommand):
             default="all",
             help="Type of financial products to update",
         )
+        parser.add_argument(
+            "--parallel",
+            action="store_true",
+            help="Download all API endpoints concurrently before writing",
+        )
         parser.add_argument(
             "--verbose",
             action="store_true",
@@ -24,6 +29,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         product_type = options["type"]
         verbose = options["verbose"]
+        parallel = options["parallel"]
 
         self.stdout.write(
             self.style.SUCCESS(f"Starting update of {product_type} products...")
@@ -32,9 +38,9 @@ class Command(BaseCommand):
         start_time = time.time()
 
         if product_type == "all":
-            results = update_all_financial_products()
+            results = update_all_financial_products(parallel=parallel)
         else:
-            results = fetch_products_by_type([product_type])
+            results = fetch_products_by_type([product_type], parallel=parallel)
 
         # Print results
         if verbose:
@@ -60,6 +66,13 @@ class Command(BaseCommand):
                 self.style.SUCCESS(
                     f"All operations successful: {summary.get('all_success', False)}"
                 )
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Wall-clock {summary.get('total_time_taken', 'unknown')} vs. "
+                    f"summed latency {summary.get('summed_latency', 'unknown')} "
+                    f"(speedup x{summary.get('speedup')}, parallel={parallel})"
+                )
             )  # Print individual results
             for product_name, result in results.items():
                 if product_name != "summary":
@@ -0,0 +1,458 @@
+"""
+Caching gateway for external market data
+
+Gold and silver prices (exgold), exchange rates (koreaexim), KOSPI and
+KOSDAQ daily bars (naver) and stock rankings and charts (toss) are read
+through one gateway instead of a request per page view. Each source has its
+own TTL, keyed so that data of a business day or a chart end date never
+mixes with another. Past its TTL an entry is still served while one
+background refresh replaces it (stale-while-revalidate), and for
+STALE_FOR seconds it stands in when the source fails. Concurrent misses of
+a key share one upstream call. Upstream calls go through a pooled
+keep-alive session with timeouts, and hits, stale reads, misses, errors
+and fetch latency are counted per source.
+
+Every fetch is also stored as a MarketDataSnapshot. A process that has not
+cached a key yet starts from its latest snapshot, so when the
+prefetch_market_data command keeps the dashboard sources refreshed on their
+own cadence, page views are served from snapshots and never wait on a
+source.
+"""
+
+import ast
+import logging
+import threading
+import time
+from collections import defaultdict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .models import MarketDataSnapshot
+from .singleflight import SingleFlight
+from .statistics import percentile
+
+logger = logging.getLogger(__name__)
+
+# Seconds an entry of each source is fresh
+TTLS = {
+    "gold": 10 * 60,
+    "exchange": 6 * 60 * 60,  # keyed per business day
+    "index": 60 * 60,  # daily bars, keyed per end date
+    "ranking": 60,  # realtime ranking
+    "stock": 5 * 60,
+    **getattr(settings, "MARKET_DATA_TTLS", {}),
+}
+
+# Seconds past its TTL an entry may still be served
+STALE_FOR = getattr(settings, "MARKET_DATA_STALE_FOR", 24 * 60 * 60)
+
+# Days snapshots are kept
+SNAPSHOT_DAYS = getattr(settings, "MARKET_DATA_SNAPSHOT_DAYS", 7)
+
+# (connect, read) seconds of an upstream call
+TIMEOUT = (3.05, 10)
+
+REFRESH_WORKERS = 4
+
+BROWSER_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+TOSS_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Xss-Protection": "1; mode=block",
+    "User-Agent": "Mozilla/5.0",
+}
+
+FAILURE_DETAILS = {
+    "gold": "금/은 시세 데이터를 가져오는 데 실패했습니다.",
+    "exchange": "환율 데이터를 가져오는 데 실패했습니다.",
+    "index": "주식 시장 데이터를 가져오는 데 실패했습니다.",
+    "ranking": "주식 순위 데이터를 가져오는 데 실패했습니다.",
+    "stock": "주식 상세 정보를 가져오는 데 실패했습니다.",
+}
+
+INDEX_COLUMNS = {
+    "날짜": "date",
+    "시가": "open",
+    "고가": "high",
+    "저가": "low",
+    "종가": "close",
+    "거래량": "volume",
+    "외국인소진율": "foreign_rate",
+}
+
+
+# One read of a source: the key of its data and how to fetch it upstream
+MarketRequest = namedtuple("MarketRequest", ["source", "key", "fetch"])
+
+
+class MarketDataError(Exception):
+    """
+    Upstream failure, its message is the detail shown to the client
+    """
+
+
+def create_pooled_session():
+    """
+    Keep-alive session shared by every upstream call, a quick retry on
+    gateway errors only so that a page view never waits on backoffs
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=[502, 503, 504],
+        allowed_methods=["GET", "POST"],
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+session = create_pooled_session()
+
+
+class SourceMetrics:
+    """
+    Gateway counters and upstream fetch latency per source of this process
+    """
+
+    EVENTS = ["hit", "stale", "miss", "snapshot", "shared", "refresh", "error"]
+
+    def __init__(self, size=200):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: dict.fromkeys(self.EVENTS, 0))
+        self.latencies = defaultdict(lambda: deque(maxlen=size))
+
+    def count(self, source, event):
+        with self.lock:
+            self.counts[source][event] += 1
+
+    def fetched(self, source, latency):
+        with self.lock:
+            self.latencies[source].append(latency)
+
+    def clear(self):
+        with self.lock:
+            self.counts.clear()
+            self.latencies.clear()
+
+    def summary(self):
+        with self.lock:
+            counts = {source: dict(events) for source, events in self.counts.items()}
+            latencies = {
+                source: sorted(values) for source, values in self.latencies.items()
+            }
+        for source, events in counts.items():
+            reads = events["hit"] + events["stale"] + events["miss"]
+            events["hit_ratio"] = (
+                round((events["hit"] + events["stale"]) / reads, 3) if reads else None
+            )
+            values = latencies.get(source)
+            if values:
+                events["fetch_ms"] = {
+                    "p50": round(percentile(values, 50) * 1000, 1),
+                    "p95": round(percentile(values, 95) * 1000, 1),
+                    "max": round(values[-1] * 1000, 1),
+                }
+        return counts
+
+
+metrics = SourceMetrics()
+flights = SingleFlight()
+_refresher = ThreadPoolExecutor(
+    max_workers=REFRESH_WORKERS, thread_name_prefix="market-data"
+)
+
+
+def cache_key(request):
+    return f"market:{request.source}:{request.key}"
+
+
+def cache_entry(request, data, fetched_at):
+    """
+    Cache an entry fetched at a timestamp, None when it is too old to serve
+    """
+    ttl = TTLS[request.source]
+    timeout = fetched_at + ttl + STALE_FOR - time.time()
+    if timeout <= 0:
+        return None
+    entry = {"data": data, "fresh_until": fetched_at + ttl}
+    cache.set(cache_key(request), entry, timeout)
+    return entry
+
+
+def store_snapshot(request, data):
+    MarketDataSnapshot.objects.create(source=request.source, key=request.key, data=data)
+    MarketDataSnapshot.objects.filter(
+        source=request.source,
+        fetched_at__lt=timezone.now() - timedelta(days=SNAPSHOT_DAYS),
+    ).delete()
+
+
+def load_snapshot(request):
+    """
+    Cache entry of the latest snapshot of a request, None without a servable one
+    """
+    snapshot = (
+        MarketDataSnapshot.objects.filter(source=request.source, key=request.key)
+        .order_by("-fetched_at")
+        .first()
+    )
+    if snapshot is None:
+        return None
+    return cache_entry(request, snapshot.data, snapshot.fetched_at.timestamp())
+
+
+def refresh(request):
+    """
+    Fetch a request from its source, store it as the latest snapshot and
+    cache it; MarketDataError on failure
+    """
+    source = request.source
+    metrics.count(source, "refresh")
+    started = time.perf_counter()
+    try:
+        data = request.fetch()
+    except requests.RequestException as e:
+        metrics.count(source, "error")
+        logger.warning(f"Market data {cache_key(request)} failed: {str(e)}")
+        raise MarketDataError(FAILURE_DETAILS[source])
+    except MarketDataError as e:
+        metrics.count(source, "error")
+        logger.warning(f"Market data {cache_key(request)} failed: {str(e)}")
+        raise
+    finally:
+        metrics.fetched(source, time.perf_counter() - started)
+
+    store_snapshot(request, data)
+    cache_entry(request, data, time.time())
+    return data
+
+
+def revalidate(request):
+    """
+    Refresh a stale entry in the background unless it is already refreshing
+    """
+
+    def run():
+        try:
+            flights.do(cache_key(request), lambda: refresh(request))
+        except MarketDataError:
+            pass  # The stale entry is served until it expires
+        finally:
+            # Pool threads open their own connection, do not leak it
+            connection.close()
+
+    if not flights.in_flight(cache_key(request)):
+        _refresher.submit(run)
+
+
+def get_market_data(request):
+    """
+    Data of a request from the cache, the latest snapshot or its source
+    """
+    source = request.source
+    entry = cache.get(cache_key(request))
+    if entry is None or entry["fresh_until"] <= time.time():
+        # The prefetcher may have stored a newer one than this process cached
+        snapshot = load_snapshot(request)
+        if snapshot is not None and (
+            entry is None or snapshot["fresh_until"] > entry["fresh_until"]
+        ):
+            metrics.count(source, "snapshot")
+            entry = snapshot
+    if entry is not None:
+        if entry["fresh_until"] > time.time():
+            metrics.count(source, "hit")
+        else:
+            metrics.count(source, "stale")
+            revalidate(request)
+        return entry["data"]
+
+    metrics.count(source, "miss")
+    data, shared = flights.do(cache_key(request), lambda: refresh(request))
+    if shared:
+        metrics.count(source, "shared")
+    return data
+
+
+def exchange_rate_day(now=None):
+    """
+    Business day whose rates are published: the previous one on weekends
+    and before 11 o'clock
+    """
+    now = now or datetime.now()
+    day = now
+    if now.weekday() >= 5 or now.hour < 11:
+        while True:
+            day -= timedelta(days=1)
+            if day.weekday() < 5:
+                break
+    return day.strftime("%Y%m%d")
+
+
+def gold_and_silver_request(metal_type):
+    today = datetime.now()
+    start = (today - timedelta(days=90)).strftime("%Y-%m-%d")
+    end = today.strftime("%Y-%m-%d")
+
+    def fetch():
+        response = session.get(
+            "https://prod-api.exgold.co.kr/api/v1/main/chart/period/price/domestic",
+            params={"type": metal_type, "from": start, "to": end},
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise MarketDataError(FAILURE_DETAILS["gold"])
+        data = response.json()
+        if not data or "data" not in data:
+            raise MarketDataError("유효하지 않은 금/은 시세 데이터입니다.")
+        return data
+
+    return MarketRequest("gold", f"{metal_type}:{end}", fetch)
+
+
+def exchange_rate_request():
+    day = exchange_rate_day()
+
+    def fetch():
+        response = session.get(
+            "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON",
+            params={
+                "authkey": settings.EXCHANGE_RATE_API,
+                "searchdate": day,
+                "data": "AP01",
+            },
+            verify=False,
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise MarketDataError(FAILURE_DETAILS["exchange"])
+        data = response.json()
+        if not data:
+            raise MarketDataError("유효하지 않은 환율 데이터입니다.")
+        return data
+
+    return MarketRequest("exchange", day, fetch)
+
+
+def index_request(symbol):
+    """
+    Request of the daily bars of the last 30 days of a market index
+    """
+    now = datetime.now()
+    start = (now - timedelta(days=30)).strftime("%Y%m%d")
+    end = now.strftime("%Y%m%d")
+
+    def fetch():
+        response = session.get(
+            "https://m.stock.naver.com/front-api/external/chart/domestic/info",
+            params={
+                "symbol": symbol,
+                "requestType": 1,
+                "startTime": start,
+                "endTime": end,
+                "timeframe": "day",
+            },
+            headers=BROWSER_HEADERS,
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise MarketDataError(FAILURE_DETAILS["index"])
+        try:
+            parsed_data = ast.literal_eval(response.text.strip())
+        except Exception as e:
+            raise MarketDataError(f"데이터 파싱 실패: {str(e)}")
+        if len(parsed_data) <= 1:
+            raise MarketDataError("유효하지 않은 주식 시장 데이터입니다.")
+
+        columns = [INDEX_COLUMNS.get(column, column) for column in parsed_data[0]]
+        return [dict(zip(columns, row)) for row in parsed_data[1:]]
+
+    return MarketRequest("index", f"{symbol}:{end}", fetch)
+
+
+def stock_ranking_request():
+    def fetch():
+        response = session.post(
+            "https://wts-cert-api.tossinvest.com/api/v2/dashboard/wts/overview/ranking",
+            headers={**TOSS_HEADERS, "Authorization": "Bearer YOUR_TOKEN"},
+            json={
+                "id": "biggest_total_amount",
+                "filters": [
+                    "MARKET_CAP_GREATER_THAN_50M",
+                    "STOCKS_PRICE_GREATER_THAN_ONE_DOLLAR",
+                    "KRX_MANAGEMENT_STOCK",
+                ],
+                "duration": "realtime",
+                "tag": "all",
+            },
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise MarketDataError(FAILURE_DETAILS["ranking"])
+        return response.json()
+
+    return MarketRequest("ranking", "biggest_total_amount", fetch)
+
+
+def stock_details_request(stock_code):
+    market = "us-s" if stock_code.startswith("U") else "kr-s"
+
+    def fetch():
+        response = session.get(
+            f"https://wts-info-api.tossinvest.com/api/v1/c-chart/{market}/{stock_code}/day:1",
+            params={"count": 100, "useAdjustedRate": "true"},
+            headers=TOSS_HEADERS,
+            timeout=TIMEOUT,
+        )
+        if response.status_code != 200:
+            raise MarketDataError(FAILURE_DETAILS["stock"])
+        return response.json()
+
+    return MarketRequest("stock", stock_code, fetch)
+
+
+def gold_and_silver_prices(metal_type):
+    return get_market_data(gold_and_silver_request(metal_type))
+
+
+def exchange_rates():
+    return get_market_data(exchange_rate_request())
+
+
+def index_daily_bars(symbol):
+    """
+    Daily bars of the last 30 days of a market index (KOSPI, KOSDAQ)
+    """
+    return get_market_data(index_request(symbol))
+
+
+def stock_rankings():
+    return get_market_data(stock_ranking_request())
+
+
+def stock_details(stock_code):
+    return get_market_data(stock_details_request(stock_code))
+
+
+def prefetched_requests():
+    """
+    Requests of the dashboard, refreshed ahead of page views by the
+    prefetch_market_data command
+    """
+    return [
+        gold_and_silver_request("AU"),
+        gold_and_silver_request("AG"),
+        exchange_rate_request(),
+        index_request("KOSPI"),
+        index_request("KOSDAQ"),
+        stock_ranking_request(),
+    ]
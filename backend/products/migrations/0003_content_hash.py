@@ -0,0 +1,53 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0002_alter_creditloanoption_crdt_grad_1_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="creditloanoption",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="depositproduct",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="financialproduct",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="lendingrateoption",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="loanproduct",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="mortgageloanoption",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="requirementoption",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+        migrations.AddField(
+            model_name="savingproduct",
+            name="content_hash",
+            field=models.CharField(blank=True, default="", max_length=40),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:52
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_term_rates(apps, schema_editor):
+    """
+    Copy the per-term rates already stored in RequirementOption
+    """
+    RequirementOption = apps.get_model("products", "RequirementOption")
+    TermRate = apps.get_model("products", "TermRate")
+
+    rates = []
+    options = RequirementOption.objects.select_related(
+        "product__deposit_product", "product__saving_product"
+    )
+    for option in options.iterator():
+        detail = getattr(option.product, "deposit_product", None) or getattr(
+            option.product, "saving_product", None
+        )
+        if detail is None:
+            continue
+        rates.append(
+            TermRate(
+                product_id=option.product_id,
+                category=detail.category,
+                fin_co_no=detail.fin_co_no,
+                dcls_month=detail.dcls_month,
+                save_trm=option.save_trm,
+                intr_rate_type=option.intr_rate_type,
+                rsrv_type=option.rsrv_type or "",
+                intr_rate=option.intr_rate,
+                intr_rate2=option.intr_rate2,
+            )
+        )
+    TermRate.objects.bulk_create(rates, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_content_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TermRate",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("category", models.CharField(max_length=50)),
+                ("fin_co_no", models.CharField(max_length=255)),
+                ("dcls_month", models.CharField(max_length=10)),
+                ("save_trm", models.IntegerField()),
+                ("intr_rate_type", models.CharField(max_length=255)),
+                ("rsrv_type", models.CharField(blank=True, default="", max_length=100)),
+                ("intr_rate", models.FloatField()),
+                ("intr_rate2", models.FloatField()),
+                (
+                    "content_hash",
+                    models.CharField(blank=True, default="", max_length=40),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="term_rates",
+                        to="products.financialproduct",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["category", "save_trm", "-intr_rate2"],
+                        name="termrate_term_best_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="termrate",
+            constraint=models.UniqueConstraint(
+                fields=("product", "save_trm", "intr_rate_type", "rsrv_type"),
+                name="unique_term_rate",
+            ),
+        ),
+        migrations.RunPython(backfill_term_rates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_termrate"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="creditloanoption",
+            index=models.Index(
+                fields=["product", "crdt_grad_1"], name="credit_product_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="depositproduct",
+            index=models.Index(fields=["-intr_rate2"], name="deposit_rate_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="depositproduct",
+            index=models.Index(
+                fields=["save_trm", "-intr_rate2"], name="deposit_term_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="depositproduct",
+            index=models.Index(fields=["dcls_month"], name="deposit_dcls_month_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="financialproduct",
+            index=models.Index(
+                fields=["kor_co_nm", "fin_prdt_nm"], name="product_company_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="financialproduct",
+            index=models.Index(fields=["loan_type"], name="product_loan_type_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="loanproduct",
+            index=models.Index(fields=["dcls_month"], name="loan_dcls_month_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="mortgageloanoption",
+            index=models.Index(
+                fields=["product", "lend_rate_min"], name="mortgage_product_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="savingproduct",
+            index=models.Index(fields=["-intr_rate2"], name="saving_rate_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="savingproduct",
+            index=models.Index(
+                fields=["save_trm", "-intr_rate2"], name="saving_term_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="savingproduct",
+            index=models.Index(fields=["dcls_month"], name="saving_dcls_month_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="userproduct",
+            index=models.Index(
+                fields=["user", "-created_at"], name="userproduct_recent_idx"
+            ),
+        ),
+    ]
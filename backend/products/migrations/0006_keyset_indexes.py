@@ -0,0 +1,55 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_product_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="depositproduct",
+            name="deposit_rate_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="depositproduct",
+            name="deposit_term_rate_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="savingproduct",
+            name="saving_rate_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="savingproduct",
+            name="saving_term_rate_idx",
+        ),
+        migrations.AddIndex(
+            model_name="depositproduct",
+            index=models.Index(
+                fields=["-intr_rate2", "-product"], name="deposit_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="depositproduct",
+            index=models.Index(
+                fields=["save_trm", "-intr_rate2", "-product"],
+                name="deposit_term_rate_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="savingproduct",
+            index=models.Index(
+                fields=["-intr_rate2", "-product"], name="saving_rate_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="savingproduct",
+            index=models.Index(
+                fields=["save_trm", "-intr_rate2", "-product"],
+                name="saving_term_rate_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:06
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductStatistics",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("data", models.JSONField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
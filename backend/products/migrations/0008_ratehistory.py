@@ -0,0 +1,111 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_rate_history(apps, schema_editor):
+    """
+    Record the rates currently stored as the first point of every option
+    """
+    RateHistory = apps.get_model("products", "RateHistory")
+    TermRate = apps.get_model("products", "TermRate")
+    MortgageLoanOption = apps.get_model("products", "MortgageLoanOption")
+    LendingRateOption = apps.get_model("products", "LendingRateOption")
+    CreditLoanOption = apps.get_model("products", "CreditLoanOption")
+
+    history = []
+    for rate in TermRate.objects.iterator():
+        history.append(
+            RateHistory(
+                product_id=rate.product_id,
+                option=f"{rate.save_trm}|{rate.intr_rate_type}|{rate.rsrv_type}",
+                dcls_month=rate.dcls_month,
+                rate=rate.intr_rate,
+                max_rate=rate.intr_rate2,
+            )
+        )
+
+    # Loan options take the disclosure month of their product
+    for model, key_fields, rate_fields, loan_type in [
+        (
+            MortgageLoanOption,
+            ("mrtg_type", "rpay_type", "lend_rate_type"),
+            ("lend_rate_min", "lend_rate_max"),
+            None,
+        ),
+        (
+            LendingRateOption,
+            ("rpay_type", "lend_rate_type"),
+            ("lend_rate_min", "lend_rate_max"),
+            "전세자금대출",
+        ),
+        (
+            CreditLoanOption,
+            ("crdt_prdt_type", "crdt_lend_rate_type"),
+            ("crdt_grad_1", "crdt_grad_10"),
+            None,
+        ),
+    ]:
+        options = model.objects.exclude(product__loan_product__dcls_month="")
+        if loan_type:
+            options = options.filter(product__loan_type=loan_type)
+        rows = options.values_list(
+            "product_id", "product__loan_product__dcls_month", *key_fields, *rate_fields
+        )
+        for product_id, dcls_month, *values in rows.iterator():
+            if dcls_month is None:
+                continue
+            history.append(
+                RateHistory(
+                    product_id=product_id,
+                    option="|".join(str(value) for value in values[:-2]),
+                    dcls_month=dcls_month,
+                    rate=values[-2],
+                    max_rate=values[-1],
+                )
+            )
+    RateHistory.objects.bulk_create(history, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0007_product_statistics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RateHistory",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("option", models.CharField(max_length=255)),
+                ("dcls_month", models.CharField(max_length=10)),
+                ("rate", models.FloatField(blank=True, null=True)),
+                ("max_rate", models.FloatField(blank=True, null=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rate_history",
+                        to="products.financialproduct",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["product", "option", "dcls_month", "rate", "max_rate"],
+                        name="ratehistory_series_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="ratehistory",
+            constraint=models.UniqueConstraint(
+                fields=("product", "option", "dcls_month"), name="unique_rate_history"
+            ),
+        ),
+        migrations.RunPython(backfill_rate_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0009_ai_recommendation_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MarketDataSnapshot",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("source", models.CharField(max_length=20)),
+                ("key", models.CharField(max_length=100)),
+                ("data", models.JSONField()),
+                ("fetched_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["source", "key", "-fetched_at"],
+                        name="marketsnapshot_latest_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0010_market_data_snapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndexVersion",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=50, primary_key=True, serialize=False),
+                ),
+                ("version", models.BigIntegerField()),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
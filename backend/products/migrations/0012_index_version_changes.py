@@ -0,0 +1,23 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0011_index_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="indexversion",
+            name="changed_products",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="indexversion",
+            name="previous",
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.4 on 2026-10-18 11:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0012_index_version_changes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StagedProductPage",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("run", models.CharField(max_length=32)),
+                ("product_type", models.CharField(max_length=20)),
+                ("payload", models.JSONField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["run", "id"], name="stagedpage_run_idx")
+                ],
+            },
+        ),
+    ]
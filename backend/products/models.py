@@ -10,6 +10,19 @@ class FinancialProduct(models.Model):
     join_way = models.CharField(max_length=255)  # 가입방법
     loan_type = models.CharField(max_length=255, null=True, blank=True)  # 대출종류
     join_member = models.TextField(null=True, blank=True)  # 가입대상
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 금융회사명 정렬/검색
+            models.Index(
+                fields=["kor_co_nm", "fin_prdt_nm"], name="product_company_idx"
+            ),
+            # 대출종류 필터
+            models.Index(fields=["loan_type"], name="product_loan_type_idx"),
+        ]
 
     def __str__(self):
         return f"{self.fin_prdt_nm} - {self.kor_co_nm}"
@@ -30,6 +43,22 @@ class DepositProduct(models.Model):
     save_trm = models.IntegerField()  # 저축 기간
     intr_rate = models.FloatField()  # 금리
     intr_rate2 = models.FloatField()  # 최고 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 최고 금리순 정렬 (상품코드는 페이지 커서용)
+            models.Index(fields=["-intr_rate2", "-product"], name="deposit_rate_idx"),
+            # 기간별 최고 금리순 조회
+            models.Index(
+                fields=["save_trm", "-intr_rate2", "-product"],
+                name="deposit_term_rate_idx",
+            ),
+            # 최신 공시월 조회
+            models.Index(fields=["dcls_month"], name="deposit_dcls_month_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.save_trm}개월"
@@ -51,6 +80,22 @@ class SavingProduct(models.Model):
     save_trm = models.IntegerField()  # 저축 기간
     intr_rate = models.FloatField()  # 금리
     intr_rate2 = models.FloatField()  # 최고 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 최고 금리순 정렬 (상품코드는 페이지 커서용)
+            models.Index(fields=["-intr_rate2", "-product"], name="saving_rate_idx"),
+            # 기간별 최고 금리순 조회
+            models.Index(
+                fields=["save_trm", "-intr_rate2", "-product"],
+                name="saving_term_rate_idx",
+            ),
+            # 최신 공시월 조회
+            models.Index(fields=["dcls_month"], name="saving_dcls_month_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.save_trm}개월"
@@ -70,6 +115,15 @@ class LoanProduct(models.Model):
     erly_rpay_fee = models.TextField(null=True, blank=True)  # 중도상환 수수료
     dly_rate = models.TextField(null=True, blank=True)  # 연체 이자율
     loan_lmt = models.TextField(null=True, blank=True)  # 대출 한도
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 최신 공시월 조회
+            models.Index(fields=["dcls_month"], name="loan_dcls_month_idx"),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm}"
@@ -87,6 +141,17 @@ class MortgageLoanOption(models.Model):
     lend_rate_min = models.FloatField()  # 최저 금리
     lend_rate_max = models.FloatField()  # 최고 금리
     lend_rate_avg = models.FloatField(null=True, blank=True)  # 평균 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 상품별 최저 금리 조회
+            models.Index(
+                fields=["product", "lend_rate_min"], name="mortgage_product_rate_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.mrtg_type}"
@@ -109,6 +174,17 @@ class CreditLoanOption(models.Model):
     crdt_grad_12 = models.FloatField(null=True, blank=True)  # 신용등급 12
     crdt_grad_13 = models.FloatField(null=True, blank=True)  # 신용등급 13
     crdt_grad_avg = models.FloatField(null=True, blank=True)  # 평균 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        indexes = [
+            # 상품별 최저 금리 조회
+            models.Index(
+                fields=["product", "crdt_grad_1"], name="credit_product_rate_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.crdt_prdt_type}"
@@ -127,11 +203,93 @@ class RequirementOption(models.Model):
     )  # 적립 유형(적금상품만)
     intr_rate = models.FloatField()  # 기본 금리
     intr_rate2 = models.FloatField()  # 최고 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.save_trm}개월"
 
 
+# 예금/적금 기간별 금리표
+class TermRate(models.Model):
+    id = models.AutoField(primary_key=True)
+    product = models.ForeignKey(
+        FinancialProduct, on_delete=models.CASCADE, related_name="term_rates"
+    )
+    category = models.CharField(max_length=50)  # 상품 카테고리 (예금, 적금)
+    fin_co_no = models.CharField(max_length=255)  # 금융회사 코드
+    dcls_month = models.CharField(max_length=10)  # 공시 월
+    save_trm = models.IntegerField()  # 저축 기간
+    intr_rate_type = models.CharField(max_length=255)  # 금리 유형
+    rsrv_type = models.CharField(
+        max_length=100, blank=True, default=""
+    )  # 적립 유형(적금상품만)
+    intr_rate = models.FloatField()  # 기본 금리
+    intr_rate2 = models.FloatField()  # 최고 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "save_trm", "intr_rate_type", "rsrv_type"],
+                name="unique_term_rate",
+            )
+        ]
+        indexes = [
+            # 기간별 최고 금리 조회
+            models.Index(
+                fields=["category", "save_trm", "-intr_rate2"],
+                name="termrate_term_best_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.fin_prdt_nm} - {self.save_trm}개월"
+
+
+# 옵션별 금리 이력 (금리가 바뀐 공시월만 기록)
+class RateHistory(models.Model):
+    id = models.AutoField(primary_key=True)
+    product = models.ForeignKey(
+        FinancialProduct, on_delete=models.CASCADE, related_name="rate_history"
+    )
+    option = models.CharField(max_length=255)  # 옵션 키 (옵션 자연키를 |로 연결)
+    dcls_month = models.CharField(max_length=10)  # 공시 월
+    rate = models.FloatField(null=True, blank=True)  # 기본(최저) 금리
+    max_rate = models.FloatField(null=True, blank=True)  # 최고 금리
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "option", "dcls_month"],
+                name="unique_rate_history",
+            )
+        ]
+        indexes = [
+            # 상품별 기간 조회 (테이블을 읽지 않는 커버링 인덱스)
+            models.Index(
+                fields=["product", "option", "dcls_month", "rate", "max_rate"],
+                name="ratehistory_series_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.option} {self.dcls_month}"
+
+
+# 상품 통계 스냅샷 (갱신마다 한 번 계산, id가 버전)
+class ProductStatistics(models.Model):
+    id = models.AutoField(primary_key=True)
+    data = models.JSONField()  # 집계 결과
+    created_at = models.DateTimeField(default=timezone.now)  # 계산 시각
+
+    def __str__(self):
+        return f"통계 스냅샷 {self.id} ({self.created_at:%Y-%m-%d %H:%M})"
+
+
 # 금융상품 가입 여정
 class DepositProduct_JoinWay(models.Model):
     id = models.AutoField(primary_key=True)
@@ -166,6 +324,9 @@ class LendingRateOption(models.Model):
     lend_rate_min = models.FloatField()  # 최저 금리
     lend_rate_max = models.FloatField()  # 최고 금리
     lend_rate_avg = models.FloatField(null=True, blank=True)  # 평균 금리
+    content_hash = models.CharField(
+        max_length=40, blank=True, default=""
+    )  # 변경 감지용 해시
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.rpay_type}"
@@ -184,6 +345,100 @@ class UserProduct(models.Model):
 
     class Meta:
         unique_together = ("user", "product")
+        indexes = [
+            # 유저별 최근 관심상품 조회
+            models.Index(fields=["user", "-created_at"], name="userproduct_recent_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.fin_prdt_nm}"
+
+
+# AI 추천 비동기 작업
+class AIRecommendationJob(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    ERROR = "error"
+    STATUS_CHOICES = [
+        (PENDING, "대기"),
+        (RUNNING, "실행 중"),
+        (SUCCESS, "완료"),
+        (ERROR, "실패"),
+    ]
+
+    id = models.AutoField(primary_key=True)
+    user = models.ForeignKey(
+        "accounts.User", on_delete=models.CASCADE, related_name="ai_jobs"
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )  # 작업 상태
+    key = models.CharField(max_length=40)  # 추천 캐시 키
+    inputs = models.JSONField()  # 연봉, 자산, 기간, 상품 유형, 후보 상품
+    result = models.JSONField(null=True, blank=True)  # AI 추천 결과
+    attempts = models.PositiveSmallIntegerField(default=0)  # 실행 횟수
+    created_at = models.DateTimeField(default=timezone.now)  # 요청 시각
+    started_at = models.DateTimeField(null=True, blank=True)  # 실행 시작 시각
+    finished_at = models.DateTimeField(null=True, blank=True)  # 완료 시각
+
+    class Meta:
+        indexes = [
+            # 대기 / 멈춘 작업 복구
+            models.Index(fields=["status", "created_at"], name="aijob_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"AI 추천 작업 {self.id} ({self.status})"
+
+
+# 외부 시세 데이터 스냅샷
+class MarketDataSnapshot(models.Model):
+    id = models.AutoField(primary_key=True)
+    source = models.CharField(max_length=20)  # gold, exchange, index, ranking, stock
+    key = models.CharField(max_length=100)  # 종류 / 기준일 등 조회 조건
+    data = models.JSONField()  # 정규화된 응답
+    fetched_at = models.DateTimeField(default=timezone.now)  # 수집 시각
+
+    class Meta:
+        indexes = [
+            # 조건별 최신 스냅샷 조회
+            models.Index(
+                fields=["source", "key", "-fetched_at"],
+                name="marketsnapshot_latest_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.source} {self.key} ({self.fetched_at:%Y-%m-%d %H:%M})"
+
+
+# 메모리 인덱스 버전 (모든 프로세스가 공유)
+class IndexVersion(models.Model):
+    key = models.CharField(max_length=50, primary_key=True)  # 인덱스 이름
+    version = models.BigIntegerField()  # 게시 시각 (ns)
+    previous = models.BigIntegerField(null=True, blank=True)  # 직전 버전
+    changed_products = models.JSONField(
+        null=True, blank=True
+    )  # 직전 버전 이후 바뀐 상품 코드 (없으면 전체)
+    updated_at = models.DateTimeField(auto_now=True)  # 마지막 변경 시각
+
+    def __str__(self):
+        return f"{self.key} {self.version}"
+
+
+# 상품 갱신 중 내려받은 API 페이지 (모든 페이지가 모이면 한 번에 반영)
+class StagedProductPage(models.Model):
+    id = models.AutoField(primary_key=True)
+    run = models.CharField(max_length=32)  # 갱신 실행 ID
+    product_type = models.CharField(max_length=20)  # deposit, saving, ...
+    payload = models.JSONField()  # API 응답 페이지
+    created_at = models.DateTimeField(default=timezone.now)  # 저장 시각
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["run", "id"], name="stagedpage_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_type} {self.run} ({self.id})"
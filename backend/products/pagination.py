@@ -0,0 +1,188 @@
+"""
+Keyset (cursor) pagination for the product list endpoints
+
+Pages are read after the (sort key, product code) position of the last row
+of the previous page instead of with an OFFSET, so every page is a range
+read on the sort index and costs the same as the first one.
+"""
+
+import base64
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Seconds an approximate total is reused across the pages of one filter
+APPROXIMATE_TOTAL_TTL = 300
+
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(positions):
+    """
+    Opaque cursor token from a dict of list name -> position (None when done)
+    """
+    payload = json.dumps(positions, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(token):
+    """
+    Positions of a cursor token, an empty dict for the first page
+    """
+    if not token:
+        return {}
+    try:
+        positions = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if not isinstance(positions, dict) or not all(
+        position is None or is_position(position) for position in positions.values()
+    ):
+        raise InvalidCursor(token)
+    return positions
+
+
+def is_position(position):
+    """
+    Whether a decoded value is a [key, tie] pair of strings or numbers
+    """
+    return (
+        isinstance(position, list)
+        and len(position) == 2
+        and all(
+            isinstance(value, (str, int, float)) and not isinstance(value, bool)
+            for value in position
+        )
+    )
+
+
+def lookup_field(model, lookup):
+    """
+    Model field an ORM lookup such as product__kor_co_nm ends on
+    """
+    for name in lookup.split("__"):
+        field = model._meta.get_field(name)
+        model = field.related_model
+    return field
+
+
+def read_path(row, path):
+    """
+    Follow a path of keys (serialized rows) or attributes (model instances)
+    """
+    for name in path:
+        row = row[name] if isinstance(row, dict) else getattr(row, name)
+    return row
+
+
+class KeysetPage:
+    """
+    One page of a list ordered by (key, tie), read after a position
+
+    key and tie are ORM lookups; tie must be unique so that the position
+    of a row is unique too.
+    """
+
+    def __init__(self, key, tie, descending, page_size, after=None):
+        self.key = key
+        self.tie = tie
+        self.descending = descending
+        self.page_size = page_size
+        self.after = tuple(after) if after is not None else None
+
+    def filter_queryset(self, queryset):
+        """
+        Rows of the page plus one, to tell whether another page follows
+        """
+        direction = "-" if self.descending else ""
+        queryset = queryset.order_by(f"{direction}{self.key}", f"{direction}{self.tie}")
+        if self.after is not None:
+            key_value, tie_value = self.typed_position(queryset.model)
+            op = "lt" if self.descending else "gt"
+            # The first condition alone is a range on the sort index
+            queryset = queryset.filter(
+                Q(**{f"{self.key}__{op}e": key_value})
+                & (
+                    Q(**{f"{self.key}__{op}": key_value})
+                    | Q(**{f"{self.tie}__{op}": tie_value})
+                )
+            )
+        return queryset[: self.page_size + 1]
+
+    def filter_list(self, rows):
+        """
+        Same as filter_queryset for model instances already in memory
+        """
+        key_path = self.key.split("__")
+        tie_path = self.tie.split("__")
+        position = lambda row: (read_path(row, key_path), read_path(row, tie_path))
+
+        rows = sorted(rows, key=position, reverse=self.descending)
+        if self.after is not None and rows:
+            self.check_kinds(position(rows[0]))
+            if self.descending:
+                rows = [row for row in rows if position(row) < self.after]
+            else:
+                rows = [row for row in rows if position(row) > self.after]
+        return rows[: self.page_size + 1]
+
+    def typed_position(self, model):
+        """
+        The position converted to the types of the key and tie fields
+        Raises InvalidCursor when a value does not fit its field
+        """
+        fields = [lookup_field(model, self.key), lookup_field(model, self.tie)]
+        try:
+            return tuple(
+                field.to_python(value) for field, value in zip(fields, self.after)
+            )
+        except ValidationError:
+            raise InvalidCursor(self.after)
+
+    def check_kinds(self, sample):
+        """
+        Raise InvalidCursor unless the position holds a string wherever the
+        position of a row does, so the two can be compared
+        """
+        for value, expected in zip(self.after, sample):
+            if isinstance(value, str) != isinstance(expected, str):
+                raise InvalidCursor(self.after)
+
+    def trim_rows(self, rows):
+        """
+        Drop the extra row of a page read with filter_list
+        Returns the rows and the position to continue from, None on the last page
+        """
+        return self.trim(rows, self.key.split("__"), self.tie.split("__"))
+
+    def trim(self, data, key_path, tie_path):
+        """
+        Drop the extra row of a page
+        Returns the rows and the position to continue from, None on the last page
+        """
+        if len(data) <= self.page_size:
+            return list(data), None
+        data = list(data[: self.page_size])
+        return data, [read_path(data[-1], key_path), read_path(data[-1], tie_path)]
+
+
+def approximate_total(queryset, params):
+    """
+    Row count of a filtered list, reused for a few minutes by every page of
+    the same filter instead of being counted on each request
+    """
+    digest = hashlib.sha1(
+        json.dumps(params, sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+    key = f"products:approximate-total:{digest}"
+    total = cache.get(key)
+    if total is None:
+        total = len(queryset) if isinstance(queryset, list) else queryset.count()
+        cache.set(key, total, APPROXIMATE_TOTAL_TTL)
+    return total
@@ -0,0 +1,223 @@
+"""
+Shared querysets for product list endpoints
+"""
+
+from django.db.models import Min, OuterRef, Subquery, FloatField
+from .pagination import KeysetPage
+from .models import (
+    FinancialProduct,
+    DepositProduct,
+    SavingProduct,
+    LoanProduct,
+    MortgageLoanOption,
+    CreditLoanOption,
+    TermRate,
+    UserProduct,
+    RateHistory,
+)
+
+DEPOSIT_CATEGORY = "예금"
+SAVING_CATEGORY = "적금"
+
+# Relations read by LoanProductDetailSerializer
+LOAN_DETAIL_RELATIONS = [
+    "product__mortgage_options",
+    "product__credit_options",
+    "product__lending_rate_options",
+    "product__loan_joinways",
+]
+
+
+def term_rate_queryset(category, term=None):
+    """
+    TermRate rows of a category (and optionally a term), best max rate first
+    Served by the (category, save_trm, -intr_rate2) index
+    """
+    queryset = TermRate.objects.filter(category=category)
+    if term is not None:
+        queryset = queryset.filter(save_trm=term)
+    return queryset.select_related("product").order_by("-intr_rate2")
+
+
+def best_rate_per_product(rows, limit=None):
+    """
+    Row with the highest max rate of each product, in the order of rows
+
+    The best row is picked by a subquery ordered by -intr_rate2, so it does
+    not depend on how the caller sorted rows.
+    """
+    best_rows = rows.filter(
+        pk=Subquery(
+            rows.filter(product_id=OuterRef("product_id"))
+            .order_by("-intr_rate2", "pk")
+            .values("pk")[:1]
+        )
+    )
+    return best_rows[:limit] if limit is not None else best_rows
+
+
+def loan_queryset():
+    """
+    Loan products with every relation the detail serializer reads
+    """
+    return LoanProduct.objects.select_related("product").prefetch_related(
+        *LOAN_DETAIL_RELATIONS
+    )
+
+
+def top_deposits(limit):
+    """
+    Deposit detail rows with the highest max rate
+    """
+    return DepositProduct.objects.select_related("product").order_by("-intr_rate2")[
+        :limit
+    ]
+
+
+def top_savings(limit):
+    """
+    Saving detail rows with the highest max rate
+    """
+    return SavingProduct.objects.select_related("product").order_by("-intr_rate2")[
+        :limit
+    ]
+
+
+def top_term_rates(category, term, limit):
+    """
+    Best TermRate row of the products with the highest max rate for a term
+    """
+    return best_rate_per_product(term_rate_queryset(category, term), limit)
+
+
+def top_rate_loans(limit):
+    """
+    Loans ordered by their lowest mortgage rate, or by their lowest grade 1
+    credit rate when no mortgage loan has a rate
+    """
+    mortgage_options_subquery = (
+        MortgageLoanOption.objects.filter(product_id=OuterRef("product_id"))
+        .order_by("lend_rate_min")
+        .values("lend_rate_min")[:1]
+    )
+    credit_options_subquery = (
+        CreditLoanOption.objects.filter(product_id=OuterRef("product_id"))
+        .order_by("crdt_grad_1")
+        .values("crdt_grad_1")[:1]
+    )
+
+    loans = loan_queryset()
+    loans_with_min_mortgage_rate = (
+        loans.annotate(
+            min_rate=Subquery(mortgage_options_subquery, output_field=FloatField())
+        )
+        .filter(min_rate__isnull=False)
+        .order_by("min_rate")[:limit]
+    )
+    if loans_with_min_mortgage_rate.exists():
+        return loans_with_min_mortgage_rate
+
+    return (
+        loans.annotate(
+            min_rate=Subquery(credit_options_subquery, output_field=FloatField())
+        )
+        .filter(min_rate__isnull=False)
+        .order_by("min_rate")[:limit]
+    )
+
+
+def lowest_rate_loans(limit):
+    """
+    Loans with the lowest mortgage rates, lowest first
+    """
+    min_rates = (
+        MortgageLoanOption.objects.values("product")
+        .annotate(min_rate=Min("lend_rate_min"))
+        .order_by("min_rate")[:limit]
+    )
+    ranks = {item["product"]: rank for rank, item in enumerate(min_rates)}
+    loans = loan_queryset().filter(product__fin_prdt_cd__in=list(ranks))
+    return sorted(loans, key=lambda loan: ranks[loan.product_id])
+
+
+def hot_queries():
+    """
+    Representative querysets of the product endpoints, as (name, queryset)
+
+    Every query here must be answered through an index; the
+    check_query_plans command fails when one of them scans a whole table.
+    """
+    return [
+        (
+            "financial products by company",
+            FinancialProduct.objects.order_by("kor_co_nm", "fin_prdt_nm"),
+        ),
+        (
+            "financial products by loan type",
+            FinancialProduct.objects.filter(loan_type="주택담보대출"),
+        ),
+        (
+            "deposits by max rate",
+            DepositProduct.objects.select_related("product").order_by("-intr_rate2"),
+        ),
+        (
+            "deposits of a term by max rate",
+            DepositProduct.objects.select_related("product")
+            .filter(save_trm=12)
+            .order_by("-intr_rate2"),
+        ),
+        (
+            "savings by max rate",
+            SavingProduct.objects.select_related("product").order_by("-intr_rate2"),
+        ),
+        (
+            "savings of a term by max rate",
+            SavingProduct.objects.select_related("product")
+            .filter(save_trm=12)
+            .order_by("-intr_rate2"),
+        ),
+        (
+            "deposits after a cursor",
+            KeysetPage("intr_rate2", "product_id", True, 10, (3.5, "")).filter_queryset(
+                DepositProduct.objects.all()
+            ),
+        ),
+        ("deposit term rates", term_rate_queryset(DEPOSIT_CATEGORY, 12)),
+        ("saving term rates", term_rate_queryset(SAVING_CATEGORY, 12)),
+        (
+            "lowest mortgage rate of a product",
+            MortgageLoanOption.objects.filter(product_id="")
+            .order_by("lend_rate_min")
+            .values("lend_rate_min")[:1],
+        ),
+        (
+            "lowest credit rate of a product",
+            CreditLoanOption.objects.filter(product_id="")
+            .order_by("crdt_grad_1")
+            .values("crdt_grad_1")[:1],
+        ),
+        (
+            "rate history of a product",
+            RateHistory.objects.filter(product_id="", dcls_month__gte="202401")
+            .order_by("option", "dcls_month")
+            .values_list("option", "dcls_month", "rate", "max_rate"),
+        ),
+        (
+            "latest deposit disclosure",
+            DepositProduct.objects.order_by("-dcls_month").values("dcls_month")[:1],
+        ),
+        (
+            "latest saving disclosure",
+            SavingProduct.objects.order_by("-dcls_month").values("dcls_month")[:1],
+        ),
+        (
+            "latest loan disclosure",
+            LoanProduct.objects.order_by("-dcls_month").values("dcls_month")[:1],
+        ),
+        (
+            "recent favorites of a user",
+            UserProduct.objects.select_related("product")
+            .filter(user_id=0)
+            .order_by("-created_at"),
+        ),
+    ]
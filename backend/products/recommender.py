@@ -0,0 +1,275 @@
+"""
+Deterministic rule-based product recommender
+
+Every deposit, saving and loan is kept in a compact matrix (kind, company,
+rate, term) per data version. A user's recommendations are scored over the
+whole matrix in one NumPy pass: deposits and savings by their max rate,
+less TERM_PENALTY rate points per month away from the preferred term,
+loans by their lowest rate. The best products of the user's favorite
+institutions come first, followed by the best of the others.
+
+Without an explicit term, the preferred term comes from the user's salary
+and money: the fewer months of salary their assets cover, the shorter the
+term, so that thin reserves are not locked away. The catalogue has no
+amount limits, so this bucketed term is the only effect of the amounts.
+
+The serialized result only depends on the favorite institutions, the
+product kinds the user follows and the preferred term, so it is memoized
+in Django's cache under that key and the data version.
+"""
+
+import hashlib
+import json
+import logging
+import time
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Min
+from django.dispatch import receiver
+from .models import (
+    DepositProduct,
+    SavingProduct,
+    LoanProduct,
+    MortgageLoanOption,
+    LendingRateOption,
+    CreditLoanOption,
+)
+from .queries import loan_queryset
+from .serializers import (
+    DepositProductSerializer,
+    SavingProductSerializer,
+    LoanProductDetailSerializer,
+)
+from .signals import products_refreshed
+from .versioning import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:recommender"
+
+# Seconds a memoized result is kept, results of old versions are never read
+RESULT_TTL = 60 * 60
+
+KINDS = ["deposits", "savings", "loans"]
+
+# Products picked from the favorite institutions and from the others
+FAVORITE_PICKS = 3
+OTHER_PICKS = 2
+
+# Rate points a deposit or saving loses per month away from the preferred term
+TERM_PENALTY = 0.05
+
+# (months of salary covered by the user's money, preferred term) buckets,
+# larger reserves prefer LONG_TERM
+RESERVE_TERMS = [(6, 6), (24, 12)]
+LONG_TERM = 24
+
+
+def profile_term(salary, money):
+    """
+    Preferred term in months for a yearly salary and money, None when the
+    salary is unknown
+    """
+    if not salary or salary <= 0:
+        return None
+    covered_months = max(money or 0, 0) / (salary / 12)
+    for limit, term in RESERVE_TERMS:
+        if covered_months < limit:
+            return term
+    return LONG_TERM
+
+
+class ProductMatrix:
+    """
+    Kind, company, rate and term of every product as parallel arrays
+    """
+
+    def __init__(self, rows, version=None):
+        self.version = version
+        rows = sorted(rows, key=lambda row: (row["kind"], row["code"]))
+        self.codes = [row["code"] for row in rows]
+        self.companies = sorted({row["company"] for row in rows})
+        company_ids = {company: i for i, company in enumerate(self.companies)}
+
+        self.kinds = np.array([KINDS.index(row["kind"]) for row in rows], dtype=np.int8)
+        self.company_ids = np.array(
+            [company_ids[row["company"]] for row in rows], dtype=np.int32
+        )
+        self.rates = np.array(
+            [np.nan if row["rate"] is None else row["rate"] for row in rows],
+            dtype=float,
+        )
+        self.terms = np.array([row["term"] or 0 for row in rows], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def scores(self, term=None):
+        """
+        Score of every product for a preferred term, higher is better
+        """
+        is_loan = self.kinds == KINDS.index("loans")
+        scores = np.where(is_loan, -self.rates, self.rates)
+        if term is not None:
+            scores = scores - np.where(
+                is_loan, 0.0, TERM_PENALTY * np.abs(self.terms - term)
+            )
+        # Products without a rate come last
+        return np.where(np.isnan(scores), -np.inf, scores)
+
+    def recommend(self, institutions, kinds, term=None):
+        """
+        Product codes per kind, best first
+        """
+        scores = self.scores(term)
+        favorite_ids = [
+            i for i, company in enumerate(self.companies) if company in institutions
+        ]
+        favorite = np.isin(self.company_ids, favorite_ids)
+
+        def best(mask, count):
+            positions = np.flatnonzero(mask)
+            # Rows are sorted by code, a stable sort keeps it for ties
+            order = positions[np.argsort(-scores[positions], kind="stable")]
+            return [self.codes[i] for i in order[:count].tolist()]
+
+        picks = {}
+        for kind in kinds:
+            of_kind = self.kinds == KINDS.index(kind)
+            if institutions:
+                picks[kind] = best(of_kind & favorite, FAVORITE_PICKS) + best(
+                    of_kind & ~favorite, OTHER_PICKS
+                )
+            else:
+                picks[kind] = best(of_kind, FAVORITE_PICKS)
+        return picks
+
+
+def read_products():
+    """
+    Matrix rows of every product, loans rated by their lowest option rate
+    """
+    rows = []
+    for kind, model in [("deposits", DepositProduct), ("savings", SavingProduct)]:
+        for code, company, rate, term in model.objects.values_list(
+            "product_id", "product__kor_co_nm", "intr_rate2", "save_trm"
+        ):
+            rows.append(
+                {
+                    "kind": kind,
+                    "code": code,
+                    "company": company,
+                    "rate": rate,
+                    "term": term,
+                }
+            )
+
+    loan_rates = {}
+    for options in [
+        MortgageLoanOption.objects.values("product_id").annotate(
+            rate=Min("lend_rate_min")
+        ),
+        LendingRateOption.objects.values("product_id").annotate(
+            rate=Min("lend_rate_min")
+        ),
+        CreditLoanOption.objects.filter(crdt_lend_rate_type="A")
+        .values("product_id")
+        .annotate(rate=Min("crdt_grad_1")),
+    ]:
+        for option in options:
+            rate = option["rate"]
+            if rate and rate > 0:
+                current = loan_rates.get(option["product_id"])
+                loan_rates[option["product_id"]] = (
+                    rate if current is None else min(current, rate)
+                )
+    for code, company in LoanProduct.objects.values_list(
+        "product_id", "product__kor_co_nm"
+    ):
+        rows.append(
+            {
+                "kind": "loans",
+                "code": code,
+                "company": company,
+                "rate": loan_rates.get(code),
+                "term": None,
+            }
+        )
+    return rows
+
+
+def build_product_matrix(version=None):
+    build_start = time.time()
+    matrix = ProductMatrix(read_products(), version)
+    logger.info(
+        f"Built recommender matrix of {len(matrix)} products in {time.time() - build_start:.3f} seconds"
+    )
+    return matrix
+
+
+product_matrix = VersionedIndex(VERSION_KEY, build_product_matrix)
+
+
+def invalidate_recommendations():
+    """
+    Move the data version so that every process rebuilds its matrix and no
+    memoized result is read again
+    """
+    product_matrix.invalidate()
+
+
+def get_product_matrix():
+    """
+    Matrix of this process, rebuilt when the data version moved
+    """
+    return product_matrix.get()
+
+
+def serialize_picks(picks):
+    """
+    Serialize the picked products of each kind in their ranking order
+    """
+    sources = {
+        "deposits": (
+            DepositProduct.objects.select_related("product"),
+            DepositProductSerializer,
+        ),
+        "savings": (
+            SavingProduct.objects.select_related("product"),
+            SavingProductSerializer,
+        ),
+        "loans": (loan_queryset(), LoanProductDetailSerializer),
+    }
+    data = {}
+    for kind, codes in picks.items():
+        queryset, serializer_class = sources[kind]
+        rows = {row.product_id: row for row in queryset.filter(product_id__in=codes)}
+        ordered = [rows[code] for code in codes if code in rows]
+        data[kind] = serializer_class(ordered, many=True).data
+    return data
+
+
+def recommend_products(institutions, kinds, term=None):
+    """
+    Serialized recommendations per kind, memoized per (favorite institutions,
+    kinds, preferred term) and data version
+    """
+    matrix = get_product_matrix()
+    profile = json.dumps(
+        [sorted(institutions), sorted(kinds), term], ensure_ascii=False
+    )
+    key = (
+        f"products:recommendations:{matrix.version}:"
+        f"{hashlib.sha1(profile.encode()).hexdigest()}"
+    )
+    data = cache.get(key)
+    if data is None:
+        data = serialize_picks(matrix.recommend(set(institutions), kinds, term))
+        cache.set(key, data, RESULT_TTL)
+    return data
+
+
+@receiver(products_refreshed)
+def refresh_recommendations(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        invalidate_recommendations()
@@ -0,0 +1,251 @@
+"""
+Vectorized loan repayment simulator
+
+Mortgage and rent loan options are kept in NumPy arrays per data version.
+For a term, the monthly payments of every option under equal-principal
+(원금균등), equal-installment (원리금균등) and bullet (만기일시) repayment are
+computed as one (options x months) matrix per method. Every payment is
+proportional to the amount, so schedules are computed for 1 won and the
+rankings of a term are cached once in Django's cache for every amount; a
+response only scales them to the requested amount.
+"""
+
+import logging
+import time
+import numpy as np
+from django.core.cache import cache
+from django.dispatch import receiver
+from .history import option_key
+from .models import MortgageLoanOption, LendingRateOption
+from .signals import products_refreshed
+from .versioning import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:repayment"
+
+# Seconds a ranking is reused, rankings of old versions are never read again
+RANKING_TTL = 60 * 60
+
+MAX_TERM = 480
+
+MAX_RANKED = 100
+
+RENT_LOAN_TYPE = "전세자금대출"
+
+METHODS = ["equal_principal", "equal_installment", "bullet"]
+
+# Methods offered for each finlife rpay_type, any other type allows all
+METHODS_BY_RPAY_TYPE = {
+    "D": ["equal_principal", "equal_installment"],  # 분할상환방식
+    "S": ["bullet"],  # 만기일시상환방식
+}
+
+
+def schedules(rates, term):
+    """
+    Monthly payments per won borrowed, one (options x term) matrix per method
+    """
+    monthly = np.asarray(rates, dtype=float)[:, None] / 1200
+    months = np.arange(1, term + 1)[None, :]
+
+    # Interest on the balance left before each month's principal
+    balance = 1 - (months - 1) / term
+    equal_principal = 1 / term + balance * monthly
+
+    growth = np.power(1 + monthly, term)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        installment = np.where(monthly > 0, monthly * growth / (growth - 1), 1 / term)
+    equal_installment = np.broadcast_to(installment, (len(rates), term))
+
+    bullet = np.broadcast_to(monthly, (len(rates), term)).copy()
+    bullet[:, -1] += 1
+
+    return {
+        "equal_principal": equal_principal,
+        "equal_installment": equal_installment,
+        "bullet": bullet,
+    }
+
+
+class LoanOptionTable:
+    """
+    Loan options with a repayment type and rates, as parallel arrays
+    """
+
+    def __init__(self, options, version=None):
+        self.version = version
+        self.options = [
+            option
+            for option in options
+            if option["lend_rate_min"] and option["lend_rate_min"] > 0
+        ]
+        self.min_rates = np.array(
+            [option["lend_rate_min"] for option in self.options], dtype=float
+        )
+        # Options without a max rate are charged their min rate
+        self.max_rates = np.array(
+            [
+                max(option["lend_rate_max"] or 0, option["lend_rate_min"])
+                for option in self.options
+            ],
+            dtype=float,
+        )
+        self.allowed = np.array(
+            [
+                [
+                    method in METHODS_BY_RPAY_TYPE.get(option["rpay_type"], METHODS)
+                    for method in METHODS
+                ]
+                for option in self.options
+            ],
+            dtype=bool,
+        ).reshape(len(self.options), len(METHODS))
+
+    def __len__(self):
+        return len(self.options)
+
+    def rankings(self, term, use_max_rate=False, limit=MAX_RANKED):
+        """
+        (option, method) pairs per won, by total interest and by monthly payment
+
+        The monthly payment is the first one, the largest for equal-principal
+        repayment. Bullet loans only pay interest until the final payment
+        repays the amount, so they are ranked by total interest only.
+        """
+        rates = self.max_rates if use_max_rate else self.min_rates
+        payments = schedules(rates, term)
+
+        # (options x methods) summaries
+        total = np.stack([payments[m].sum(axis=1) for m in METHODS], axis=1)
+        monthly = np.stack([payments[m][:, 0] for m in METHODS], axis=1)
+        final = np.stack([payments[m][:, -1] for m in METHODS], axis=1)
+
+        pairs = np.flatnonzero(self.allowed.ravel())
+        installment_pairs = pairs[pairs % len(METHODS) != METHODS.index("bullet")]
+        rows = {}
+
+        def ranked(values, pairs):
+            order = pairs[np.argsort(values.ravel()[pairs], kind="stable")][:limit]
+            result = []
+            for pair in order.tolist():
+                position, method_index = divmod(pair, len(METHODS))
+                if pair not in rows:
+                    rows[pair] = {
+                        **self.options[position],
+                        "rate": float(rates[position]),
+                        "method": METHODS[method_index],
+                        "monthly_payment": float(monthly.ravel()[pair]),
+                        "final_payment": float(final.ravel()[pair]),
+                        "total_interest": float(total.ravel()[pair] - 1),
+                    }
+                result.append(rows[pair])
+            return result
+
+        return {
+            "total_interest": ranked(total, pairs),
+            "monthly_payment": ranked(monthly, installment_pairs),
+        }
+
+
+def read_loan_options():
+    """
+    Mortgage options and the options of rent loans, sorted by product code
+    Mortgage lending rate options repeat their mortgage options
+    """
+    fields = [
+        "product_id",
+        "product__fin_prdt_nm",
+        "product__kor_co_nm",
+        "product__loan_type",
+        "rpay_type",
+        "lend_rate_type",
+        "lend_rate_min",
+        "lend_rate_max",
+    ]
+    mortgages = MortgageLoanOption.objects.values("mrtg_type", *fields)
+    rents = LendingRateOption.objects.filter(product__loan_type=RENT_LOAN_TYPE).values(
+        *fields
+    )
+
+    options = []
+    for row in list(mortgages) + list(rents):
+        key = [row.pop("mrtg_type", None), row["rpay_type"], row["lend_rate_type"]]
+        options.append(
+            {
+                "fin_prdt_cd": row["product_id"],
+                "fin_prdt_nm": row["product__fin_prdt_nm"],
+                "kor_co_nm": row["product__kor_co_nm"],
+                "loan_type": row["product__loan_type"],
+                "option": option_key([value for value in key if value is not None]),
+                "rpay_type": row["rpay_type"],
+                "lend_rate_type": row["lend_rate_type"],
+                "lend_rate_min": row["lend_rate_min"],
+                "lend_rate_max": row["lend_rate_max"],
+            }
+        )
+    options.sort(key=lambda option: (option["fin_prdt_cd"], option["option"]))
+    return options
+
+
+def build_loan_option_table(version=None):
+    build_start = time.time()
+    table = LoanOptionTable(read_loan_options(), version)
+    logger.info(
+        f"Built loan option table of {len(table)} options in {time.time() - build_start:.3f} seconds"
+    )
+    return table
+
+
+loan_option_table = VersionedIndex(VERSION_KEY, build_loan_option_table)
+
+
+def invalidate_repayment_rankings():
+    """
+    Move the data version so that every process rebuilds its table and no
+    cached ranking is read again
+    """
+    loan_option_table.invalidate()
+
+
+def get_loan_option_table():
+    """
+    Table of this process, rebuilt when the data version moved
+    """
+    return loan_option_table.get()
+
+
+def scale(row, amount):
+    """
+    Row of a per-won ranking for an amount, payments rounded to the won
+    """
+    scaled = dict(row)
+    for field in ["monthly_payment", "final_payment", "total_interest"]:
+        scaled[field] = int(round(row[field] * amount))
+    scaled["total_payment"] = amount + scaled["total_interest"]
+    return scaled
+
+
+def simulate_repayments(amount, term, use_max_rate=False, limit=20):
+    """
+    Loan options ranked by total interest and by monthly payment for amount
+    """
+    table = get_loan_option_table()
+    key = (
+        f"products:repayment:{table.version}:{term}:{'max' if use_max_rate else 'min'}"
+    )
+    rankings = cache.get(key)
+    if rankings is None:
+        rankings = table.rankings(term, use_max_rate)
+        cache.set(key, rankings, RANKING_TTL)
+
+    return {
+        name: [scale(row, amount) for row in rows[:limit]]
+        for name, rows in rankings.items()
+    }
+
+
+@receiver(products_refreshed)
+def refresh_repayment_rankings(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        invalidate_repayment_rankings()
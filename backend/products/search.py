@@ -0,0 +1,197 @@
+"""
+In-memory n-gram search index over the product catalogue
+
+Product names, institutions, join members and join ways are normalized
+(lowercase, no spaces) and indexed by their unigrams and bigrams, names
+and institutions also by their choseong (initial consonant) form, so that
+"국민" finds "KB국민은행" and "ㄱㅁ" finds "국민은행". Each process keeps
+its own index and rebuilds it when the version published in the database
+moves, which happens after every refresh and admin edit.
+"""
+
+import logging
+import time
+from django.dispatch import receiver
+from .models import FinancialProduct
+from .signals import products_refreshed
+from .versioning import VersionedIndex
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "products:search-index"
+
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+
+# Indexed fields and their weight in the ranking
+FIELD_WEIGHTS = {
+    "fin_prdt_nm": 3.0,
+    "kor_co_nm": 2.0,
+    "join_member": 0.5,
+    "join_way": 0.5,
+}
+
+# Fields also indexed by their choseong form
+CHOSEONG_FIELDS = ["fin_prdt_nm", "kor_co_nm"]
+
+
+def normalize(text):
+    return "".join((text or "").lower().split())
+
+
+def to_choseong(text):
+    """
+    Replace every Hangul syllable with its initial consonant
+    """
+    letters = []
+    for letter in text:
+        offset = ord(letter) - 0xAC00
+        if 0 <= offset < 11172:
+            letters.append(CHOSEONG[offset // 588])
+        else:
+            letters.append(letter)
+    return "".join(letters)
+
+
+def has_choseong(text):
+    return any(letter in CHOSEONG for letter in text)
+
+
+def ngrams(text):
+    """
+    Unigrams and bigrams of a normalized text
+    """
+    grams = set(text)
+    grams.update(text[i : i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+def query_grams(query):
+    """
+    The fewest grams that every matching text must contain
+    """
+    if len(query) == 1:
+        return {query}
+    return {query[i : i + 2] for i in range(len(query) - 1)}
+
+
+class SearchIndex:
+    """
+    Inverted n-gram index of normalized product texts
+    """
+
+    def __init__(self, products, version=None):
+        self.version = version
+        self.codes = []
+        self.texts = []
+        self.choseong_texts = []
+        self.postings = {}
+        self.choseong_postings = {}
+
+        for product in products:
+            doc = len(self.codes)
+            texts = {field: normalize(product[field]) for field in FIELD_WEIGHTS}
+            choseong_texts = {
+                field: to_choseong(texts[field]) for field in CHOSEONG_FIELDS
+            }
+            self.codes.append(product["fin_prdt_cd"])
+            self.texts.append(texts)
+            self.choseong_texts.append(choseong_texts)
+            for text in texts.values():
+                for gram in ngrams(text):
+                    self.postings.setdefault(gram, set()).add(doc)
+            for text in choseong_texts.values():
+                for gram in ngrams(text):
+                    self.choseong_postings.setdefault(gram, set()).add(doc)
+
+    def candidates(self, query, postings):
+        matches = None
+        for gram in sorted(query_grams(query), key=lambda g: len(postings.get(g, ()))):
+            docs = postings.get(gram)
+            if not docs:
+                return set()
+            matches = set(docs) if matches is None else matches & docs
+            if not matches:
+                break
+        return matches or set()
+
+    def score(self, query, texts):
+        """
+        Sum of the weights of the fields containing the query, doubled for a
+        prefix match and raised for short fields
+        """
+        score = 0.0
+        for field, text in texts.items():
+            position = text.find(query)
+            if position < 0:
+                continue
+            weight = FIELD_WEIGHTS[field]
+            score += weight * (2.0 if position == 0 else 1.0)
+            score += weight * len(query) / len(text)
+        return score
+
+    def search(self, query, limit=None):
+        """
+        Ranked (product code, score) pairs of the products matching query
+        """
+        query = normalize(query)
+        if not query:
+            return []
+
+        if has_choseong(query):
+            query = to_choseong(query)
+            docs = self.candidates(query, self.choseong_postings)
+            scored = [
+                (self.score(query, self.choseong_texts[doc]), doc) for doc in docs
+            ]
+        else:
+            docs = self.candidates(query, self.postings)
+            scored = [(self.score(query, self.texts[doc]), doc) for doc in docs]
+
+        ranked = sorted(
+            ((self.codes[doc], score) for score, doc in scored if score > 0),
+            key=lambda item: (-item[1], item[0]),
+        )
+        return ranked[:limit] if limit is not None else ranked
+
+
+def build_search_index(version=None):
+    """
+    Build an index from every product of the catalogue
+    """
+    build_start = time.time()
+    products = FinancialProduct.objects.values("fin_prdt_cd", *FIELD_WEIGHTS)
+    index = SearchIndex(products, version)
+    logger.info(
+        f"Built search index of {len(index.codes)} products in {time.time() - build_start:.3f} seconds"
+    )
+    return index
+
+
+search_index = VersionedIndex(VERSION_KEY, build_search_index)
+
+
+def invalidate_search_index():
+    """
+    Move the catalogue version so that every process rebuilds its index
+    """
+    search_index.invalidate()
+
+
+def get_search_index():
+    """
+    Index of this process, rebuilt when the catalogue version moved
+    """
+    return search_index.get()
+
+
+def search_products(query, limit=None):
+    """
+    Ranked (product code, score) pairs of the products matching query
+    """
+    return get_search_index().search(query, limit)
+
+
+@receiver(products_refreshed)
+def refresh_search_index(sender, change_set, **kwargs):
+    if change_set.changed_products:
+        invalidate_search_index()
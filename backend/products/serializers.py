@@ -1,3 +1,5 @@
+from functools import lru_cache
+from types import SimpleNamespace
 from rest_framework import serializers
 from .models import (
     FinancialProduct,
@@ -11,6 +13,7 @@ from .models import (
     LoanProduct_JoinWay,
     LendingRateOption,
     UserProduct,
+    TermRate,
 )
 
 
@@ -19,7 +22,7 @@ class FinancialProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = FinancialProduct
-        fields = "__all__"
+        exclude = ["content_hash"]
 
     def get_join_way(self, obj):
         if obj.join_way and isinstance(obj.join_way, str):
@@ -32,7 +35,7 @@ class DepositProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DepositProduct
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class SavingProductSerializer(serializers.ModelSerializer):
@@ -40,7 +43,15 @@ class SavingProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SavingProduct
-        fields = "__all__"
+        exclude = ["content_hash"]
+
+
+class TermRateSerializer(serializers.ModelSerializer):
+    financial_product = FinancialProductSerializer(source="product", read_only=True)
+
+    class Meta:
+        model = TermRate
+        exclude = ["id", "content_hash"]
 
 
 class LoanProductSerializer(serializers.ModelSerializer):
@@ -48,25 +59,25 @@ class LoanProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LoanProduct
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class MortgageLoanOptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = MortgageLoanOption
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class CreditLoanOptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = CreditLoanOption
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class RequirementOptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = RequirementOption
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class DepositProduct_JoinWaySerializer(serializers.ModelSerializer):
@@ -84,7 +95,7 @@ class LoanProduct_JoinWaySerializer(serializers.ModelSerializer):
 class LendingRateOptionSerializer(serializers.ModelSerializer):
     class Meta:
         model = LendingRateOption
-        fields = "__all__"
+        exclude = ["content_hash"]
 
 
 class UserProductSerializer(serializers.ModelSerializer):
@@ -134,7 +145,7 @@ class DepositProductDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DepositProduct
-        exclude = ["product"]
+        exclude = ["product", "content_hash"]
 
 
 class SavingProductDetailSerializer(serializers.ModelSerializer):
@@ -148,7 +159,7 @@ class SavingProductDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SavingProduct
-        exclude = ["product"]
+        exclude = ["product", "content_hash"]
 
 
 class LoanProductDetailSerializer(serializers.ModelSerializer):
@@ -168,4 +179,91 @@ class LoanProductDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = LoanProduct
-        exclude = ["product"]
+        exclude = ["product", "content_hash"]
+
+
+class FlatRowSerializer:
+    """
+    Read-only fast path producing the output of a ModelSerializer from
+    .values() rows
+
+    Nested serializer fields are flattened into lookups through their
+    source (e.g. product__kor_co_nm), so a list is read with one query and
+    no model instances. Plain fields keep their to_representation and
+    method fields get a namespace of the model's columns, which keeps the
+    rendered output identical to serializer_class(many=True).
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.lookups = []
+        self.plan = self.compile(serializer_class())
+
+    def compile(self, serializer, prefix=""):
+        plan = []
+        for field in serializer.fields.values():
+            if isinstance(field, serializers.BaseSerializer):
+                nested_plan = self.compile(field, f"{prefix}{field.source}__")
+                plan.append((field.field_name, "nested", None, nested_plan))
+            elif isinstance(field, serializers.SerializerMethodField):
+                columns = {}
+                for model_field in serializer.Meta.model._meta.concrete_fields:
+                    columns[model_field.attname] = f"{prefix}{model_field.attname}"
+                self.add_lookups(columns.values())
+                plan.append(
+                    (field.field_name, "method", columns, field.to_representation)
+                )
+            elif isinstance(field, serializers.RelatedField):
+                self.add_lookups([f"{prefix}{field.source}"])
+                plan.append(
+                    (field.field_name, "value", f"{prefix}{field.source}", None)
+                )
+            else:
+                self.add_lookups([f"{prefix}{field.source}"])
+                plan.append(
+                    (
+                        field.field_name,
+                        "value",
+                        f"{prefix}{field.source}",
+                        field.to_representation,
+                    )
+                )
+        return plan
+
+    def add_lookups(self, lookups):
+        for lookup in lookups:
+            if lookup not in self.lookups:
+                self.lookups.append(lookup)
+
+    def render_row(self, row, plan):
+        data = {}
+        for name, kind, lookup, to_representation in plan:
+            if kind == "value":
+                value = row[lookup]
+                if value is not None and to_representation is not None:
+                    value = to_representation(value)
+                data[name] = value
+            elif kind == "nested":
+                data[name] = self.render_row(row, to_representation)
+            else:
+                columns = SimpleNamespace(
+                    **{attname: row[column] for attname, column in lookup.items()}
+                )
+                data[name] = to_representation(columns)
+        return data
+
+    def serialize(self, queryset):
+        """
+        Serialize a queryset of the serializer's model to a list of dicts
+        """
+        return [
+            self.render_row(row, self.plan) for row in queryset.values(*self.lookups)
+        ]
+
+
+@lru_cache(maxsize=None)
+def flat_serializer(serializer_class):
+    """
+    Compiled FlatRowSerializer of a serializer class, built once per class
+    """
+    return FlatRowSerializer(serializer_class)
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after a product type refresh has been committed.
+# Receivers get the ChangeSet of the refresh as ``change_set``.
+products_refreshed = Signal()
@@ -0,0 +1,58 @@
+"""
+Request coalescing: concurrent callers of the same key share one call
+"""
+
+import threading
+
+
+class SingleFlight:
+    """
+    Run a function once per key at a time, concurrent callers share its result
+    or its exception
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> (done event, [result], [exception])
+
+    def do(self, key, function):
+        """
+        Returns the result and whether it was shared from another caller
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = (threading.Event(), [], [])
+                self.calls[key] = call
+        done, result, error = call
+
+        if not leader:
+            done.wait()
+            if error:
+                if not isinstance(error[0], Exception):
+                    # The leader was interrupted (SystemExit, GeneratorExit...),
+                    # which is not the followers' to re-raise
+                    raise RuntimeError(
+                        f"Shared call for {key} was interrupted"
+                    ) from error[0]
+                raise error[0]
+            return result[0], True
+
+        try:
+            result.append(function())
+        except BaseException as e:
+            error.append(e)
+            raise
+        finally:
+            # Followers are released however the leader left
+            try:
+                with self.lock:
+                    self.calls.pop(key, None)
+            finally:
+                done.set()
+        return result[0], False
+
+    def in_flight(self, key):
+        with self.lock:
+            return key in self.calls
@@ -0,0 +1,151 @@
+"""
+Catalogue statistics materialized once per refresh
+
+The counts and rate aggregates of the statistics endpoint are computed at
+the end of every ingestion run and stored as a ProductStatistics row, whose
+id is the snapshot version. Requests read the latest row instead of
+scanning every product table.
+"""
+
+import logging
+import time
+from itertools import groupby
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Round
+from .models import (
+    FinancialProduct,
+    DepositProduct,
+    SavingProduct,
+    LoanProduct,
+    MortgageLoanOption,
+    CreditLoanOption,
+    TermRate,
+    ProductStatistics,
+)
+
+logger = logging.getLogger(__name__)
+
+# Snapshots kept besides the latest one
+KEPT_SNAPSHOTS = 10
+
+PERCENTILES = [10, 25, 50, 75, 90]
+
+TOP_INSTITUTIONS = 5
+
+
+def percentile(values, rank):
+    """
+    Linearly interpolated percentile of sorted values
+    """
+    position = (len(values) - 1) * rank / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def distribution(values):
+    """
+    Count, bounds and percentiles of sorted rates
+    """
+    summary = {"count": len(values), "min": values[0], "max": values[-1]}
+    for rank in PERCENTILES:
+        summary[f"p{rank}"] = round(percentile(values, rank), 2)
+    return summary
+
+
+def term_distributions():
+    """
+    Best rate distribution per category and saving term, from one ordered scan
+    """
+    rows = TermRate.objects.order_by("category", "save_trm", "intr_rate2").values_list(
+        "category", "save_trm", "intr_rate2"
+    )
+    distributions = {}
+    for (category, term), group in groupby(rows, key=lambda row: row[:2]):
+        distributions.setdefault(category, {})[str(term)] = distribution(
+            [rate for _, _, rate in group]
+        )
+    return distributions
+
+
+def compute_statistics():
+    """
+    Every aggregate served by the statistics endpoint
+    """
+    rate_aggregates = lambda low, high: {
+        "avg_rate": Round(Avg(low), 2),
+        "avg_max_rate": Round(Avg(high), 2),
+        "min_rate": Min(low),
+        "max_rate": Max(high),
+    }
+    loan_aggregates = lambda low, high: {
+        "avg_min_rate": Round(Avg(low), 2),
+        "avg_max_rate": Round(Avg(high), 2),
+        "min_rate": Min(low),
+        "max_rate": Max(high),
+    }
+
+    # FinancialProduct has no disclosure month, it lives on the detail tables
+    months = [
+        model.objects.aggregate(month=Max("dcls_month"))["month"]
+        for model in [DepositProduct, SavingProduct, LoanProduct]
+    ]
+    months = [month for month in months if month]
+
+    return {
+        "total_products": FinancialProduct.objects.count(),
+        "products_by_type": {
+            "deposits": DepositProduct.objects.count(),
+            "savings": SavingProduct.objects.count(),
+            "loans": LoanProduct.objects.count(),
+            "mortgage_options": MortgageLoanOption.objects.count(),
+            "credit_options": CreditLoanOption.objects.count(),
+        },
+        "deposit_rates": DepositProduct.objects.aggregate(
+            **rate_aggregates("intr_rate", "intr_rate2")
+        ),
+        "saving_rates": SavingProduct.objects.aggregate(
+            **rate_aggregates("intr_rate", "intr_rate2")
+        ),
+        "mortgage_rates": MortgageLoanOption.objects.aggregate(
+            **loan_aggregates("lend_rate_min", "lend_rate_max")
+        ),
+        "credit_rates": CreditLoanOption.objects.aggregate(
+            **loan_aggregates("crdt_grad_1", "crdt_grad_10")
+        ),
+        "top_institutions": list(
+            FinancialProduct.objects.values("kor_co_nm")
+            .annotate(product_count=Count("fin_prdt_cd"))
+            .order_by("-product_count", "kor_co_nm")[:TOP_INSTITUTIONS]
+        ),
+        "term_distributions": term_distributions(),
+        "last_updated": max(months) if months else None,
+    }
+
+
+def materialize_statistics():
+    """
+    Compute the statistics and store them as the new latest snapshot
+    """
+    build_start = time.time()
+    snapshot = ProductStatistics.objects.create(data=compute_statistics())
+
+    stale = ProductStatistics.objects.order_by("-id").values_list("id", flat=True)[
+        KEPT_SNAPSHOTS + 1 :
+    ]
+    ProductStatistics.objects.filter(id__in=list(stale)).delete()
+
+    logger.info(
+        f"Materialized statistics snapshot {snapshot.id} in {time.time() - build_start:.3f} seconds"
+    )
+    return snapshot
+
+
+def latest_statistics():
+    """
+    Latest snapshot, materialized on the spot when none exists yet
+    """
+    snapshot = ProductStatistics.objects.order_by("-id").first()
+    if snapshot is None:
+        snapshot = materialize_statistics()
+    return snapshot
@@ -0,0 +1,31 @@
+"""
+Server-sent events for streamed responses
+"""
+
+import json
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(event, data):
+    """
+    One server-sent event with JSON data
+    """
+    payload = json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets clients that only accept text/event-stream (EventSource) reach a
+    streaming view; a regular Response, such as an error, is sent as one
+    "error" event
+    """
+
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return sse_event("error", data).encode(self.charset)
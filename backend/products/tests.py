@@ -1,3 +1,1671 @@
-from django.test import TestCase
+import json
+import threading
+import requests
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from io import StringIO
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    FinancialProduct,
+    DepositProduct,
+    SavingProduct,
+    LoanProduct,
+    MortgageLoanOption,
+    RequirementOption,
+    DepositProduct_JoinWay,
+    LendingRateOption,
+    TermRate,
+    UserProduct,
+    ProductStatistics,
+    RateHistory,
+    AIRecommendationJob,
+    MarketDataSnapshot,
+    IndexVersion,
+    StagedProductPage,
+)
+from .ingestion import ChangeSet, ingest_payload
+from .queries import DEPOSIT_CATEGORY, best_rate_per_product, term_rate_queryset
+from .signals import products_refreshed
+from .management.commands.check_query_plans import full_scans
+from .utils import fetch_products_by_type, write_product_type
+from .leaderboards import (
+    get_leaderboard,
+    rebuild_leaderboards,
+    VERSION_KEY,
+    LEADERBOARD_SIZE,
+)
+from .serializers import DepositProductSerializer, flat_serializer
+from .pagination import encode_cursor
+from .versioning import VersionedIndex, get_version, published_key
+from .search import SearchIndex, search_products
+from .search import VERSION_KEY as SEARCH_VERSION_KEY
+from .autocomplete import AutocompleteIndex, read_products, suggest
+from .autocomplete import VERSION_KEY as AUTOCOMPLETE_VERSION_KEY
+from .statistics import percentile
+from .history import downsample
+from .calculator import payouts
+from .repayment import LoanOptionTable, schedules
+from .credit_grades import CreditGradeIndex, GRADE_FIELDS
+from .recommender import profile_term, recommend_products
+from .ai_cache import (
+    SingleFlight,
+    TTLCache,
+    bucket_amount,
+    recommendation_cache,
+)
+from .ai_prompts import (
+    call_metrics,
+    encode_tables,
+    estimate_tokens,
+    fit_to_budget,
+    rank_candidates,
+)
+from .ai_services import get_ai_product_recommendations
+from .ai_backends import LocalBackend, get_backend
+from . import market_data
+from .ai_jobs import recover_jobs, run_job
+from rest_framework.renderers import JSONRenderer
 
-# Create your tests here.
+
+def deposit_payload(rate="3.5"):
+    return {
+        "result": {
+            "baseList": [
+                {
+                    "fin_prdt_cd": "D001",
+                    "kor_co_nm": "국민은행",
+                    "fin_prdt_nm": "KB Star 정기예금",
+                    "join_way": "인터넷,스마트폰",
+                    "join_member": "실명의 개인",
+                },
+            ],
+            "optionList": [
+                {
+                    "fin_prdt_cd": "D001",
+                    "fin_co_no": "0010927",
+                    "dcls_month": "202505",
+                    "intr_rate_type": "S",
+                    "save_trm": "6",
+                    "intr_rate": "3.0",
+                    "intr_rate2": "3.2",
+                },
+                {
+                    "fin_prdt_cd": "D001",
+                    "fin_co_no": "0010927",
+                    "dcls_month": "202505",
+                    "intr_rate_type": "S",
+                    "save_trm": "12",
+                    "intr_rate": rate,
+                    "intr_rate2": "3.8",
+                },
+                {"fin_prdt_cd": "UNKNOWN", "save_trm": "12", "intr_rate": "9.9"},
+            ],
+        }
+    }
+
+
+def mortgage_payload():
+    return {
+        "result": {
+            "baseList": [
+                {
+                    "fin_prdt_cd": "M001",
+                    "kor_co_nm": "신한은행",
+                    "fin_prdt_nm": "신한 주택담보대출",
+                    "join_way": "영업점",
+                    "fin_co_no": "0011625",
+                    "dcls_month": "202505",
+                },
+                {
+                    "fin_prdt_cd": "M002",
+                    "kor_co_nm": "우리은행",
+                    "fin_prdt_nm": "우리 아파트론",
+                    "join_way": "영업점",
+                },
+            ],
+            "optionList": [
+                {
+                    "fin_prdt_cd": "M001",
+                    "mrtg_type": "A",
+                    "rpay_type": "D",
+                    "lend_rate_type": "F",
+                    "lend_rate_min": "3.9",
+                    "lend_rate_max": "5.1",
+                },
+                {"fin_prdt_cd": "M001", "lend_rate_avg": "4.4"},
+                {"fin_prdt_cd": "M002", "lend_rate_avg": "4.1"},
+            ],
+        }
+    }
+
+
+def fake_pages(payloads, paged=False):
+    """
+    Build a fetch_finlife_page stand-in serving payloads for the bank group
+
+    With paged=True the baseList is served on page 1 and the optionList on
+    page 2. Every other group returns an empty page.
+    """
+
+    def fetch_page(product_type, top_fin_grp_no, page_no):
+        payload = payloads.get(product_type)
+        if payload is None or top_fin_grp_no != "020000":
+            return {"result": {"max_page_no": 1, "baseList": [], "optionList": []}}
+        if not paged:
+            return payload
+        result = payload["result"]
+        if page_no == 1:
+            page = {"baseList": result["baseList"], "optionList": []}
+        else:
+            page = {"baseList": [], "optionList": result["optionList"]}
+        return {"result": dict(page, max_page_no=2)}
+
+    return fetch_page
+
+
+class ProductIngestionTestCase(TestCase):
+    def test_deposit_ingestion_creates_rows(self):
+        result = ingest_payload("deposit", deposit_payload())
+
+        product = FinancialProduct.objects.get(fin_prdt_cd="D001")
+        self.assertEqual(product.kor_co_nm, "국민은행")
+        self.assertEqual(
+            set(DepositProduct_JoinWay.objects.values_list("join_way", flat=True)),
+            {"인터넷", "스마트폰"},
+        )
+        self.assertEqual(RequirementOption.objects.filter(product=product).count(), 2)
+        self.assertEqual(DepositProduct.objects.get(product=product).category, "예금")
+        self.assertFalse(
+            FinancialProduct.objects.filter(fin_prdt_cd="UNKNOWN").exists()
+        )
+        self.assertEqual(
+            result["rows"]["products"],
+            {"inserted": 1, "updated": 0, "unchanged": 0, "deleted": 0},
+        )
+        self.assertEqual(set(result["timings"]), {"parse", "diff", "write"})
+
+    def test_reingestion_updates_in_place(self):
+        ingest_payload("deposit", deposit_payload())
+        result = ingest_payload("deposit", deposit_payload(rate="3.6"))
+
+        self.assertEqual(FinancialProduct.objects.count(), 1)
+        self.assertEqual(DepositProduct_JoinWay.objects.count(), 2)
+        self.assertEqual(RequirementOption.objects.count(), 2)
+        self.assertEqual(RequirementOption.objects.get(save_trm=12).intr_rate, 3.6)
+        # Only the option whose rate moved is rewritten
+        self.assertEqual(result["rows"]["products"]["unchanged"], 1)
+        self.assertEqual(result["rows"]["join_ways"]["inserted"], 0)
+        self.assertEqual(result["rows"]["requirement_options"]["updated"], 1)
+        self.assertEqual(result["rows"]["requirement_options"]["unchanged"], 1)
+        self.assertEqual(result["changes"].changed_products, {"D001"})
+
+    def test_mortgage_average_only_options(self):
+        ingest_payload("mortgage", mortgage_payload())
+
+        self.assertEqual(LoanProduct.objects.count(), 2)
+        self.assertEqual(
+            FinancialProduct.objects.get(fin_prdt_cd="M001").loan_type, "주택담보대출"
+        )
+        self.assertEqual(MortgageLoanOption.objects.count(), 1)
+        # The average-only item updates the existing option of M001
+        option = LendingRateOption.objects.get(product_id="M001")
+        self.assertEqual(option.rpay_type, "D")
+        self.assertEqual(option.lend_rate_avg, 4.4)
+        # ...and creates a default option for M002
+        default = LendingRateOption.objects.get(product_id="M002")
+        self.assertEqual(default.rpay_type, "DEFAULT")
+        self.assertEqual(default.lend_rate_min, 4.1)
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_fetch_products_by_type_reports_phases(self, fetch_page):
+        fetch_page.side_effect = fake_pages({"deposit": deposit_payload()})
+
+        results = fetch_products_by_type(["deposit"])
+
+        deposit = results["deposit_products"]
+        self.assertTrue(deposit["success"])
+        self.assertEqual(deposit["count"], 1)
+        self.assertEqual(
+            set(deposit["phases"]),
+            {"fetch", "stage", "parse", "diff", "write", "delete"},
+        )
+        self.assertTrue(results["summary"]["all_success"])
+        self.assertEqual(SavingProduct.objects.count(), 0)
+
+    @mock.patch("products.utils.fetch_finlife_page", return_value=None)
+    def test_fetch_products_by_type_reports_failure(self, fetch_page):
+        results = fetch_products_by_type(["saving"])
+
+        self.assertFalse(results["saving_products"]["success"])
+        self.assertFalse(results["summary"]["all_success"])
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_fetch_products_by_type_parallel(self, fetch_page):
+        fetch_page.side_effect = fake_pages(
+            {"deposit": deposit_payload(), "mortgage": mortgage_payload()}
+        )
+
+        results = fetch_products_by_type(["deposit", "mortgage"], parallel=True)
+
+        self.assertTrue(results["summary"]["all_success"])
+        self.assertTrue(results["summary"]["parallel"])
+        self.assertIn("summed_latency", results["summary"])
+        self.assertEqual(results["deposit_products"]["count"], 1)
+        self.assertEqual(results["mortgage_loans"]["count"], 1)
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_fetch_products_by_type_reads_every_page(self, fetch_page):
+        fetch_page.side_effect = fake_pages({"deposit": deposit_payload()}, paged=True)
+
+        results = fetch_products_by_type(["deposit"])
+
+        # Options on page 2 attach to the product written from page 1
+        self.assertEqual(results["deposit_products"]["pages"], 2 + 4)
+        self.assertEqual(RequirementOption.objects.count(), 2)
+        requested_pages = {call.args[1:] for call in fetch_page.call_args_list}
+        self.assertIn(("020000", 2), requested_pages)
+        self.assertIn(("050000", 1), requested_pages)
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_refresh_deletes_stale_rows_and_sends_change_set(self, fetch_page):
+        fetch_page.side_effect = fake_pages({"deposit": deposit_payload()})
+        fetch_products_by_type(["deposit"])
+
+        # D001 stops offering the 6 month term, D002 is no longer published
+        payload = deposit_payload()
+        payload["result"]["optionList"] = payload["result"]["optionList"][1:]
+        FinancialProduct.objects.create(fin_prdt_cd="D002", fin_prdt_nm="구상품")
+        DepositProduct.objects.create(
+            product_id="D002", save_trm=12, intr_rate=1.0, intr_rate2=1.0
+        )
+        fetch_page.side_effect = fake_pages({"deposit": payload})
+        received = []
+        handler = lambda sender, change_set, **kwargs: received.append(change_set)
+        products_refreshed.connect(handler)
+        try:
+            results = fetch_products_by_type(["deposit"])
+        finally:
+            products_refreshed.disconnect(handler)
+
+        rows = results["deposit_products"]["rows"]
+        self.assertEqual(rows["requirement_options"]["deleted"], 1)
+        self.assertEqual(rows["details"]["deleted"], 1)
+        self.assertEqual(RequirementOption.objects.count(), 1)
+        self.assertFalse(DepositProduct.objects.filter(product_id="D002").exists())
+        self.assertTrue(FinancialProduct.objects.filter(fin_prdt_cd="D002").exists())
+        self.assertEqual(received[0].changed_products, {"D001", "D002"})
+        self.assertEqual(received[0].deleted_products, {"D002"})
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_failed_page_rolls_back_product_type(self, fetch_page):
+        pages = fake_pages({"deposit": deposit_payload()}, paged=True)
+        fetch_page.side_effect = lambda product_type, group, page_no: (
+            None if page_no == 2 else pages(product_type, group, page_no)
+        )
+
+        results = fetch_products_by_type(["deposit"])
+
+        self.assertFalse(results["deposit_products"]["success"])
+        self.assertEqual(FinancialProduct.objects.count(), 0)
+        self.assertEqual(StagedProductPage.objects.count(), 0)
+
+    def test_admin_edit_is_refreshed_by_next_ingest(self):
+        ingest_payload("deposit", deposit_payload())
+        admin = get_user_model().objects.create_user(
+            username="admin", password="pw", is_staff=True
+        )
+        self.client.force_login(admin)
+
+        response = self.client.patch(
+            reverse("financialproduct-detail", args=["D001"]),
+            {"fin_prdt_nm": "수정된 이름"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        result = ingest_payload("deposit", deposit_payload())
+
+        self.assertEqual(result["rows"]["products"]["updated"], 1)
+        self.assertEqual(result["changes"].changed_products, {"D001"})
+        self.assertNotEqual(
+            FinancialProduct.objects.get(fin_prdt_cd="D001").fin_prdt_nm, "수정된 이름"
+        )
+
+    def test_pages_are_staged_until_every_page_is_in(self):
+        written = []
+
+        def pages():
+            yield deposit_payload(), 0.0
+            # The first page is staged, the catalogue is not touched yet
+            written.append(
+                (FinancialProduct.objects.count(), StagedProductPage.objects.count())
+            )
+            yield deposit_payload(rate="3.6"), 0.0
+
+        report = write_product_type("deposit", pages())
+
+        self.assertTrue(report["success"])
+        self.assertEqual(report["pages"], 2)
+        self.assertEqual(written, [(0, 1)])
+        self.assertEqual(RequirementOption.objects.get(save_trm=12).intr_rate, 3.6)
+        self.assertEqual(StagedProductPage.objects.count(), 0)
+
+
+class TermRateTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ingest_payload("deposit", deposit_payload())
+
+    def test_every_term_option_is_kept(self):
+        self.assertEqual(
+            set(TermRate.objects.values_list("save_trm", "intr_rate2")),
+            {(6, 3.2), (12, 3.8)},
+        )
+        # The detail row shows the best option of the product
+        self.assertEqual(DepositProduct.objects.get(product_id="D001").save_trm, 12)
+
+    def test_term_filter_uses_rate_of_that_term(self):
+        response = self.client.get(
+            reverse("filter-products"),
+            {"type": "deposit", "term": 6, "include_total": 1},
+        )
+
+        deposits = response.data["results"]["deposits"]
+        self.assertEqual(len(deposits), 1)
+        self.assertEqual(deposits[0]["save_trm"], 6)
+        self.assertEqual(deposits[0]["intr_rate2"], 3.2)
+        self.assertEqual(
+            response.data["pagination"]["approximate_total"]["deposits"], 1
+        )
+
+    def test_best_rate_does_not_depend_on_order(self):
+        rows = term_rate_queryset(DEPOSIT_CATEGORY).order_by("intr_rate2")
+
+        best = best_rate_per_product(rows)
+
+        self.assertEqual([row.intr_rate2 for row in best], [3.8])
+
+    def test_top_rates_rejects_invalid_term(self):
+        response = self.client.get(
+            reverse("top-rates", args=["deposit"]), {"term": "abc"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_top_rates_for_term(self):
+        response = self.client.get(reverse("top-rates", args=["deposit"]), {"term": 6})
+
+        data = json.loads(response.content)
+        self.assertEqual(data[0]["financial_product"]["fin_prdt_cd"], "D001")
+        self.assertEqual(data[0]["intr_rate2"], 3.2)
+
+    def test_admin_edit_updates_term_rate(self):
+        admin = get_user_model().objects.create_user(
+            username="admin", password="pw", is_staff=True
+        )
+        self.client.force_login(admin)
+
+        response = self.client.patch(
+            reverse("depositproduct-detail", args=["D001"]),
+            {"intr_rate2": 4.5},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        term_rate = TermRate.objects.get(product_id="D001", save_trm=12)
+        self.assertEqual(term_rate.intr_rate2, 4.5)
+        self.assertEqual(term_rate.content_hash, "")
+        response = self.client.get(reverse("top-rates", args=["deposit"]), {"term": 12})
+        self.assertEqual(json.loads(response.content)[0]["intr_rate2"], 4.5)
+
+
+class QueryPlanTestCase(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command("check_query_plans", stdout=out)
+
+        self.assertNotIn("FULL SCAN", out.getvalue())
+
+    def test_full_scan_detection(self):
+        plan = (
+            "3 0 0 SCAN products_loanproduct\n"
+            "6 0 0 SCAN products_depositproduct USING INDEX deposit_rate_idx"
+        )
+        self.assertEqual(full_scans(plan), ["products_loanproduct"])
+
+
+class LeaderboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        ingest_payload("mortgage", mortgage_payload())
+
+    def test_board_matches_serializer_output(self):
+        response = self.client.get(reverse("top-rates", args=["deposit"]))
+
+        expected = DepositProductSerializer(DepositProduct.objects.all(), many=True)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), expected.data)
+
+    def test_warm_board_needs_no_queries(self):
+        rebuild_leaderboards()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("lowest-rate-loans"), {"limit": 1})
+        self.assertEqual(
+            json.loads(response.content)[0]["product_info"]["fin_prdt_cd"], "M001"
+        )
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_refresh_publishes_new_version(self, fetch_page):
+        rebuild_leaderboards()
+        version = get_version(VERSION_KEY)
+        fetch_page.side_effect = fake_pages({"deposit": deposit_payload(rate="3.6")})
+
+        fetch_products_by_type(["deposit"])
+
+        self.assertNotEqual(get_version(VERSION_KEY), version)
+        self.assertEqual(len(get_leaderboard("deposit:12")), 1)
+
+    def test_version_moved_by_another_process(self):
+        rebuild_leaderboards()
+        self.assertEqual(json.loads(get_leaderboard("deposit:12")[0])["intr_rate"], 3.5)
+
+        # Another process writes new rates and publishes a version, without
+        # touching this process's boards, then the version read here expires
+        ingest_payload("deposit", deposit_payload(rate="3.6"))
+        IndexVersion.objects.filter(key=VERSION_KEY).update(version=F("version") + 1)
+        cache.delete(published_key(VERSION_KEY))
+
+        self.assertEqual(json.loads(get_leaderboard("deposit:12")[0])["intr_rate"], 3.6)
+
+
+def loan_payload(count):
+    codes = [f"L{number:03d}" for number in range(count)]
+    return {
+        "result": {
+            "baseList": [
+                {
+                    "fin_prdt_cd": code,
+                    "kor_co_nm": "하나은행",
+                    "fin_prdt_nm": f"하나 주택담보대출 {code}",
+                    "join_way": "영업점,인터넷",
+                }
+                for code in codes
+            ],
+            "optionList": [
+                {
+                    "fin_prdt_cd": code,
+                    "mrtg_type": "A",
+                    "rpay_type": "D",
+                    "lend_rate_type": "F",
+                    "lend_rate_min": "3.9",
+                    "lend_rate_max": "5.1",
+                    "lend_rate_avg": "4.4",
+                }
+                for code in codes
+            ],
+        }
+    }
+
+
+class LoanQueryCountTestCase(TestCase):
+    """
+    Every loan endpoint must run the same number of queries for 2 or 6 loans
+    """
+
+    def count_queries(self, loan_count, url, params=None, user=None):
+        LoanProduct.objects.all().delete()
+        FinancialProduct.objects.all().delete()
+        cache.clear()
+        IndexVersion.objects.all().delete()
+        ingest_payload("mortgage", loan_payload(loan_count))
+        if user is not None:
+            for product in FinancialProduct.objects.all():
+                UserProduct.objects.create(user=user, product=product)
+            self.client.force_login(user)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url, params=None, user=None):
+        self.assertEqual(
+            self.count_queries(2, url, params, user),
+            self.count_queries(6, url, params, user),
+            url,
+        )
+
+    def test_loan_list(self):
+        self.assertConstantQueries("/products/loans/")
+
+    def test_top_rate_loans(self):
+        self.assertConstantQueries(
+            reverse("top-rates", args=["loan"]), {"limit": LEADERBOARD_SIZE + 1}
+        )
+
+    def test_lowest_rate_loans(self):
+        self.assertConstantQueries(
+            reverse("lowest-rate-loans"), {"limit": LEADERBOARD_SIZE + 1}
+        )
+
+    def test_search(self):
+        self.assertConstantQueries(reverse("search-products"), {"q": "하나"})
+
+    def test_filter(self):
+        self.assertConstantQueries(
+            reverse("filter-products"), {"type": "loan", "page_size": 10}
+        )
+
+    def test_user_favorites(self):
+        user = get_user_model().objects.create_user(
+            username="loan-user", password="password", nickname="loan-user"
+        )
+        self.assertConstantQueries(reverse("user-favorites"), user=user)
+
+    def test_recommendations(self):
+        user = get_user_model().objects.create_user(
+            username="loan-user", password="password", nickname="loan-user"
+        )
+        self.assertConstantQueries(reverse("product-recommendations"), user=user)
+
+
+class FlatSerializerTestCase(TestCase):
+    def setUp(self):
+        ingest_payload("deposit", deposit_payload())
+
+    def test_output_is_identical_to_nested_serializer(self):
+        queryset = DepositProduct.objects.select_related("product")
+        renderer = JSONRenderer()
+
+        self.assertEqual(
+            renderer.render(
+                flat_serializer(DepositProductSerializer).serialize(queryset)
+            ),
+            renderer.render(DepositProductSerializer(queryset, many=True).data),
+        )
+
+    def test_list_endpoints_use_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get("/products/deposits/")
+        self.assertEqual(
+            response.data[0]["financial_product"]["join_way"], ["인터넷", "스마트폰"]
+        )
+
+        response = self.client.get(reverse("filter-products"), {"type": "deposit"})
+        self.assertEqual(response.data["results"]["deposits"][0]["product"], "D001")
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        for code, rate in [("D1", 3.0), ("D2", 3.5), ("D3", 3.5), ("D4", 2.0)]:
+            FinancialProduct.objects.create(fin_prdt_cd=code, kor_co_nm="은행")
+            DepositProduct.objects.create(
+                product_id=code, save_trm=12, intr_rate=rate, intr_rate2=rate
+            )
+
+    def read_all_pages(self, url, params):
+        codes, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, dict(params, cursor=cursor or ""))
+            self.assertFalse(
+                any("OFFSET" in query["sql"] for query in queries.captured_queries)
+            )
+            codes += [row["product"] for row in response.data["results"]["deposits"]]
+            cursor = response.data["pagination"]["next_cursor"]
+            if cursor is None:
+                return codes, response
+
+    def test_pages_follow_rate_then_code(self):
+        codes, response = self.read_all_pages(
+            reverse("filter-products"),
+            {"type": "deposit", "page_size": 1, "include_total": 1},
+        )
+
+        self.assertEqual(codes, ["D3", "D2", "D1", "D4"])
+        self.assertEqual(
+            response.data["pagination"]["approximate_total"]["deposits"], 4
+        )
+
+    def test_term_filter_is_paginated_by_keyset(self):
+        for code, rate in [("D1", 3.0), ("D2", 3.5), ("D3", 3.5), ("D4", 2.0)]:
+            TermRate.objects.create(
+                product_id=code,
+                category="예금",
+                save_trm=6,
+                intr_rate_type="S",
+                intr_rate=rate,
+                intr_rate2=rate,
+            )
+        # Only the best row of D1 is listed
+        TermRate.objects.create(
+            product_id="D1",
+            category="예금",
+            save_trm=6,
+            intr_rate_type="M",
+            intr_rate=1.0,
+            intr_rate2=1.0,
+        )
+
+        codes, _ = self.read_all_pages(
+            reverse("filter-products"), {"type": "deposit", "term": 6, "page_size": 1}
+        )
+
+        self.assertEqual(codes, ["D3", "D2", "D1", "D4"])
+
+    def test_invalid_page_size_and_term(self):
+        response = self.client.get(reverse("filter-products"), {"page_size": "x"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["pagination"]["page_size"], 10)
+
+        response = self.client.get(reverse("filter-products"), {"term": "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_is_paginated(self):
+        response = self.client.get(
+            reverse("search-products"), {"q": "은행", "page_size": 3}
+        )
+
+        self.assertEqual(
+            [row["product"] for row in response.data["deposits"]], ["D4", "D3", "D2"]
+        )
+        self.assertTrue(response.data["pagination"]["has_more"]["deposits"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse("filter-products"), {"cursor": "!!"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_values_must_fit_the_sort_key(self):
+        for url, params in [
+            (reverse("search-products"), {"q": "은행"}),
+            (reverse("filter-products"), {"type": "deposit"}),
+            (reverse("filter-products"), {"type": "deposit", "sort_by": "term"}),
+        ]:
+            for position in [["x", "D1"], [3.5, ["D1"]], [True, "D1"]]:
+                cursor = encode_cursor({"deposits": position})
+                response = self.client.get(url, dict(params, cursor=cursor))
+                self.assertEqual(response.status_code, 400, (url, params, position))
+
+
+class SearchIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        index_products = [
+            ("P1", "KB Star 정기예금", "KB국민은행", "실명의 개인"),
+            ("P2", "우리 정기적금", "우리은행", "KB국민은행 고객"),
+            ("P3", "하나 적금", "하나은행", "제한없음"),
+        ]
+        self.index = SearchIndex(
+            {
+                "fin_prdt_cd": code,
+                "fin_prdt_nm": name,
+                "kor_co_nm": company,
+                "join_member": member,
+                "join_way": "인터넷",
+            }
+            for code, name, company, member in index_products
+        )
+
+    def test_partial_company_name(self):
+        # Institution matches rank above join member matches
+        self.assertEqual(
+            [code for code, score in self.index.search("국민")], ["P1", "P2"]
+        )
+
+    def test_choseong_query(self):
+        self.assertEqual([code for code, score in self.index.search("ㅎㄴ")], ["P3"])
+        self.assertEqual(
+            [code for code, score in self.index.search("ㅈㄱ")], ["P3", "P2", "P1"]
+        )
+
+    def test_refresh_rebuilds_index(self):
+        self.assertEqual(search_products("ㄱㅁ"), [])
+        ingest_payload("deposit", deposit_payload())
+        self.assertEqual(search_products("ㄱㅁ"), [])
+
+        changes = ChangeSet("deposit")
+        changes.record("products", "D001", "inserted")
+        products_refreshed.send(sender=None, change_set=changes)
+        self.assertEqual([code for code, score in search_products("ㄱㅁ")], ["D001"])
+
+    def test_version_moved_by_another_process(self):
+        self.assertEqual(search_products("ㄱㅁ"), [])
+        ingest_payload("deposit", deposit_payload())
+
+        IndexVersion.objects.filter(key=SEARCH_VERSION_KEY).update(
+            version=F("version") + 1
+        )
+        cache.delete(published_key(SEARCH_VERSION_KEY))
+
+        self.assertEqual([code for code, score in search_products("ㄱㅁ")], ["D001"])
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.index = AutocompleteIndex(
+            [
+                {
+                    "fin_prdt_cd": "P1",
+                    "fin_prdt_nm": "KB Star 정기예금",
+                    "kor_co_nm": "국민은행",
+                },
+                {
+                    "fin_prdt_cd": "P2",
+                    "fin_prdt_nm": "국민 적금",
+                    "kor_co_nm": "국민은행",
+                },
+            ]
+        )
+
+    def labels(self, query, index=None):
+        return [(s["type"], s["id"]) for s in (index or self.index).suggest(query)]
+
+    def test_prefix_and_word_start(self):
+        self.assertEqual(
+            self.labels("국민"), [("institution", "국민은행"), ("product", "P2")]
+        )
+        self.assertEqual(self.labels("정기"), [("product", "P1")])
+        self.assertEqual(self.labels("ㄱㅁㅇ"), [("institution", "국민은행")])
+
+    def test_incremental_update(self):
+        index = self.index.updated(
+            [
+                {
+                    "fin_prdt_cd": "P2",
+                    "fin_prdt_nm": "우리 적금",
+                    "kor_co_nm": "우리은행",
+                }
+            ],
+            ["P1", "P2"],
+            version=2,
+        )
+
+        self.assertEqual(self.labels("국민", index), [])
+        self.assertEqual(
+            self.labels("우리", index), [("institution", "우리은행"), ("product", "P2")]
+        )
+        # The previous index is left untouched
+        self.assertEqual(len(self.labels("국민")), 2)
+
+    def test_endpoint_follows_refresh(self):
+        ingest_payload("deposit", deposit_payload())
+        response = self.client.get(reverse("autocomplete-products"), {"q": "kb"})
+        self.assertEqual(response.data["suggestions"][0]["id"], "D001")
+
+        FinancialProduct.objects.filter(fin_prdt_cd="D001").update(
+            fin_prdt_nm="새 예금"
+        )
+        changes = ChangeSet("deposit")
+        changes.record("products", "D001", "updated")
+        products_refreshed.send(sender=None, change_set=changes)
+
+        response = self.client.get(reverse("autocomplete-products"), {"q": "kb"})
+        self.assertEqual(response.data["suggestions"], [])
+
+    def test_changes_published_by_another_process(self):
+        ingest_payload("deposit", deposit_payload())
+        self.assertEqual(suggest("kb")[0]["id"], "D001")
+
+        # Another process renames D001 and publishes the code it changed
+        FinancialProduct.objects.filter(fin_prdt_cd="D001").update(
+            fin_prdt_nm="새 예금"
+        )
+        IndexVersion.objects.filter(key=AUTOCOMPLETE_VERSION_KEY).update(
+            previous=F("version"), version=F("version") + 1, changed_products=["D001"]
+        )
+        cache.delete(published_key(AUTOCOMPLETE_VERSION_KEY))
+
+        with mock.patch(
+            "products.autocomplete.read_products", wraps=read_products
+        ) as read:
+            self.assertEqual(suggest("kb"), [])
+        # Only the changed product is read again
+        read.assert_called_once_with(["D001"])
+
+
+class ProductStatisticsTestCase(TestCase):
+    def test_percentile_interpolates(self):
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 50), 2.5)
+        self.assertEqual(percentile([1.0, 2.0, 3.0, 4.0], 90), 3.7)
+        self.assertEqual(percentile([2.0], 10), 2.0)
+
+    @mock.patch("products.utils.fetch_finlife_page")
+    def test_endpoint_serves_refresh_snapshot(self, fetch_page):
+        fetch_page.side_effect = fake_pages({"deposit": deposit_payload()})
+        fetch_products_by_type(["deposit"])
+        snapshot = ProductStatistics.objects.get()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("product-statistics"))
+
+        self.assertEqual(response.data["snapshot"]["version"], snapshot.id)
+        self.assertEqual(response.data["total_products"], 1)
+        self.assertEqual(response.data["last_updated"], "202505")
+        self.assertEqual(response.data["term_distributions"]["예금"]["12"]["p50"], 3.8)
+
+
+def with_month(payload, dcls_month):
+    for option in payload["result"]["optionList"]:
+        if "dcls_month" in option:
+            option["dcls_month"] = dcls_month
+    return payload
+
+
+class RateHistoryTestCase(TestCase):
+    def history(self, code="D001"):
+        return list(
+            RateHistory.objects.filter(product_id=code)
+            .order_by("option", "dcls_month")
+            .values_list("option", "dcls_month", "rate", "max_rate")
+        )
+
+    def test_rows_are_appended_only_when_rates_move(self):
+        ingest_payload("deposit", deposit_payload())
+        ingest_payload("deposit", with_month(deposit_payload(), "202506"))
+        self.assertEqual(
+            self.history(),
+            [("12|S|", "202505", 3.5, 3.8), ("6|S|", "202505", 3.0, 3.2)],
+        )
+
+        ingest_payload("deposit", with_month(deposit_payload(rate="3.6"), "202507"))
+        self.assertEqual(
+            self.history()[:2],
+            [("12|S|", "202505", 3.5, 3.8), ("12|S|", "202507", 3.6, 3.8)],
+        )
+        self.assertEqual(len(self.history()), 3)
+
+    def test_loan_options_take_product_month(self):
+        ingest_payload("mortgage", mortgage_payload())
+        self.assertEqual(self.history("M001"), [("A|D|F", "202505", 3.9, 5.1)])
+
+    def test_downsample_keeps_bounds(self):
+        points = [
+            {"dcls_month": f"20{year}{month:02d}", "rate": None, "max_rate": value}
+            for value, (year, month) in enumerate(
+                (year, month) for year in range(20, 25) for month in range(1, 13)
+            )
+        ]
+        kept = downsample(points, 10)
+        self.assertEqual(len(kept), 10)
+        self.assertEqual(kept[0], points[0])
+        self.assertEqual(kept[-1], points[-1])
+        self.assertEqual(downsample(points[:5], 10), points[:5])
+
+    def test_endpoint_filters_months(self):
+        ingest_payload("deposit", deposit_payload())
+        ingest_payload("deposit", with_month(deposit_payload(rate="3.6"), "202507"))
+
+        response = self.client.get(
+            reverse("rate-history", args=["D001"]), {"from": "202506"}
+        )
+        self.assertEqual(
+            response.data["series"],
+            [
+                {
+                    "option": "12|S|",
+                    "total_points": 1,
+                    "points": [{"dcls_month": "202507", "rate": 3.6, "max_rate": 3.8}],
+                }
+            ],
+        )
+        response = self.client.get(
+            reverse("rate-history", args=["D001"]), {"from": "2025-06"}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class MaturityCalculatorTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_saving_compound_matches_monthly_loop(self):
+        balance = 0.0
+        for _ in range(24):
+            balance = (balance + 300000) * (1 + 4.2 / 1200)
+        expected_interest = int(balance - 300000 * 24)
+
+        paid, net, tax, payout = payouts(
+            [True], [24], [True], [4.2], 0, 300000, tax_rate=0.0
+        )
+        self.assertEqual(paid[0], 7200000)
+        self.assertEqual(net[0], expected_interest)
+        self.assertEqual(payout[0], 7200000 + expected_interest)
+
+    def test_endpoint_ranks_after_tax_payouts(self):
+        ingest_payload("deposit", deposit_payload())
+
+        response = self.client.get(
+            reverse("maturity-calculator"), {"principal": 10000000, "type": "deposit"}
+        )
+
+        best = response.data["deposits"][0]
+        self.assertEqual((best["fin_prdt_cd"], best["save_trm"]), ("D001", 12))
+        # 380,000 of simple interest minus 15.4% tax
+        self.assertEqual(best["interest"], 321480)
+        self.assertEqual(best["payout"], 10321480)
+        self.assertNotIn("savings", response.data)
+
+        response = self.client.get(reverse("maturity-calculator"))
+        self.assertEqual(response.status_code, 400)
+
+    def test_versioned_index_follows_another_process(self):
+        builds = []
+        index = VersionedIndex("tests:index", lambda version: builds.append(version))
+
+        index.get()
+        index.get()
+        IndexVersion.objects.filter(key="tests:index").update(version=F("version") + 1)
+        cache.delete(published_key("tests:index"))
+        index.get()
+
+        self.assertEqual(len(builds), 2)
+        self.assertEqual(builds[1], builds[0] + 1)
+
+
+class RepaymentSimulatorTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_schedules_per_won(self):
+        payments = schedules([6.0], 12)
+        self.assertAlmostEqual(payments["equal_principal"].sum() - 1, 0.0325)
+        self.assertAlmostEqual(payments["equal_installment"][0, 0], 0.0860664, 7)
+        self.assertAlmostEqual(payments["bullet"].sum() - 1, 0.06)
+        self.assertAlmostEqual(payments["bullet"][0, -1], 1.005)
+
+    def test_endpoint_ranks_options_by_method(self):
+        ingest_payload("mortgage", mortgage_payload())
+        url = reverse("repayment-simulator")
+
+        response = self.client.get(url, {"amount": 100000000, "term": 12})
+
+        cheapest = response.data["total_interest"][0]
+        self.assertEqual(
+            (cheapest["fin_prdt_cd"], cheapest["method"]), ("M001", "equal_principal")
+        )
+        self.assertEqual(cheapest["total_interest"], 2112500)
+        self.assertEqual(
+            response.data["monthly_payment"][0]["method"], "equal_installment"
+        )
+        # Options repaid in installments are not simulated as bullet loans
+        self.assertEqual(len(response.data["total_interest"]), 2)
+
+        # Rankings are cached per term for every amount
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"amount": 50000000, "term": 12})
+        self.assertEqual(response.data["total_interest"][0]["total_interest"], 1056250)
+
+    def test_bullet_loans_are_not_ranked_by_monthly_payment(self):
+        option = {"lend_rate_max": None, "fin_prdt_cd": "L1", "option": 1}
+        table = LoanOptionTable(
+            [
+                dict(option, lend_rate_min=3.0, rpay_type="S"),
+                dict(option, lend_rate_min=6.0, rpay_type="D", fin_prdt_cd="L2"),
+            ]
+        )
+
+        rankings = table.rankings(12)
+
+        self.assertEqual(
+            {row["method"] for row in rankings["monthly_payment"]},
+            {"equal_principal", "equal_installment"},
+        )
+        self.assertEqual(rankings["total_interest"][0]["method"], "bullet")
+
+
+def credit_payload():
+    def option(code, rate_type, grade_1, grade_6):
+        return {
+            "fin_prdt_cd": code,
+            "crdt_prdt_type": "1",
+            "crdt_lend_rate_type": rate_type,
+            "crdt_grad_1": grade_1,
+            "crdt_grad_6": grade_6,
+        }
+
+    return {
+        "result": {
+            "baseList": [
+                {
+                    "fin_prdt_cd": code,
+                    "kor_co_nm": company,
+                    "fin_prdt_nm": f"{company} 신용대출",
+                    "join_way": "인터넷",
+                    "dcls_month": "202505",
+                }
+                for code, company in [("C001", "국민은행"), ("C002", "신한은행")]
+            ],
+            "optionList": [
+                option("C001", "A", "4.5", "7.9"),
+                option("C001", "B", "3.1", "3.1"),
+                option("C002", "A", "4.8", "6.2"),
+            ],
+        }
+    }
+
+
+class CreditGradeIndexTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ingest_payload("credit", credit_payload())
+
+    def test_grade_rankings_use_loan_rates(self):
+        response = self.client.get(reverse("credit-grade-leaderboard"))
+
+        grades = response.data["grades"]
+        self.assertEqual(
+            [(row["fin_prdt_cd"], row["rate"]) for row in grades["1"]],
+            [("C001", 4.5), ("C002", 4.8)],
+        )
+        self.assertEqual([row["fin_prdt_cd"] for row in grades["6"]], ["C002", "C001"])
+        # Grades without published rates have no ranking
+        self.assertEqual(grades["13"], [])
+
+    def test_top_rates_by_grade_need_no_queries(self):
+        url = reverse("top-rates", args=["credit"])
+        self.client.get(url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"grade": "6", "limit": 1})
+        self.assertEqual(response.data[0]["fin_prdt_cd"], "C002")
+
+        response = self.client.get(url, {"grade": "7"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_one_option_per_product(self):
+        option = {
+            "fin_prdt_cd": "C001",
+            "fin_prdt_nm": "국민 신용대출",
+            "kor_co_nm": "국민은행",
+            "crdt_prdt_type": "1",
+            **{field: None for field in GRADE_FIELDS.values()},
+        }
+        index = CreditGradeIndex(
+            [
+                dict(option, crdt_grad_1=4.0),
+                dict(option, crdt_prdt_type="2", crdt_grad_1=3.0),
+            ]
+        )
+        self.assertEqual([row["rate"] for row in index.best("1")], [3.0])
+
+
+class RecommenderTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        ingest_payload("mortgage", mortgage_payload())
+        self.user = get_user_model().objects.create_user(
+            username="saver", password="password", nickname="saver"
+        )
+        self.client.force_login(self.user)
+
+    def test_favorite_institutions_come_first(self):
+        UserProduct.objects.create(user=self.user, product_id="M002")
+
+        response = self.client.get(reverse("product-recommendations"))
+
+        self.assertEqual(response.data["favorite_institutions"], ["우리은행"])
+        self.assertEqual(list(response.data["recommendations"]), ["loans"])
+        self.assertEqual(
+            [
+                loan["product_info"]["fin_prdt_cd"]
+                for loan in response.data["recommendations"]["loans"]
+            ],
+            ["M002", "M001"],
+        )
+
+    def test_results_are_memoized_per_profile(self):
+        first = recommend_products({"국민은행"}, ["deposits"], term=6)
+
+        with self.assertNumQueries(0):
+            second = recommend_products({"국민은행"}, ["deposits"], term=6)
+        self.assertEqual(first, second)
+        self.assertEqual(second["deposits"][0]["product"], "D001")
+
+    def test_profile_term_buckets(self):
+        self.assertIsNone(profile_term(None, 10000000))
+        self.assertEqual(profile_term(36000000, 0), 6)
+        self.assertEqual(profile_term(36000000, 30000000), 12)
+        self.assertEqual(profile_term(36000000, 90000000), 24)
+
+    def test_salary_and_money_set_the_preferred_term(self):
+        for code, term, rate in [("D006", 6, 4.0), ("D024", 24, 4.5)]:
+            FinancialProduct.objects.create(fin_prdt_cd=code, kor_co_nm="은행")
+            DepositProduct.objects.create(
+                product_id=code, save_trm=term, intr_rate=rate, intr_rate2=rate
+            )
+        url = reverse("product-recommendations")
+
+        def first_deposit():
+            response = self.client.get(url)
+            return response.data["recommendations"]["deposits"][0]["product"]
+
+        self.user.salary, self.user.money = 36000000, 1000000
+        self.user.save()
+        self.assertEqual(first_deposit(), "D006")
+
+        self.user.money = 100000000
+        self.user.save()
+        self.assertEqual(first_deposit(), "D024")
+
+
+class AIRecommendationCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendation_cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        self.user = get_user_model().objects.create_user(
+            username="saver", password="password", nickname="saver"
+        )
+        self.client.force_login(self.user)
+
+    def test_bucket_amount(self):
+        self.assertEqual(bucket_amount(3120000), 3100000)
+        self.assertEqual(bucket_amount(12345678), 12000000)
+        self.assertEqual(bucket_amount(95), 95)
+        self.assertEqual(bucket_amount(None), 0)
+
+    def test_lru_eviction(self):
+        lru = TTLCache(size=2, ttl=60)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertEqual((lru.get("a"), lru.get("b"), lru.get("c")), (1, None, 3))
+
+    def test_concurrent_calls_share_one_result(self):
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return "answer"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+        leader.start()
+        started.wait()
+        follower = threading.Thread(
+            target=lambda: results.append(flights.do("k", slow))
+        )
+        follower.start()
+        # Give the follower time to join the call in flight
+        follower.join(timeout=0.2)
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(results), [("answer", False), ("answer", True)])
+
+    def test_followers_are_released_when_the_leader_is_interrupted(self):
+        class Interrupted(BaseException):
+            pass
+
+        flights = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        errors = []
+
+        def interrupted():
+            started.set()
+            release.wait()
+            raise Interrupted()
+
+        def run():
+            try:
+                flights.do("k", interrupted)
+            except BaseException as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=run)
+        follower.start()
+        follower.join(timeout=0.2)
+        release.set()
+        leader.join()
+        follower.join(timeout=5)
+
+        self.assertFalse(follower.is_alive())
+        self.assertEqual(
+            sorted(type(e).__name__ for e in errors), ["Interrupted", "RuntimeError"]
+        )
+        self.assertFalse(flights.in_flight("k"))
+
+    @mock.patch("products.views.get_ai_product_recommendations")
+    def test_similar_profiles_share_an_answer(self, generate):
+        # The answer repeats the amounts of the prompt it was generated from
+        generate.side_effect = lambda salary, money, period, products: {
+            "status": "success",
+            "recommendations": f"{money} {products[0]['maturity_amount']}",
+        }
+        url = reverse("ai-recommendations-page")
+        other = get_user_model().objects.create_user(
+            username="neighbour", password="password", nickname="neighbour"
+        )
+
+        self.user.money = 10010000
+        self.user.save()
+        first = self.client.get(url, {"type": "deposit"})
+        other.money = 10040000
+        other.save()
+        self.client.force_login(other)
+        second = self.client.get(url, {"type": "deposit"})
+
+        self.assertEqual(generate.call_count, 1)
+        self.assertEqual((first.data["cache"], second.data["cache"]), ("miss", "hit"))
+        # Both users see the bucket's amounts, never the other user's
+        for response in [first, second]:
+            self.assertEqual(response.data["user_info"]["money"], 10000000)
+            self.assertEqual(response.data["recommendations"], "10000000 10321480")
+            self.assertNotIn(b"10010000", response.content)
+            self.assertNotIn(b"10331802", response.content)
+
+
+class AIRecommendationStreamTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendation_cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        self.user = get_user_model().objects.create_user(
+            username="streamer", password="password", nickname="streamer"
+        )
+        self.client.force_login(self.user)
+
+    def read_events(self, response):
+        body = b"".join(response.streaming_content).decode()
+        return [
+            (
+                block.split("\n")[0][len("event: ") :],
+                json.loads(block.split("\n")[1][len("data: ") :]),
+            )
+            for block in body.strip().split("\n\n")
+        ]
+
+    @mock.patch("products.views.stream_ai_product_recommendations")
+    def test_tokens_are_streamed_then_cached(self, stream):
+        stream.side_effect = lambda *args: (piece for piece in ["예금 ", "추천"])
+        url = reverse("ai-recommendations-stream")
+
+        response = self.client.get(url, {"type": "deposit"})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = self.read_events(response)
+        self.assertEqual(
+            [event for event, _ in events], ["meta", "token", "token", "done"]
+        )
+        self.assertEqual(events[0][1]["cache"], "miss")
+
+        again = self.read_events(self.client.get(url, {"type": "deposit"}))
+        self.assertEqual(stream.call_count, 1)
+        self.assertEqual(again[0][1]["cache"], "hit")
+        self.assertEqual(again[1], ("token", "예금 추천"))
+
+    @mock.patch("products.views.stream_ai_product_recommendations")
+    def test_disconnect_closes_the_upstream_stream(self, stream):
+        closed = []
+
+        def tokens(*args):
+            try:
+                yield "예금 "
+                yield "추천"
+            finally:
+                closed.append(True)
+
+        stream.side_effect = tokens
+        response = self.client.get(
+            reverse("ai-recommendations-stream"), {"type": "deposit"}
+        )
+        content = iter(response.streaming_content)
+        next(content)  # meta
+        next(content)  # first token
+        response.close()
+
+        self.assertEqual(closed, [True])
+        self.assertEqual(len(recommendation_cache), 0)
+
+
+class PromptCompactionTestCase(TestCase):
+    def candidates(self):
+        deposit = {
+            "name": "정기예금",
+            "bank": "국민은행",
+            "type": "예금",
+            "interest_rate_type": "S",
+            "join_member": "실명의 개인 및 개인사업자 (단, 국가 및 지방자치단체 제외)",
+        }
+        return [
+            {**deposit, "interest_rate": 3.9, "period_months": 6},
+            {**deposit, "interest_rate": 3.5, "period_months": 12},
+            {**deposit, "name": "특판예금", "interest_rate": 4.0, "period_months": 12},
+            {
+                "name": "주택담보대출",
+                "bank": "신한은행",
+                "type": "대출",
+                "interest_rate_min": 3.8,
+                "interest_rate_max": 5.1,
+            },
+        ]
+
+    def test_candidates_are_deduplicated_and_encoded_as_tables(self):
+        ranked = rank_candidates(self.candidates(), period=12)
+        self.assertEqual(
+            [(item["name"], item["period_months"]) for item in ranked["예금"]],
+            [("특판예금", 12), ("정기예금", 12)],
+        )
+
+        lines = encode_tables(ranked).split("\n")
+        self.assertEqual(lines[0].split("|")[:2], ["[예금] name", "bank"])
+        self.assertEqual(lines[1].split("|")[:3], ["특판예금", "국민은행", "4.0"])
+        self.assertTrue(lines[1].endswith("…"))
+        self.assertEqual(lines[4].split("|")[3:6], ["3.8", "5.1", "-"])
+
+    def test_rows_are_dropped_to_fit_the_budget(self):
+        ranked = rank_candidates(self.candidates(), period=12)
+        kept, dropped = fit_to_budget(ranked, fixed_tokens=0, budget=1)
+        self.assertEqual(dropped, 1)
+        self.assertEqual([len(items) for items in kept.values()], [1, 1])
+
+        everything = estimate_tokens(encode_tables(ranked))
+        kept, dropped = fit_to_budget(ranked, fixed_tokens=0, budget=everything + 10)
+        self.assertEqual(dropped, 0)
+
+    @mock.patch("products.ai_backends.openai.ChatCompletion.create")
+    def test_calls_record_prompt_size_and_latency(self, create):
+        call_metrics.clear()
+        response = mock.MagicMock()
+        response.choices = [mock.Mock(message={"content": "추천"})]
+        response.__getitem__.side_effect = {"usage": {"prompt_tokens": 321}}.get
+        create.return_value = response
+
+        with self.settings(OPENAI_API_KEY="key"):
+            answer = get_ai_product_recommendations(0, 0, 12, self.candidates())
+
+        self.assertEqual(answer, {"status": "success", "recommendations": "추천"})
+        prompt = create.call_args.kwargs["messages"][1]["content"]
+        self.assertNotIn('"join_member"', prompt)
+        summary = call_metrics.summary()
+        self.assertEqual((summary["calls"], summary["errors"]), (1, 0))
+        self.assertEqual(summary["usage_prompt_tokens"]["max"], 321)
+        self.assertEqual(summary["prompt_tokens"]["max"], estimate_tokens(prompt))
+
+
+@override_settings(AI_JOB_WORKERS=0)
+class AIRecommendationJobTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendation_cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        self.user = get_user_model().objects.create_user(
+            username="waiter", password="password", nickname="waiter"
+        )
+        self.client.force_login(self.user)
+
+    @mock.patch("products.ai_jobs.get_ai_product_recommendations")
+    def test_job_is_enqueued_then_polled(self, generate):
+        generate.return_value = {"status": "success", "recommendations": "추천"}
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("ai-recommendation-jobs") + "?type=deposit"
+            )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], AIRecommendationJob.PENDING)
+        generate.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        polled = self.client.get(response.data["poll_url"])
+        self.assertEqual(polled.data["status"], AIRecommendationJob.SUCCESS)
+        self.assertEqual(polled.data["result"]["recommendations"], "추천")
+
+        # Other users cannot read the job
+        other = get_user_model().objects.create_user(
+            username="other", password="password", nickname="other"
+        )
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(response.data["poll_url"]).status_code, 404)
+
+    @mock.patch("products.ai_jobs.get_ai_product_recommendations")
+    def test_lost_jobs_are_recovered(self, generate):
+        generate.return_value = {"status": "success", "recommendations": "추천"}
+        stale = timezone.now() - timedelta(hours=1)
+        lost = AIRecommendationJob.objects.create(
+            user=self.user,
+            key="lost",
+            inputs={"salary": 0, "money": 0, "period": 12, "product_data": []},
+            status=AIRecommendationJob.RUNNING,
+            started_at=stale,
+            attempts=1,
+        )
+        given_up = AIRecommendationJob.objects.create(
+            user=self.user,
+            key="given-up",
+            inputs={},
+            status=AIRecommendationJob.RUNNING,
+            started_at=stale,
+            attempts=3,
+        )
+
+        self.assertEqual(recover_jobs(), [lost.id])
+        run_job(lost.id)
+        run_job(lost.id)  # A second worker finds it claimed
+
+        lost.refresh_from_db()
+        given_up.refresh_from_db()
+        self.assertEqual((lost.status, lost.attempts), ("success", 2))
+        self.assertEqual(given_up.status, AIRecommendationJob.ERROR)
+        self.assertEqual(generate.call_count, 1)
+
+    @mock.patch("products.ai_jobs.get_ai_product_recommendations")
+    def test_stalled_worker_does_not_overwrite_a_requeued_job(self, generate):
+        job = AIRecommendationJob.objects.create(
+            user=self.user,
+            key="stalled",
+            inputs={"salary": 0, "money": 0, "period": 12, "product_data": []},
+        )
+
+        def requeued_meanwhile(*args):
+            # Recovered and claimed by another worker while this one waits
+            AIRecommendationJob.objects.filter(id=job.id).update(
+                attempts=F("attempts") + 1
+            )
+            return {"status": "error", "message": "timeout"}
+
+        generate.side_effect = requeued_meanwhile
+        run_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (AIRecommendationJob.RUNNING, 2))
+        self.assertIsNone(job.result)
+
+    @mock.patch("products.ai_jobs.get_ai_product_recommendations")
+    def test_poll_resumes_jobs_after_a_restart(self, generate):
+        generate.return_value = {"status": "success", "recommendations": "추천"}
+        inputs = {"salary": 0, "money": 0, "period": 12, "product_data": []}
+        # Left queued and running by a process that stopped
+        queued = AIRecommendationJob.objects.create(
+            user=self.user,
+            key="queued",
+            inputs=inputs,
+            created_at=timezone.now() - timedelta(minutes=5),
+        )
+        running = AIRecommendationJob.objects.create(
+            user=self.user,
+            key="running",
+            inputs=inputs,
+            status=AIRecommendationJob.RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+            attempts=1,
+        )
+        fresh = AIRecommendationJob.objects.create(
+            user=self.user, key="fresh", inputs=inputs
+        )
+
+        for job in [queued, running]:
+            polled = self.client.get(reverse("ai-recommendation-job", args=[job.id]))
+            self.assertEqual(polled.data["status"], AIRecommendationJob.SUCCESS)
+
+        # A job that just started waiting is left to its pool
+        polled = self.client.get(reverse("ai-recommendation-job", args=[fresh.id]))
+        self.assertEqual(polled.data["status"], AIRecommendationJob.PENDING)
+        self.assertEqual(generate.call_count, 2)
+
+
+@override_settings(AI_BACKEND="local")
+class LocalAIBackendTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        recommendation_cache.clear()
+        ingest_payload("deposit", deposit_payload())
+        self.user = get_user_model().objects.create_user(
+            username="offline", password="password", nickname="offline", money=1000000
+        )
+        self.client.force_login(self.user)
+
+    def test_local_backend_answers_from_the_prompt_tables(self):
+        self.assertIsInstance(get_backend(), LocalBackend)
+        response = self.client.get(
+            reverse("ai-recommendations-page"), {"type": "deposit"}
+        )
+        self.assertEqual(response.status_code, 200)
+        answer = response.data["recommendations"]
+        self.assertIn("KB Star 정기예금 (예금) - 금리: 3.8%, 기간: 12개월", answer)
+        self.assertIn("환산 금액:", answer)
+
+        recommendation_cache.clear()
+        again = self.client.get(reverse("ai-recommendations-page"), {"type": "deposit"})
+        self.assertEqual(again.data["recommendations"], answer)
+
+    def test_local_backend_streams_the_same_answer(self):
+        page = self.client.get(reverse("ai-recommendations-page"), {"type": "deposit"})
+        recommendation_cache.clear()
+
+        stream = self.client.get(
+            reverse("ai-recommendations-stream"), {"type": "deposit"}
+        )
+        body = b"".join(stream.streaming_content).decode()
+        pieces = [
+            json.loads(block.split("\n")[1][len("data: ") :])
+            for block in body.strip().split("\n\n")
+            if block.startswith("event: token")
+        ]
+        self.assertGreater(len(pieces), 1)
+        self.assertEqual("".join(pieces), page.data["recommendations"])
+
+
+class MarketDataGatewayTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        market_data.metrics.clear()
+
+    def upstream(self, status_code=200, payload=None):
+        response = mock.Mock(status_code=status_code)
+        response.json.return_value = payload
+        return response
+
+    @mock.patch("products.market_data.session")
+    def test_repeated_reads_hit_the_cache(self, session):
+        session.get.return_value = self.upstream(payload=[{"cur_unit": "USD"}])
+        url = reverse("exchange-rate")
+
+        first = self.client.get(url)
+        second = self.client.get(url)
+
+        self.assertEqual(first.json(), [{"cur_unit": "USD"}])
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(session.get.call_count, 1)
+        self.assertEqual(session.get.call_args.kwargs["timeout"], market_data.TIMEOUT)
+        counts = market_data.metrics.summary()["exchange"]
+        self.assertEqual((counts["miss"], counts["hit"]), (1, 1))
+
+    @mock.patch("products.market_data.session")
+    def test_stale_entry_is_served_while_it_is_refreshed(self, session):
+        cache_key = "market:stock:A005930"
+        cache.set(cache_key, {"data": {"old": True}, "fresh_until": 0})
+        session.get.return_value = self.upstream(payload={"old": False})
+        url = reverse("stock-details", args=["A005930"])
+
+        with mock.patch.object(market_data, "_refresher") as refresher:
+            refresher.submit.side_effect = lambda run: run()
+            stale = self.client.get(url)
+        self.assertEqual(stale.json(), {"old": True})
+        self.assertEqual(self.client.get(url).json(), {"old": False})
+
+        # Without a newer snapshot, a failing source keeps serving the stale entry
+        MarketDataSnapshot.objects.all().delete()
+        cache.set(cache_key, {"data": {"old": True}, "fresh_until": 0})
+        session.get.return_value = self.upstream(status_code=503)
+        with mock.patch.object(market_data, "_refresher") as refresher:
+            refresher.submit.side_effect = lambda run: run()
+            self.assertEqual(self.client.get(url).json(), {"old": True})
+        self.assertEqual(market_data.metrics.summary()["stock"]["error"], 1)
+
+    @mock.patch("products.market_data.session")
+    def test_failure_without_cached_data(self, session):
+        session.get.side_effect = requests.ConnectionError("down")
+        response = self.client.get(reverse("kospi-stock-market-data"))
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(
+            response.json()["detail"], "주식 시장 데이터를 가져오는 데 실패했습니다."
+        )
+
+    @mock.patch("products.market_data.session")
+    def test_views_serve_the_latest_snapshot(self, session):
+        key = market_data.exchange_rate_day()
+        MarketDataSnapshot.objects.create(
+            source="exchange",
+            key=key,
+            data=[{"cur_unit": "JPY"}],
+            fetched_at=timezone.now() - timedelta(days=2),
+        )
+        MarketDataSnapshot.objects.create(
+            source="exchange", key=key, data=[{"cur_unit": "USD"}]
+        )
+
+        response = self.client.get(reverse("exchange-rate"))
+
+        self.assertEqual(response.json(), [{"cur_unit": "USD"}])
+        session.get.assert_not_called()
+        counts = market_data.metrics.summary()["exchange"]
+        self.assertEqual((counts["snapshot"], counts["hit"]), (1, 1))
+
+    @mock.patch("products.market_data.session")
+    def test_prefetcher_stores_a_snapshot_of_every_source(self, session):
+        def upstream(url, **kwargs):
+            if "exgold" in url:
+                return self.upstream(payload={"data": [kwargs["params"]["type"]]})
+            if "naver" in url:
+                response = self.upstream()
+                response.text = "[['날짜', '종가'], ['20240102', 2669.81]]"
+                return response
+            return self.upstream(payload=[{"url": url}])
+
+        session.get.side_effect = upstream
+        session.post.side_effect = upstream
+        call_command("prefetch_market_data", "--once", stdout=StringIO())
+
+        self.assertEqual(
+            sorted(MarketDataSnapshot.objects.values_list("source", flat=True)),
+            ["exchange", "gold", "gold", "index", "index", "ranking"],
+        )
+        cache.clear()
+        calls = session.get.call_count
+        response = self.client.get(reverse("kospi-stock-market-data"))
+        self.assertEqual(response.json(), [{"date": "20240102", "close": 2669.81}])
+        self.assertEqual(session.get.call_count, calls)
@@ -36,9 +36,30 @@ urlpatterns = [
     path(
         "lowest-rate-loans/", views.lowest_rate_loan_products, name="lowest-rate-loans"
     ),
+    path(
+        "credit-grades/",
+        views.credit_grade_leaderboard,
+        name="credit-grade-leaderboard",
+    ),
     path("search/", views.search_financial_products, name="search-products"),
+    path("autocomplete/", views.autocomplete_products, name="autocomplete-products"),
     path("filter/", views.filter_products, name="filter-products"),
     path("statistics/", views.get_product_statistics, name="product-statistics"),
+    path(
+        "calculator/maturity/",
+        views.rank_maturity_payouts,
+        name="maturity-calculator",
+    ),
+    path(
+        "calculator/repayment/",
+        views.simulate_loan_repayments,
+        name="repayment-simulator",
+    ),
+    path(
+        "rate-history/<str:fin_prdt_cd>/",
+        views.get_rate_history,
+        name="rate-history",
+    ),
     path(
         "recommendations/",
         views.get_product_recommendations,
@@ -49,6 +70,21 @@ urlpatterns = [
         views.get_ai_recommendations_page,
         name="ai-recommendations-page",
     ),
+    path(
+        "ai-recommendations/stream/",
+        views.stream_ai_recommendations,
+        name="ai-recommendations-stream",
+    ),
+    path(
+        "ai-recommendations/jobs/",
+        views.enqueue_ai_recommendation_job,
+        name="ai-recommendation-jobs",
+    ),
+    path(
+        "ai-recommendations/jobs/<int:job_id>/",
+        views.get_ai_recommendation_job,
+        name="ai-recommendation-job",
+    ),
     path(
         "gold-and-silver-prices/",
         views.get_gold_and_silver_prices,
@@ -81,6 +117,12 @@ urlpatterns = [
     ),
     # Admin endpoints for updating financial product data
     path("admin/update-all/", views.update_all_products, name="update-all-products"),
+    path("admin/ai-metrics/", views.get_ai_metrics, name="ai-metrics"),
+    path(
+        "admin/market-data-metrics/",
+        views.get_market_data_metrics,
+        name="market-data-metrics",
+    ),
     path(
         "admin/batch-update/", views.batch_update_products, name="batch-update-products"
     ),
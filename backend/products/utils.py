@@ -1,22 +1,29 @@
 import requests
 import logging
 import os
+import queue
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from .models import (
-    FinancialProduct,
     DepositProduct,
     SavingProduct,
-    LoanProduct,
     MortgageLoanOption,
     CreditLoanOption,
-    RequirementOption,
-    DepositProduct_JoinWay,
-    LoanProduct_JoinWay,
     LendingRateOption,
+    StagedProductPage,
 )
+from .ingestion import INGESTORS, ChangeSet, ingest_payload, to_int
+from .signals import products_refreshed
+from .leaderboards import rebuild_leaderboards
+from .statistics import materialize_statistics
 
 logger = logging.getLogger(__name__)
 
@@ -41,785 +48,353 @@ def create_session_with_retry():
     return session
 
 
-def fetch_deposit_products():
-    """
-    Fetch deposit product data from the financial API
-    """
-    url = f"http://finlife.fss.or.kr/finlifeapi/depositProductsSearch.json"
-    params = {
-        "auth": API_KEY,
-        "topFinGrpNo": "020000",  # Deposit products category
-        "pageNo": 1,
-    }
+FINLIFE_BASE_URL = "http://finlife.fss.or.kr/finlifeapi"
 
-    try:
-        session = create_session_with_retry()
-        response = session.get(url, params=params, timeout=10)
+# product type -> finlife endpoint
+FINLIFE_ENDPOINTS = {
+    "deposit": "depositProductsSearch.json",
+    "saving": "savingProductsSearch.json",
+    "mortgage": "mortgageLoanProductsSearch.json",
+    "rent": "rentHouseLoanProductsSearch.json",
+    "credit": "creditLoanProductsSearch.json",
+}
 
-        # Check HTTP status code first
-        if response.status_code != 200:
-            logger.error(f"Deposit API HTTP Error: Status Code {response.status_code}")
-            return False
+# topFinGrpNo values queried for every endpoint
+FINLIFE_GROUPS = {
+    "020000": "은행",
+    "030200": "여신전문금융",
+    "030300": "저축은행",
+    "050000": "보험",
+    "060000": "금융투자",
+}
 
-        # Try to parse JSON
-        try:
-            data = response.json()
-        except ValueError:
-            logger.error("Deposit API Error: Invalid JSON response")
-            return False
-
-        # Check for result key in response
-        if "result" not in data:
-            logger.error(
-                f"Deposit API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
-            )
-            return False
-
-        # Process base product list
-        base_list = data["result"].get("baseList", [])
-        for item in base_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping product with no product code")
-                continue
-
-            # Create or update FinancialProduct
-            product, created = FinancialProduct.objects.update_or_create(
-                fin_prdt_cd=fin_prdt_cd,
-                defaults={
-                    "kor_co_nm": item.get("kor_co_nm", ""),
-                    "fin_prdt_nm": item.get("fin_prdt_nm", ""),
-                    "join_way": item.get("join_way", ""),
-                    "join_member": item.get("join_member", ""),
-                },
-            )
+# Maximum number of pages of one group downloaded at the same time
+FINLIFE_PAGE_WORKERS = getattr(settings, "FINLIFE_PAGE_WORKERS", 4)
 
-            # Create or update join ways
-            join_ways = item.get("join_way", "").split(",")
-            for join_way in join_ways:
-                if join_way.strip():
-                    DepositProduct_JoinWay.objects.get_or_create(
-                        product=product, join_way=join_way.strip()
-                    )
+# Maximum number of downloaded pages buffered per type in parallel mode
+FINLIFE_PAGE_BUFFER = getattr(settings, "FINLIFE_PAGE_BUFFER", 16)
 
-        # Process option list
-        option_list = data["result"].get("optionList", [])
-        for item in option_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-            if not fin_prdt_cd:
-                logger.warning("Skipping option with no product code")
-                continue
-
-            try:
-                product = FinancialProduct.objects.get(fin_prdt_cd=fin_prdt_cd)
-
-                # Convert string rate values to float
-                intr_rate = 0.0
-                intr_rate2 = 0.0
-
-                if item.get("intr_rate") is not None:
-                    try:
-                        intr_rate = float(item.get("intr_rate"))
-                    except (ValueError, TypeError):
-                        intr_rate = 0.0
-
-                if item.get("intr_rate2") is not None:
-                    try:
-                        intr_rate2 = float(item.get("intr_rate2"))
-                    except (ValueError, TypeError):
-                        intr_rate2 = 0.0
-
-                # Create or update DepositProduct based on option data
-                DepositProduct.objects.update_or_create(
-                    product=product,
-                    defaults={
-                        "fin_co_no": item.get("fin_co_no", ""),
-                        "dcls_month": item.get("dcls_month", ""),
-                        "category": "예금",
-                        "intr_rate_type": item.get("intr_rate_type", ""),
-                        "save_trm": item.get("save_trm", 0),
-                        "intr_rate": intr_rate,
-                        "intr_rate2": intr_rate2,
-                    },
-                )
+# Age after which staged pages of an interrupted refresh are discarded
+STAGED_PAGE_TTL = timedelta(hours=getattr(settings, "STAGED_PAGE_TTL_HOURS", 24))
 
-                # Create or update RequirementOption
-                RequirementOption.objects.update_or_create(
-                    product=product,
-                    save_trm=item.get("save_trm", 0),
-                    intr_rate_type=item.get("intr_rate_type", ""),
-                    defaults={
-                        "rsrv_type": "",  # Default empty string for deposit products
-                        "intr_rate": intr_rate,
-                        "intr_rate2": intr_rate2,
-                    },
-                )
-            except FinancialProduct.DoesNotExist:
-                logger.warning(f"Product with ID {fin_prdt_cd} not found for option")
-                continue
+# product type -> key used in the fetch_products_by_type results
+RESULT_KEYS = {
+    "deposit": "deposit_products",
+    "saving": "saving_products",
+    "mortgage": "mortgage_loans",
+    "rent": "rent_loans",
+    "credit": "credit_loans",
+}
 
-        return True
-    except requests.exceptions.Timeout:
-        logger.error("Deposit API request timed out")
-        return False
-    except requests.exceptions.ConnectionError:
-        logger.error("Deposit API connection error - server may be unreachable")
-        return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Deposit API request error: {str(e)}")
-        return False
-    except Exception as e:
-        logger.exception(f"Error fetching deposit products: {str(e)}")
-        return False
+_thread_sessions = threading.local()
 
 
-def fetch_saving_products():
+def get_thread_session():
     """
-    Fetch saving product data from the financial API
+    Return a retrying session reused by the current thread
+    """
+    session = getattr(_thread_sessions, "session", None)
+    if session is None:
+        session = create_session_with_retry()
+        _thread_sessions.session = session
+    return session
+
+
+def fetch_finlife_page(product_type, top_fin_grp_no, page_no):
+    """
+    Download one page of the finlife API for a product type and group
+    Returns the decoded JSON, or None if the request failed
     """
-    url = f"http://finlife.fss.or.kr/finlifeapi/savingProductsSearch.json"
+    label = INGESTORS[product_type].label
     params = {
         "auth": API_KEY,
-        "topFinGrpNo": "020000",  # Saving products category
-        "pageNo": 1,
+        "topFinGrpNo": top_fin_grp_no,
+        "pageNo": page_no,
     }
 
+    response = get_thread_session().get(
+        f"{FINLIFE_BASE_URL}/{FINLIFE_ENDPOINTS[product_type]}",
+        params=params,
+        timeout=10,
+    )
+
+    # Check HTTP status code first
+    if response.status_code != 200:
+        logger.error(f"{label} API HTTP Error: Status Code {response.status_code}")
+        return None
+
+    # Try to parse JSON
     try:
-        session = create_session_with_retry()
-        response = session.get(url, params=params, timeout=10)
+        data = response.json()
+    except ValueError:
+        logger.error(f"{label} API Error: Invalid JSON response")
+        return None
+
+    # Check for result key in response
+    if "result" not in data:
+        logger.error(
+            f"{label} API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
+        )
+        return None
 
-        # Check HTTP status code first
-        if response.status_code != 200:
-            logger.error(f"Saving API HTTP Error: Status Code {response.status_code}")
-            return False
+    return data
 
-        # Try to parse JSON
-        try:
-            data = response.json()
-        except ValueError:
-            logger.error("Saving API Error: Invalid JSON response")
-            return False
-
-        # Check for result key in response
-        if "result" not in data:
-            logger.error(
-                f"Saving API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
-            )
-            return False
-
-        # Process base product list
-        base_list = data["result"].get("baseList", [])
-        for item in base_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping product with no product code")
-                continue
-
-            # Create or update FinancialProduct
-            product, created = FinancialProduct.objects.update_or_create(
-                fin_prdt_cd=fin_prdt_cd,
-                defaults={
-                    "kor_co_nm": item.get("kor_co_nm", ""),
-                    "fin_prdt_nm": item.get("fin_prdt_nm", ""),
-                    "join_way": item.get("join_way", ""),
-                    "join_member": item.get("join_member", ""),
-                },
-            )
 
-            # Create or update join ways
-            join_ways = item.get("join_way", "").split(",")
-            for join_way in join_ways:
-                if join_way.strip():
-                    DepositProduct_JoinWay.objects.get_or_create(
-                        product=product, join_way=join_way.strip()
-                    )
+def _timed_fetch_page(product_type, top_fin_grp_no, page_no):
+    fetch_start = time.time()
+    data = fetch_finlife_page(product_type, top_fin_grp_no, page_no)
+    return data, time.time() - fetch_start
 
-        # Process option list
-        option_list = data["result"].get("optionList", [])
-        for item in option_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping option with no product code")
-                continue
-
-            # Convert string rate values to float
-            intr_rate = 0.0
-            intr_rate2 = 0.0
-
-            if item.get("intr_rate") is not None:
-                try:
-                    intr_rate = float(item.get("intr_rate"))
-                except (ValueError, TypeError):
-                    intr_rate = 0.0
-
-            if item.get("intr_rate2") is not None:
-                try:
-                    intr_rate2 = float(item.get("intr_rate2"))
-                except (ValueError, TypeError):
-                    intr_rate2 = 0.0
-
-            try:
-                product = FinancialProduct.objects.get(fin_prdt_cd=fin_prdt_cd)
-
-                # Create or update SavingProduct based on option data
-                SavingProduct.objects.update_or_create(
-                    product=product,
-                    defaults={
-                        "fin_co_no": item.get("fin_co_no", ""),
-                        "dcls_month": item.get("dcls_month", ""),
-                        "category": "적금",
-                        "intr_rate_type": item.get("intr_rate_type", ""),
-                        "rsrv_type": item.get("rsrv_type", ""),
-                        "save_trm": item.get("save_trm", 0),
-                        "intr_rate": intr_rate,
-                        "intr_rate2": intr_rate2,
-                    },
-                )
 
-                # Create or update RequirementOption
-                RequirementOption.objects.update_or_create(
-                    product=product,
-                    save_trm=item.get("save_trm", 0),
-                    intr_rate_type=item.get("intr_rate_type", ""),
-                    defaults={
-                        "rsrv_type": item.get("rsrv_type", ""),
-                        "intr_rate": intr_rate,
-                        "intr_rate2": intr_rate2,
-                    },
-                )
-            except FinancialProduct.DoesNotExist:
-                logger.warning(f"Product with ID {fin_prdt_cd} not found for option")
-                continue
+def iter_finlife_pages(product_type):
+    """
+    Yield (payload, seconds) for every page of a product type in every group
 
-        return True
+    Page 1 of a group is fetched first to read max_page_no, the remaining
+    pages are fetched with at most FINLIFE_PAGE_WORKERS requests in flight.
+    Iteration stops after yielding a page whose payload is None.
+    """
+    for top_fin_grp_no in FINLIFE_GROUPS:
+        first_page = _timed_fetch_page(product_type, top_fin_grp_no, 1)
+        yield first_page
+        if first_page[0] is None:
+            return
+
+        max_page_no = to_int(first_page[0]["result"].get("max_page_no"), 1)
+        if max_page_no <= 1:
+            continue
+
+        executor = ThreadPoolExecutor(max_workers=FINLIFE_PAGE_WORKERS)
+        try:
+            pages = executor.map(
+                lambda page_no: _timed_fetch_page(
+                    product_type, top_fin_grp_no, page_no
+                ),
+                range(2, max_page_no + 1),
+            )
+            for page in pages:
+                yield page
+                if page[0] is None:
+                    return
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def stream_product_pages(product_type):
+    """
+    Yield (payload, seconds) pages for a product type, logging request failures
+    A failed download is yielded as a None payload and ends the stream
+    """
+    label = INGESTORS[product_type].label
+    try:
+        yield from iter_finlife_pages(product_type)
+        return
     except requests.exceptions.Timeout:
-        logger.error("Saving API request timed out")
-        return False
+        logger.error(f"{label} API request timed out")
     except requests.exceptions.ConnectionError:
-        logger.error("Saving API connection error - server may be unreachable")
-        return False
+        logger.error(f"{label} API connection error - server may be unreachable")
     except requests.exceptions.RequestException as e:
-        logger.error(f"Saving API request error: {str(e)}")
-        return False
+        logger.error(f"{label} API request error: {str(e)}")
     except Exception as e:
-        logger.exception(f"Error fetching saving products: {str(e)}")
-        return False
+        logger.exception(f"Error fetching {label.lower()} products: {str(e)}")
+    yield None, 0.0
 
 
-def fetch_mortgage_loan_products():
+class PageDownloadFailed(Exception):
     """
-    Fetch mortgage loan product data from the financial API
+    Raised to skip a product type when one of its pages failed
     """
-    url = f"http://finlife.fss.or.kr/finlifeapi/mortgageLoanProductsSearch.json"
-    params = {
-        "auth": API_KEY,
-        "topFinGrpNo": "050000",  # Mortgage loan products category
-        "pageNo": 1,
-    }
 
-    try:
-        session = create_session_with_retry()
-        response = session.get(url, params=params, timeout=10)
-
-        # Check HTTP status code first
-        if response.status_code != 200:
-            logger.error(
-                f"Mortgage Loan API HTTP Error: Status Code {response.status_code}"
-            )
-            return False
 
-        # Try to parse JSON
-        try:
-            data = response.json()
-        except ValueError:
-            logger.error("Mortgage Loan API Error: Invalid JSON response")
-            return False
-
-        # Check for result key in response
-        if "result" not in data:
-            logger.error(
-                f"Mortgage Loan API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
-            )
-            return False
-
-        # Process base product list
-        base_list = data["result"].get("baseList", [])
-        for item in base_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping mortgage loan product with no product code")
-                continue
-
-            # Create or update FinancialProduct
-            product, created = FinancialProduct.objects.update_or_create(
-                fin_prdt_cd=fin_prdt_cd,
-                defaults={
-                    "kor_co_nm": item.get("kor_co_nm", ""),
-                    "fin_prdt_nm": item.get("fin_prdt_nm", ""),
-                    "join_way": item.get("join_way", ""),
-                    "loan_type": "주택담보대출",
-                    "join_member": item.get("join_member", ""),
-                },
-            )
+def write_product_type(product_type, pages):
+    """
+    Ingest a stream of (payload, seconds) pages for one product type
+
+    Each page is staged in StagedProductPage as soon as it arrives, so at
+    most FINLIFE_PAGE_BUFFER pages wait in memory and the write lock is
+    never held across network requests. Once every page is staged they are
+    written in a single transaction, and a failed page leaves the previous
+    data untouched. Rows the refresh did not see are then removed and
+    products_refreshed is sent with the resulting change set.
+    Returns a report with success flag, page count, row counts,
+    per-phase timings and the change set.
+    """
+    ingestor = INGESTORS[product_type]
+    changes = ChangeSet(product_type)
+    report = {
+        "success": False,
+        "pages": 0,
+        "rows": {},
+        "timings": {"fetch": 0.0, "stage": 0.0},
+        "changes": changes,
+    }
+    run = uuid.uuid4().hex
+    # Pages left behind by a process that died during a refresh
+    StagedProductPage.objects.filter(
+        created_at__lt=timezone.now() - STAGED_PAGE_TTL
+    ).delete()
 
-            # Create or update LoanProduct
-            LoanProduct.objects.update_or_create(
-                product=product,
-                defaults={
-                    "fin_co_no": item.get("fin_co_no", ""),
-                    "dcls_month": item.get("dcls_month", ""),
-                    "loan_inci_expn": item.get("loan_inci_expn", ""),
-                    "erly_rpay_fee": item.get("erly_rpay_fee", ""),
-                    "dly_rate": item.get("dly_rate", ""),
-                    "loan_lmt": item.get("loan_lmt", ""),
-                },
+    try:
+        staged = []
+        for data, fetch_time in pages:
+            report["timings"]["fetch"] += fetch_time
+            if data is None:
+                raise PageDownloadFailed()
+            stage_start = time.time()
+            staged.append(
+                StagedProductPage.objects.create(
+                    run=run, product_type=product_type, payload=data
+                ).id
             )
+            report["timings"]["stage"] += time.time() - stage_start
 
-            # Create or update join ways
-            join_ways = item.get("join_way", "").split(",")
-            for join_way in join_ways:
-                if join_way.strip():
-                    LoanProduct_JoinWay.objects.get_or_create(
-                        product=product, join_way=join_way.strip()
-                    )
-
-        # Process option list
-        option_list = data["result"].get("optionList", [])
-        for item in option_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            # Skip processing options without product code or required fields
-            if not fin_prdt_cd:
-                continue
-
-            # Convert numeric fields to float with defaults
-            lend_rate_min = item.get("lend_rate_min")
-            lend_rate_max = item.get("lend_rate_max")
-            lend_rate_avg = item.get("lend_rate_avg")
-
-            if lend_rate_min is not None:
-                try:
-                    lend_rate_min = float(lend_rate_min)
-                except (ValueError, TypeError):
-                    lend_rate_min = 0.0
-            else:
-                lend_rate_min = 0.0
-
-            if lend_rate_max is not None:
-                try:
-                    lend_rate_max = float(lend_rate_max)
-                except (ValueError, TypeError):
-                    lend_rate_max = 0.0
-            else:
-                lend_rate_max = 0.0
-
-            if lend_rate_avg is not None:
-                try:
-                    lend_rate_avg = float(lend_rate_avg)
-                except (ValueError, TypeError):
-                    lend_rate_avg = None
-
-            try:
-                product = FinancialProduct.objects.get(fin_prdt_cd=fin_prdt_cd)
-
-                # Create or update MortgageLoanOption if we have the necessary fields
-                if (
-                    "mrtg_type" in item
-                    and "rpay_type" in item
-                    and "lend_rate_type" in item
-                ):
-                    MortgageLoanOption.objects.update_or_create(
-                        product=product,
-                        mrtg_type=item.get("mrtg_type", ""),
-                        rpay_type=item.get("rpay_type", ""),
-                        lend_rate_type=item.get("lend_rate_type", ""),
-                        defaults={
-                            "lend_rate_min": lend_rate_min,
-                            "lend_rate_max": lend_rate_max,
-                            "lend_rate_avg": lend_rate_avg,
-                        },
-                    )
-
-                # Create or update LendingRateOption for compatibility (may use only rpay_type and lend_rate_type)
-                if "rpay_type" in item and "lend_rate_type" in item:
-                    LendingRateOption.objects.update_or_create(
-                        product=product,
-                        rpay_type=item.get("rpay_type", ""),
-                        lend_rate_type=item.get("lend_rate_type", ""),
-                        defaults={
-                            "lend_rate_min": lend_rate_min,
-                            "lend_rate_max": lend_rate_max,
-                            "lend_rate_avg": lend_rate_avg,
-                        },
-                    )
-                else:
-                    # For entries with only lend_rate_avg and no other fields
-                    if lend_rate_avg is not None:
-                        # Look for existing options to update
-                        existing_options = LendingRateOption.objects.filter(
-                            product=product
-                        )
-                        if existing_options.exists():
-                            # Update all existing options with the average rate
-                            existing_options.update(lend_rate_avg=lend_rate_avg)
-                        else:
-                            # Create a default option with just the average rate
-                            LendingRateOption.objects.create(
-                                product=product,
-                                rpay_type="DEFAULT",
-                                lend_rate_type="DEFAULT",
-                                lend_rate_min=lend_rate_avg,
-                                lend_rate_max=lend_rate_avg,
-                                lend_rate_avg=lend_rate_avg,
-                            )
-
-            except FinancialProduct.DoesNotExist:
-                logger.warning(
-                    f"Product with ID {fin_prdt_cd} not found for mortgage loan option"
+        with transaction.atomic():
+            for page_id in staged:
+                data = StagedProductPage.objects.values_list("payload", flat=True).get(
+                    id=page_id
                 )
-                continue
+                result = ingest_payload(product_type, data, changes)
+                report["pages"] += 1
+                for phase, seconds in result["timings"].items():
+                    report["timings"][phase] = (
+                        report["timings"].get(phase, 0.0) + seconds
+                    )
 
-        return True
-    except requests.exceptions.Timeout:
-        logger.error("Mortgage Loan API request timed out")
-        return False
-    except requests.exceptions.ConnectionError:
-        logger.error("Mortgage Loan API connection error - server may be unreachable")
-        return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Mortgage Loan API request error: {str(e)}")
-        return False
+            delete_start = time.time()
+            ingestor.delete_stale(changes)
+            report["timings"]["delete"] = time.time() - delete_start
+        report["success"] = True
+    except PageDownloadFailed:
+        return report
     except Exception as e:
-        logger.exception(f"Error fetching mortgage loan products: {str(e)}")
-        return False
+        logger.exception(f"Error fetching {ingestor.label.lower()} products: {str(e)}")
+        return report
+    finally:
+        StagedProductPage.objects.filter(run=run).delete()
 
+    report["rows"] = changes.counts()
+    for receiver, response in products_refreshed.send_robust(
+        sender=ingestor, change_set=changes
+    ):
+        if isinstance(response, Exception):
+            logger.error(f"products_refreshed receiver {receiver} failed: {response}")
+    return report
 
-def fetch_rent_house_loan_products():
+
+def ingest_product_type(product_type):
     """
-    Fetch rent house loan product data from the financial API
+    Fetch and ingest every page of one product type from the financial API
     """
-    url = f"http://finlife.fss.or.kr/finlifeapi/rentHouseLoanProductsSearch.json"
-    params = {
-        "auth": API_KEY,
-        "topFinGrpNo": "050000",  # Rent house loan products category
-        "pageNo": 1,
-    }
+    return write_product_type(product_type, stream_product_pages(product_type))
 
-    try:
-        session = create_session_with_retry()
-        response = session.get(url, params=params, timeout=10)
 
-        # Check HTTP status code first
-        if response.status_code != 200:
-            logger.error(
-                f"Rent House Loan API HTTP Error: Status Code {response.status_code}"
-            )
-            return False
+def fetch_deposit_products():
+    """
+    Fetch deposit product data from the financial API
+    """
+    return ingest_product_type("deposit")["success"]
 
-        # Try to parse JSON
-        try:
-            data = response.json()
-        except ValueError:
-            logger.error("Rent House Loan API Error: Invalid JSON response")
-            return False
-
-        # Check for result key in response
-        if "result" not in data:
-            logger.error(
-                f"Rent House Loan API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
-            )
-            return False
-
-        # Process base product list
-        base_list = data["result"].get("baseList", [])
-        for item in base_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping rent house loan product with no product code")
-                continue
-
-            # Create or update FinancialProduct
-            product, created = FinancialProduct.objects.update_or_create(
-                fin_prdt_cd=fin_prdt_cd,
-                defaults={
-                    "kor_co_nm": item.get("kor_co_nm", ""),
-                    "fin_prdt_nm": item.get("fin_prdt_nm", ""),
-                    "join_way": item.get("join_way", ""),
-                    "loan_type": "전세자금대출",
-                    "join_member": item.get("join_member", ""),
-                },
-            )
 
-            # Create or update LoanProduct
-            LoanProduct.objects.update_or_create(
-                product=product,
-                defaults={
-                    "fin_co_no": item.get("fin_co_no", ""),
-                    "dcls_month": item.get("dcls_month", ""),
-                    "loan_inci_expn": item.get("loan_inci_expn", ""),
-                    "erly_rpay_fee": item.get("erly_rpay_fee", ""),
-                    "dly_rate": item.get("dly_rate", ""),
-                    "loan_lmt": item.get("loan_lmt", ""),
-                },
-            )
+def fetch_saving_products():
+    """
+    Fetch saving product data from the financial API
+    """
+    return ingest_product_type("saving")["success"]
 
-            # Create or update join ways
-            join_ways = item.get("join_way", "").split(",")
-            for join_way in join_ways:
-                if join_way.strip():
-                    LoanProduct_JoinWay.objects.get_or_create(
-                        product=product, join_way=join_way.strip()
-                    )
 
-        # Process option list
-        option_list = data["result"].get("optionList", [])
-        for item in option_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            # Skip if no product code is provided
-            if not fin_prdt_cd:
-                logger.warning("Skipping rent house loan option with no product code")
-                continue
-
-            # Convert numeric fields to float with proper error handling
-            lend_rate_min = 0.0
-            lend_rate_max = 0.0
-            lend_rate_avg = None
-
-            if item.get("lend_rate_min") is not None:
-                try:
-                    lend_rate_min = float(item.get("lend_rate_min"))
-                except (ValueError, TypeError):
-                    lend_rate_min = 0.0
-
-            if item.get("lend_rate_max") is not None:
-                try:
-                    lend_rate_max = float(item.get("lend_rate_max"))
-                except (ValueError, TypeError):
-                    lend_rate_max = 0.0
-
-            if item.get("lend_rate_avg") is not None:
-                try:
-                    lend_rate_avg = float(item.get("lend_rate_avg"))
-                except (ValueError, TypeError):
-                    lend_rate_avg = None
-
-            try:
-                # Find the product with the matching product code
-                product = FinancialProduct.objects.get(fin_prdt_cd=fin_prdt_cd)
-
-                # Get repayment and lending rate types from the option
-                rpay_type = item.get(
-                    "rpay_type", "S"
-                )  # Default to "S" for 만기일시상환방식
-                lend_rate_type = item.get(
-                    "lend_rate_type", "F"
-                )  # Default to "F" for 고정금리
-
-                # Create or update LendingRateOption
-                LendingRateOption.objects.update_or_create(
-                    product=product,
-                    rpay_type=rpay_type,
-                    lend_rate_type=lend_rate_type,
-                    defaults={
-                        "lend_rate_min": lend_rate_min,
-                        "lend_rate_max": lend_rate_max,
-                        "lend_rate_avg": lend_rate_avg,
-                    },
-                )
-            except FinancialProduct.DoesNotExist:
-                logger.warning(
-                    f"Product with ID {fin_prdt_cd} not found for rent house loan option"
-                )
-                continue
+def fetch_mortgage_loan_products():
+    """
+    Fetch mortgage loan product data from the financial API
+    """
+    return ingest_product_type("mortgage")["success"]
 
-        return True
-    except requests.exceptions.Timeout:
-        logger.error("Rent House Loan API request timed out")
-        return False
-    except requests.exceptions.ConnectionError:
-        logger.error("Rent House Loan API connection error - server may be unreachable")
-        return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Rent House Loan API request error: {str(e)}")
-        return False
-    except Exception as e:
-        logger.exception(f"Error fetching rent house loan products: {str(e)}")
-        return False
+
+def fetch_rent_house_loan_products():
+    """
+    Fetch rent house loan product data from the financial API
+    """
+    return ingest_product_type("rent")["success"]
 
 
 def fetch_credit_loan_products():
     """
     Fetch credit loan product data from the financial API
     """
-    url = f"http://finlife.fss.or.kr/finlifeapi/creditLoanProductsSearch.json"
-    params = {
-        "auth": API_KEY,
-        "topFinGrpNo": "050000",  # Credit loan products category
-        "pageNo": 1,
-    }
+    return ingest_product_type("credit")["success"]
 
-    try:
-        session = create_session_with_retry()
-        response = session.get(url, params=params, timeout=10)
 
-        # Check HTTP status code first
-        if response.status_code != 200:
-            logger.error(
-                f"Credit Loan API HTTP Error: Status Code {response.status_code}"
-            )
-            return False
+def count_products(product_type):
+    """
+    Count stored rows for a product type, as reported after a refresh
+    """
+    if product_type == "deposit":
+        return DepositProduct.objects.count()
+    if product_type == "saving":
+        return SavingProduct.objects.count()
+    if product_type == "mortgage":
+        return MortgageLoanOption.objects.count()
+    if product_type == "rent":
+        return LendingRateOption.objects.filter(
+            product__loan_type="전세자금대출"
+        ).count()
+    if product_type == "credit":
+        return CreditLoanOption.objects.count()
+    return 0
+
+
+def _produce_pages(product_type, page_queue):
+    for page in stream_product_pages(product_type):
+        page_queue.put(page)
+    page_queue.put(None)
+
+
+def _drain_pages(page_queue):
+    while True:
+        page = page_queue.get()
+        if page is None:
+            return
+        yield page
+
+
+def iter_product_reports(product_types, parallel=False):
+    """
+    Yield (product_type, report) for each requested type in a fixed order
 
-        # Try to parse JSON
-        try:
-            data = response.json()
-        except ValueError:
-            logger.error("Credit Loan API Error: Invalid JSON response")
-            return False
-
-        # Check for result key in response
-        if "result" not in data:
-            logger.error(
-                f"Credit Loan API Error: Missing 'result' key in response - {data.get('error', 'Unknown error')}"
-            )
-            return False
-
-        # Process base product list
-        base_list = data["result"].get("baseList", [])
-        for item in base_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            if not fin_prdt_cd:
-                logger.warning("Skipping credit loan product with no product code")
-                continue
-
-            # Create or update FinancialProduct
-            product, created = FinancialProduct.objects.update_or_create(
-                fin_prdt_cd=fin_prdt_cd,
-                defaults={
-                    "kor_co_nm": item.get("kor_co_nm", ""),
-                    "fin_prdt_nm": item.get("fin_prdt_nm", ""),
-                    "join_way": item.get("join_way", ""),
-                    "loan_type": "신용대출",
-                    "join_member": item.get("join_member", ""),
-                },
-            )
+    In parallel mode every endpoint is downloaded concurrently in a thread
+    pool, while ingestion stays on the calling thread so that database
+    writes are serialized. Each endpoint buffers at most FINLIFE_PAGE_BUFFER
+    pages ahead of the writer.
+    """
+    ordered_types = [t for t in FINLIFE_ENDPOINTS if t in product_types]
 
-            # Create or update LoanProduct
-            LoanProduct.objects.update_or_create(
-                product=product,
-                defaults={
-                    "fin_co_no": item.get("fin_co_no", ""),
-                    "dcls_month": item.get("dcls_month", ""),
-                    "loan_inci_expn": "",  # Credit loan API doesn't provide these values
-                    "erly_rpay_fee": "",
-                    "dly_rate": "",
-                    "loan_lmt": "",
-                },
-            )
+    if not parallel:
+        for product_type in ordered_types:
+            yield product_type, ingest_product_type(product_type)
+        return
 
-            # Create or update join ways
-            join_ways = item.get("join_way", "").split(",")
-            for join_way in join_ways:
-                if join_way.strip():
-                    LoanProduct_JoinWay.objects.get_or_create(
-                        product=product, join_way=join_way.strip()
-                    )
+    page_queues = {
+        product_type: queue.Queue(maxsize=FINLIFE_PAGE_BUFFER)
+        for product_type in ordered_types
+    }
+    with ThreadPoolExecutor(max_workers=max(len(ordered_types), 1)) as executor:
+        for product_type in ordered_types:
+            executor.submit(_produce_pages, product_type, page_queues[product_type])
 
-        # Process option list
-        option_list = data["result"].get("optionList", [])
-        for item in option_list:
-            fin_prdt_cd = item.get("fin_prdt_cd")
-
-            # Skip if no product code is provided
-            if not fin_prdt_cd:
-                logger.warning("Skipping credit loan option with no product code")
-                continue
-
-            # Safe conversion of credit grade values to float
-            credit_fields = [
-                "crdt_grad_1",
-                "crdt_grad_4",
-                "crdt_grad_5",
-                "crdt_grad_6",
-                "crdt_grad_10",
-                "crdt_grad_11",
-                "crdt_grad_12",
-                "crdt_grad_13",
-                "crdt_grad_avg",
-            ]
-
-            credit_data = {}
-            for field in credit_fields:
-                value = item.get(field)
-                if value is not None:
-                    try:
-                        credit_data[field] = float(value)
-                    except (ValueError, TypeError):
-                        credit_data[field] = None
-                else:
-                    credit_data[field] = None
-
-            try:
-                # Find the product with the matching product code
-                product = FinancialProduct.objects.get(fin_prdt_cd=fin_prdt_cd)
-
-                # Get credit product type and lending rate type from the option
-                crdt_prdt_type = item.get(
-                    "crdt_prdt_type", "1"
-                )  # Default to "1" for 일반신용대출
-                crdt_lend_rate_type = item.get(
-                    "crdt_lend_rate_type", "A"
-                )  # Default to "A" for 대출금리
-
-                # Create or update CreditLoanOption
-                CreditLoanOption.objects.update_or_create(
-                    product=product,
-                    crdt_prdt_type=crdt_prdt_type,
-                    crdt_lend_rate_type=crdt_lend_rate_type,
-                    defaults={
-                        "crdt_grad_1": credit_data.get("crdt_grad_1"),
-                        "crdt_grad_4": credit_data.get("crdt_grad_4"),
-                        "crdt_grad_5": credit_data.get("crdt_grad_5"),
-                        "crdt_grad_6": credit_data.get("crdt_grad_6"),
-                        "crdt_grad_10": credit_data.get("crdt_grad_10"),
-                        "crdt_grad_11": credit_data.get("crdt_grad_11"),
-                        "crdt_grad_12": credit_data.get("crdt_grad_12"),
-                        "crdt_grad_13": credit_data.get("crdt_grad_13"),
-                        "crdt_grad_avg": credit_data.get("crdt_grad_avg"),
-                    },
-                )
-            except FinancialProduct.DoesNotExist:
-                logger.warning(
-                    f"Product with ID {fin_prdt_cd} not found for credit loan option"
-                )
-                continue
+        for product_type in ordered_types:
+            pages = _drain_pages(page_queues[product_type])
+            report = write_product_type(product_type, pages)
+            # Let the producer finish if ingestion stopped early
+            for _ in pages:
+                pass
+            yield product_type, report
 
-        return True
-    except requests.exceptions.Timeout:
-        logger.error("Credit Loan API request timed out")
-        return False
-    except requests.exceptions.ConnectionError:
-        logger.error("Credit Loan API connection error - server may be unreachable")
-        return False
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Credit Loan API request error: {str(e)}")
-        return False
-    except Exception as e:
-        logger.exception(f"Error fetching credit loan products: {str(e)}")
-        return False
 
-
-def fetch_products_by_type(product_types=None):
+def fetch_products_by_type(product_types=None, parallel=False):
     """
     Fetch financial products by type
     product_types: list of product types to fetch. If None, fetch all types.
     Valid types: 'deposit', 'saving', 'mortgage', 'credit', 'rent'
+    parallel: download all endpoints concurrently before writing
     """
     from django.utils import timezone
 
@@ -828,99 +403,40 @@ def fetch_products_by_type(product_types=None):
 
     results = {}
     start_time = time.time()
-
-    # Process deposit products
-    if "deposit" in product_types:
-        deposit_start = time.time()
-        deposit_success = fetch_deposit_products()
-        deposit_time = time.time() - deposit_start
-        deposit_count = DepositProduct.objects.count() if deposit_success else 0
-        results["deposit_products"] = {
-            "success": deposit_success,
-            "count": deposit_count,
-            "time_taken": f"{deposit_time:.2f} seconds",
+    summed_latency = 0.0
+
+    for product_type, report in iter_product_reports(product_types, parallel):
+        type_time = sum(report["timings"].values())
+        summed_latency += type_time
+        results[RESULT_KEYS[product_type]] = {
+            "success": report["success"],
+            "count": count_products(product_type) if report["success"] else 0,
+            "time_taken": f"{type_time:.2f} seconds",
+            "pages": report["pages"],
+            "phases": {
+                phase: f"{seconds:.3f} seconds"
+                for phase, seconds in report["timings"].items()
+            },
+            "rows": report["rows"],
+            "changed_products": len(report["changes"].changed_products),
             "timestamp": timezone.now().isoformat(),
         }
 
-    # Process saving products
-    if "saving" in product_types:
-        saving_start = time.time()
-        saving_success = fetch_saving_products()
-        saving_time = time.time() - saving_start
-        saving_count = SavingProduct.objects.count() if saving_success else 0
-        results["saving_products"] = {
-            "success": saving_success,
-            "count": saving_count,
-            "time_taken": f"{saving_time:.2f} seconds",
-            "timestamp": timezone.now().isoformat(),
-        }
-
-    # Process mortgage loan products
-    if "mortgage" in product_types:
-        mortgage_start = time.time()
-        mortgage_success = fetch_mortgage_loan_products()
-        mortgage_time = time.time() - mortgage_start
-        mortgage_count = MortgageLoanOption.objects.count() if mortgage_success else 0
-        results["mortgage_loans"] = {
-            "success": mortgage_success,
-            "count": mortgage_count,
-            "time_taken": f"{mortgage_time:.2f} seconds",
-            "timestamp": timezone.now().isoformat(),
-        }
-
-    # Process rent house loan products
-    if "rent" in product_types:
-        rent_start = time.time()
-        rent_success = fetch_rent_house_loan_products()
-        rent_time = time.time() - rent_start
-        rent_count = (
-            LendingRateOption.objects.filter(product__loan_type="전세자금대출").count()
-            if rent_success
-            else 0
-        )
-        results["rent_loans"] = {
-            "success": rent_success,
-            "count": rent_count,
-            "time_taken": f"{rent_time:.2f} seconds",
-            "timestamp": timezone.now().isoformat(),
-        }
-
-    # Process credit loan products
-    if "credit" in product_types:
-        credit_start = time.time()
-        credit_success = fetch_credit_loan_products()
-        credit_time = time.time() - credit_start
-        credit_count = CreditLoanOption.objects.count() if credit_success else 0
-        results["credit_loans"] = {
-            "success": credit_success,
-            "count": credit_count,
-            "time_taken": f"{credit_time:.2f} seconds",
-            "timestamp": timezone.now().isoformat(),
-        }
+    # Publish fresh leaderboards and statistics once every requested type is written
+    if any(results[key]["success"] for key in results):
+        try:
+            rebuild_leaderboards()
+        except Exception as e:
+            logger.exception(f"Error rebuilding rate leaderboards: {str(e)}")
+        try:
+            materialize_statistics()
+        except Exception as e:
+            logger.exception(f"Error materializing product statistics: {str(e)}")
 
     # Calculate success status
-    success_results = []
-    product_counts = 0
-
-    if "deposit" in product_types:
-        success_results.append(results["deposit_products"]["success"])
-        product_counts += results["deposit_products"]["count"]
-
-    if "saving" in product_types:
-        success_results.append(results["saving_products"]["success"])
-        product_counts += results["saving_products"]["count"]
-
-    if "mortgage" in product_types:
-        success_results.append(results["mortgage_loans"]["success"])
-        product_counts += results["mortgage_loans"]["count"]
-
-    if "rent" in product_types:
-        success_results.append(results["rent_loans"]["success"])
-        product_counts += results["rent_loans"]["count"]
-
-    if "credit" in product_types:
-        success_results.append(results["credit_loans"]["success"])
-        product_counts += results["credit_loans"]["count"]
+    type_results = [results[key] for key in RESULT_KEYS.values() if key in results]
+    success_results = [result["success"] for result in type_results]
+    product_counts = sum(result["count"] for result in type_results)
 
     # Add overall summary
     total_time = time.time() - start_time
@@ -930,14 +446,17 @@ def fetch_products_by_type(product_types=None):
         "total_updated": product_counts,
         "timestamp": timezone.now().isoformat(),
         "types_updated": product_types,
+        "parallel": parallel,
+        "summed_latency": f"{summed_latency:.2f} seconds",
+        "speedup": round(summed_latency / total_time, 2) if total_time else None,
     }
 
     return results
 
 
-def update_all_financial_products():
+def update_all_financial_products(parallel=False):
     """
     Update all financial products from APIs
     Returns detailed results including success status, counts, and timestamps
     """
-    return fetch_products_by_type()
+    return fetch_products_by_type(parallel=parallel)
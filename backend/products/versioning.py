@@ -0,0 +1,114 @@
+"""
+Versions of the in-memory product indexes, shared by every process
+
+Each process builds its own leaderboards, search indexes and rate tables
+and tags them with the version they were built from. The versions live in
+the database rather than Django's cache, which is local to each process
+unless a shared backend is configured, so a refresh or admin edit made by
+one process (or a management command) is seen by every web worker.
+
+Each process keeps the row it read in Django's cache for INDEX_VERSION_TTL
+seconds, so a warm request does not touch the database and another
+process's change shows up within that delay.
+"""
+
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from .models import IndexVersion
+
+# Seconds a process reuses a published version before reading it again
+VERSION_TTL = getattr(settings, "INDEX_VERSION_TTL", 2)
+
+
+def published_key(key):
+    return f"products:index-version:{key}"
+
+
+def read_published(key):
+    """
+    Read the published row of an index and keep it in this process
+    """
+    fields = ("version", "previous", "changed_products")
+    published = IndexVersion.objects.filter(key=key).values_list(*fields).first()
+    if published is not None:
+        cache.set(published_key(key), published, VERSION_TTL)
+    return published
+
+
+def get_published(key):
+    """
+    (version, previous version, product codes changed since the previous
+    version or None when unknown) of an index, publishing a first version
+    when none exists
+    """
+    published = cache.get(published_key(key))
+    if published is None:
+        published = read_published(key)
+    if published is None:
+        IndexVersion.objects.get_or_create(
+            key=key, defaults={"version": time.time_ns()}
+        )
+        published = read_published(key)
+    return published
+
+
+def get_version(key):
+    """
+    Published version of an index
+    """
+    return get_published(key)[0]
+
+
+def bump_version(key, version=None, changed=None):
+    """
+    Publish a new version so that every process rebuilds its copy
+    changed lists the product codes changed since the previous version,
+    when the caller knows them
+    """
+    version = version or time.time_ns()
+    # A single UPDATE, so that concurrent bumps each record the version
+    # they replaced
+    updated = IndexVersion.objects.filter(key=key).update(
+        version=version, previous=F("version"), changed_products=changed
+    )
+    if not updated:
+        _, created = IndexVersion.objects.get_or_create(
+            key=key, defaults={"version": version, "changed_products": changed}
+        )
+        if not created:
+            return bump_version(key, version, changed)
+    # This process sees its own change at once
+    read_published(key)
+    return version
+
+
+class VersionedIndex:
+    """
+    In-memory object of this process, built by builder(version) and built
+    again whenever the version published under version_key moves
+    """
+
+    def __init__(self, version_key, builder):
+        self.version_key = version_key
+        self.builder = builder
+        self.current = (None, None)  # (version, built object), replaced as a whole
+        self.lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.version_key)
+        built_version, built = self.current
+        if built_version != version:
+            with self.lock:
+                if self.current[0] != version:
+                    self.current = (version, self.builder(version))
+                built = self.current[1]
+        return built
+
+    def invalidate(self):
+        """
+        Move the version so that every process rebuilds its copy
+        """
+        bump_version(self.version_key)
@@ -1,7 +1,15 @@
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from rest_framework import viewsets, mixins, status
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import (
+    api_view,
+    permission_classes,
+    renderer_classes,
+    action,
+)
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from django.http import StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.conf import settings
 
@@ -20,6 +28,7 @@ from .models import (
     UserProduct,
     MortgageLoanOption,
     CreditLoanOption,
+    AIRecommendationJob,
 )
 from .serializers import (
     FinancialProductSerializer,
@@ -30,10 +39,63 @@ from .serializers import (
     SavingProductDetailSerializer,
     LoanProductDetailSerializer,
     UserProductSerializer,
+    TermRateSerializer,
+    flat_serializer,
+)
+from .queries import (
+    DEPOSIT_CATEGORY,
+    SAVING_CATEGORY,
+    term_rate_queryset,
+    best_rate_per_product,
+    top_deposits,
+    top_savings,
+    top_term_rates,
+    top_rate_loans,
+    lowest_rate_loans,
+    loan_queryset,
+    LOAN_DETAIL_RELATIONS,
+)
+from .leaderboards import leaderboard_response
+from .pagination import (
+    KeysetPage,
+    InvalidCursor,
+    MAX_PAGE_SIZE,
+    encode_cursor,
+    decode_cursor,
+    approximate_total,
+    read_path,
+)
+from .search import search_products
+from .autocomplete import suggest
+from .statistics import latest_statistics
+from .calculator import TAX_RATES, add_maturity_amounts, get_maturity_table
+from .repayment import MAX_TERM, simulate_repayments
+from .credit_grades import GRADE_FIELDS, get_credit_grade_index
+from .recommender import profile_term, recommend_products
+from .history import (
+    DEFAULT_SERIES_POINTS,
+    MAX_SERIES_POINTS,
+    MONTH_FORMAT,
+    downsample,
+    rate_series,
 )
 from django.db.models import OuterRef, Subquery, FloatField, F, Q, Avg, Count, Max, Min
 from django.db.models.functions import Round
-from .ai_services import get_ai_product_recommendations
+from .ai_services import (
+    get_ai_product_recommendations,
+    stream_ai_product_recommendations,
+)
+from .ai_cache import (
+    bucket_amount,
+    cached_recommendation,
+    recommendation_cache,
+    recommendation_key,
+)
+from .ai_prompts import PROMPT_TOKEN_BUDGET, call_metrics
+from .ai_jobs import enqueue_recommendation, resume_stalled_job
+from .streaming import EventStreamRenderer, sse_event
+from . import market_data
+from .market_data import MarketDataError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -64,7 +126,62 @@ class FinancialProductViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class DepositProductViewSet(viewsets.ReadOnlyModelViewSet):
+class FlatListMixin:
+    """
+    Serve the list action from .values() rows through flat_serializer
+
+    Set flat_list = False on a view to go back to the nested serializers.
+    """
+
+    flat_list = True
+
+    def list(self, request, *args, **kwargs):
+        if not self.flat_list:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = flat_serializer(self.get_serializer_class())
+        return Response(serializer.serialize(queryset))
+
+
+class TermRateListMixin:
+    """
+    Answer term-filtered lists from the TermRate table
+
+    The detail models only hold one headline option per product, so when a
+    term is requested the list is served from TermRate, which keeps every
+    term option, returning the best row of each product.
+    """
+
+    term_rate_category = None
+
+    def get_term(self):
+        term = self.request.query_params.get(
+            "term", self.request.query_params.get("save_trm")
+        )
+        try:
+            return int(term) if term else None
+        except ValueError:
+            return None
+
+    def uses_term_rates(self):
+        return self.action == "list" and self.get_term() is not None
+
+    def get_queryset(self):
+        if self.uses_term_rates():
+            return term_rate_queryset(self.term_rate_category, self.get_term())
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        if not self.uses_term_rates():
+            return super().list(request, *args, **kwargs)
+        rows = best_rate_per_product(self.filter_queryset(self.get_queryset()))
+        serializer = self.get_serializer(rows, many=True)
+        return Response(serializer.data)
+
+
+class DepositProductViewSet(
+    TermRateListMixin, FlatListMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = (
         DepositProduct.objects.all().select_related("product").order_by("-intr_rate2")
     )  # Default order by highest interest rate
@@ -72,10 +189,13 @@ class DepositProductViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["product__fin_prdt_nm", "product__kor_co_nm"]
     ordering_fields = ["intr_rate", "intr_rate2", "save_trm", "product__kor_co_nm"]
     permission_classes = [AllowAny]
+    term_rate_category = DEPOSIT_CATEGORY
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return DepositProductDetailSerializer
+        if self.uses_term_rates():
+            return TermRateSerializer
         return DepositProductSerializer
 
     def get_queryset(self):
@@ -107,7 +227,9 @@ class DepositProductViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
-class SavingProductViewSet(viewsets.ReadOnlyModelViewSet):
+class SavingProductViewSet(
+    TermRateListMixin, FlatListMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = (
         SavingProduct.objects.all().select_related("product").order_by("-intr_rate2")
     )  # Default order by highest interest rate
@@ -121,10 +243,13 @@ class SavingProductViewSet(viewsets.ReadOnlyModelViewSet):
         "rsrv_type",
     ]
     permission_classes = [AllowAny]
+    term_rate_category = SAVING_CATEGORY
 
     def get_serializer_class(self):
         if self.action == "retrieve":
             return SavingProductDetailSerializer
+        if self.uses_term_rates():
+            return TermRateSerializer
         return SavingProductSerializer
 
     def get_queryset(self):
@@ -166,11 +291,7 @@ class SavingProductViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class LoanProductViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = (
-        LoanProduct.objects.all()
-        .select_related("product")
-        .prefetch_related("product__mortgage_options", "product__credit_options")
-    )
+    queryset = loan_queryset()
     filterset_fields = ["dcls_month"]  # We can filter by disclosure month
     search_fields = ["product__fin_prdt_nm", "product__kor_co_nm", "product__loan_type"]
     ordering_fields = ["product__kor_co_nm", "product__fin_prdt_nm"]
@@ -269,9 +390,8 @@ def get_user_favorites(request):
             "product__loan_product",
         )
         .prefetch_related(
-            "product__mortgage_options",
-            "product__credit_options",
             "product__requirement_options",
+            *LOAN_DETAIL_RELATIONS,
         )
     )
     serializer = UserProductSerializer(favorites, many=True)
@@ -283,124 +403,55 @@ def get_user_favorites(request):
 def get_product_recommendations(request):
     """
     Get personalized product recommendations for a user
+    Optional ?term= (months) favors deposits and savings close to that term,
+    by default the term suited to the user's salary and money
     """
-    # Get user favorites for context
-    user_favorites = UserProduct.objects.filter(user=request.user).select_related(
-        "product"
-    )
-
-    # If user has no favorites yet, return top rated products
-    if not user_favorites.exists():
-        # Get top deposit and saving products
-        top_deposits = DepositProduct.objects.all().order_by("-intr_rate2")[:3]
-        top_savings = SavingProduct.objects.all().order_by("-intr_rate2")[
-            :3
-        ]  # Get lowest rate loans
-        lowest_loans = (
-            LoanProduct.objects.all()
-            .select_related("product")
-            .prefetch_related("product__mortgage_options", "product__credit_options")[
-                :3
-            ]
+    try:
+        term = int(request.GET["term"]) if request.GET.get("term") else None
+    except ValueError:
+        return Response(
+            {"detail": "term은 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST
         )
+    if term is None:
+        term = profile_term(request.user.salary, request.user.money)
 
-        deposit_serializer = DepositProductSerializer(top_deposits, many=True)
-        saving_serializer = SavingProductSerializer(top_savings, many=True)
-        loan_serializer = LoanProductDetailSerializer(lowest_loans, many=True)
+    # Favorite institutions and the kinds of the favorite products, in one query
+    favorites = UserProduct.objects.filter(user=request.user).values_list(
+        "product__kor_co_nm",
+        "product__deposit_product",
+        "product__saving_product",
+        "product__loan_product",
+    )
+    favorite_institutions = set()
+    kinds = set()
+    for institution, deposit, saving, loan in favorites:
+        favorite_institutions.add(institution)
+        for kind, detail in [
+            ("deposits", deposit),
+            ("savings", saving),
+            ("loans", loan),
+        ]:
+            if detail is not None:
+                kinds.add(kind)
 
+    # If user has no favorites yet, return top rated products
+    if not favorite_institutions:
         return Response(
             {
                 "message": "추천 상품입니다. 관심 상품을 추가하면 더 정확한 추천을 받을 수 있습니다.",
-                "recommendations": {
-                    "deposits": deposit_serializer.data,
-                    "savings": saving_serializer.data,
-                    "loans": loan_serializer.data,
-                },
+                "recommendations": recommend_products(
+                    set(), ["deposits", "savings", "loans"], term
+                ),
             }
         )
 
-    # Get favorite institutions
-    favorite_institutions = set()
-    for favorite in user_favorites:
-        favorite_institutions.add(favorite.product.kor_co_nm)
-
-    # Get product types user is interested in
-    interested_in_deposits = UserProduct.objects.filter(
-        user=request.user, product__deposit_product__isnull=False
-    ).exists()
-
-    interested_in_savings = UserProduct.objects.filter(
-        user=request.user, product__saving_product__isnull=False
-    ).exists()
-
-    interested_in_loans = UserProduct.objects.filter(
-        user=request.user, product__loan_product__isnull=False
-    ).exists()
-
-    recommendations = {}
-
-    # Recommend products from favorite institutions and by interest
-    if interested_in_deposits:
-        # Find best deposit products from favorite institutions
-        deposits_from_favorites = DepositProduct.objects.filter(
-            product__kor_co_nm__in=favorite_institutions
-        ).order_by("-intr_rate2")[:3]
-
-        # Also find some high-rate deposits they might not have seen
-        other_deposits = DepositProduct.objects.exclude(
-            product__kor_co_nm__in=favorite_institutions
-        ).order_by("-intr_rate2")[:2]
-
-        # Combine the results
-        recommended_deposits = list(deposits_from_favorites) + list(other_deposits)
-        deposit_serializer = DepositProductSerializer(recommended_deposits, many=True)
-        recommendations["deposits"] = deposit_serializer.data
-
-    if interested_in_savings:
-        # Find best saving products from favorite institutions
-        savings_from_favorites = SavingProduct.objects.filter(
-            product__kor_co_nm__in=favorite_institutions
-        ).order_by("-intr_rate2")[:3]
-
-        # Also find some high-rate savings they might not have seen
-        other_savings = SavingProduct.objects.exclude(
-            product__kor_co_nm__in=favorite_institutions
-        ).order_by("-intr_rate2")[
-            :2
-        ]  # Combine the results
-        recommended_savings = list(savings_from_favorites) + list(other_savings)
-        saving_serializer = SavingProductSerializer(recommended_savings, many=True)
-        recommendations["savings"] = saving_serializer.data
-
-    if interested_in_loans:
-        # Find best loan options from favorite institutions
-        loans_from_favorites = (
-            LoanProduct.objects.filter(product__kor_co_nm__in=favorite_institutions)
-            .select_related("product")
-            .prefetch_related("product__mortgage_options", "product__credit_options")[
-                :3
-            ]
-        )
-
-        # Also suggest some other good options
-        other_loans = (
-            LoanProduct.objects.exclude(product__kor_co_nm__in=favorite_institutions)
-            .select_related("product")
-            .prefetch_related("product__mortgage_options", "product__credit_options")[
-                :2
-            ]
-        )
-
-        # Combine the results
-        recommended_loans = list(loans_from_favorites) + list(other_loans)
-        loan_serializer = LoanProductDetailSerializer(recommended_loans, many=True)
-        recommendations["loans"] = loan_serializer.data
-
     return Response(
         {
             "message": f"{request.user.username}님의 관심 금융 상품 기반 맞춤 추천입니다.",
-            "favorite_institutions": list(favorite_institutions),
-            "recommendations": recommendations,
+            "favorite_institutions": sorted(favorite_institutions),
+            "recommendations": recommend_products(
+                favorite_institutions, sorted(kinds), term
+            ),
         }
     )
 
@@ -413,91 +464,81 @@ def get_top_rate_products(request, product_type):
     # Get query parameters
     limit = int(request.GET.get("limit", 5))
 
-    if product_type == "deposit":
-        # For deposit products, order by highest max_rate
-        products = DepositProduct.objects.select_related("product").order_by(
-            "-intr_rate2"
-        )[:limit]
-        serializer = DepositProductSerializer(products, many=True)
-    elif product_type == "saving":
-        # For saving products, order by highest max_rate
-        products = SavingProduct.objects.select_related("product").order_by(
-            "-intr_rate2"
-        )[:limit]
-        serializer = SavingProductSerializer(products, many=True)
-    elif product_type == "loan":
-        # For loan products, we need to consider options.
-        # This is a simplified approach: fetch loans and their first mortgage option, order by min rate.
-        # A more robust solution might involve aggregating min rates from all options.        # Fetch distinct loan product IDs that have mortgage options, ordered by the minimum lending rate
-        mortgage_options_subquery = (
-            MortgageLoanOption.objects.filter(product_id=OuterRef("product_id"))
-            .order_by("lend_rate_min")
-            .values("lend_rate_min")[:1]
+    # Optional term in months, ranked from the per-term rate table
+    try:
+        term = int(request.GET["term"]) if request.GET.get("term") else None
+    except ValueError:
+        return Response(
+            {"detail": "term은 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST
         )
 
-        credit_options_subquery = (
-            CreditLoanOption.objects.filter(product_id=OuterRef("product_id"))
-            .order_by("crdt_grad_1")
-            .values("crdt_grad_1")[:1]
-        )  # Changed to use crdt_grad_1
-
-        # Annotate LoanProduct with the minimum rate from its options
-        # We'll prioritize mortgage loans, then credit loans if no mortgage options exist or if their rates are not comparable
-        # This example prioritizes mortgage loan rates.
-        # Attempt to get the minimum mortgage loan rate
-        try:
-            loans_with_min_mortgage_rate = (
-                LoanProduct.objects.annotate(
-                    min_rate=Subquery(
-                        mortgage_options_subquery, output_field=FloatField()
-                    )
-                )
-                .filter(min_rate__isnull=False)
-                .select_related("product")
-                .prefetch_related(
-                    "product__mortgage_options", "product__credit_options"
-                )
-                .order_by("min_rate")[:limit]
-            )
-
-            if not loans_with_min_mortgage_rate.exists():
-                # If no mortgage loans with rates, try credit loans
-                loans_with_min_credit_rate = (
-                    LoanProduct.objects.annotate(
-                        min_rate=Subquery(
-                            credit_options_subquery, output_field=FloatField()
-                        )
-                    )
-                    .filter(min_rate__isnull=False)
-                    .select_related("product")
-                    .prefetch_related(
-                        "product__mortgage_options", "product__credit_options"
-                    )
-                    .order_by("min_rate")[:limit]
-                )
-                products = loans_with_min_credit_rate
-            else:
-                products = loans_with_min_mortgage_rate
-        except Exception as e:
-            # Fallback if there's an error with the rate-based sorting
-            products = (
-                LoanProduct.objects.all()
-                .select_related("product")
-                .prefetch_related(
-                    "product__mortgage_options", "product__credit_options"
-                )
-                .order_by("product__kor_co_nm")[:limit]
+    # Credit loans are ranked by the rate of one credit grade
+    if product_type == "credit":
+        grade = request.GET.get("grade", "1")
+        if grade not in GRADE_FIELDS:
+            return Response(
+                {"detail": f"grade는 {', '.join(GRADE_FIELDS)} 중 하나여야 합니다."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        return Response(get_credit_grade_index().best(grade, limit))
 
-        serializer = LoanProductDetailSerializer(products, many=True)
+    if product_type in ["deposit", "saving"] and term is not None:
+        board = f"{product_type}:{term}"
+    elif product_type in ["deposit", "saving", "loan"]:
+        board = product_type
     else:
         return Response(
             {"detail": "Invalid product type"}, status=status.HTTP_400_BAD_REQUEST
         )
 
+    response = leaderboard_response(board, limit)
+    if response is not None:
+        return response
+
+    if product_type in ["deposit", "saving"] and term is not None:
+        category = DEPOSIT_CATEGORY if product_type == "deposit" else SAVING_CATEGORY
+        products = top_term_rates(category, term, limit)
+        serializer = TermRateSerializer(products, many=True)
+    elif product_type == "deposit":
+        # For deposit products, order by highest max_rate
+        serializer = DepositProductSerializer(top_deposits(limit), many=True)
+    elif product_type == "saving":
+        # For saving products, order by highest max_rate
+        serializer = SavingProductSerializer(top_savings(limit), many=True)
+    else:
+        try:
+            products = top_rate_loans(limit)
+        except Exception as e:
+            # Fallback if there's an error with the rate-based sorting
+            products = loan_queryset().order_by("product__kor_co_nm")[:limit]
+        serializer = LoanProductDetailSerializer(products, many=True)
+
     return Response(serializer.data)
 
 
+@api_view(["GET"])
+def credit_grade_leaderboard(request):
+    """
+    Credit loans with the lowest loan rate for each credit grade
+    With ?grade= only that grade's ranking is returned
+    """
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), 100))
+    except ValueError:
+        limit = 10
+    grade = request.GET.get("grade")
+    if grade is not None and grade not in GRADE_FIELDS:
+        return Response(
+            {"detail": f"grade는 {', '.join(GRADE_FIELDS)} 중 하나여야 합니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    index = get_credit_grade_index()
+    if grade is not None:
+        return Response({"grades": {grade: index.best(grade, limit)}})
+    return Response({"grades": index.leaderboard(limit)})
+
+
 # Advanced queries
 @api_view(["GET"])
 def top_interest_rate_products(request, product_type):
@@ -507,23 +548,7 @@ def top_interest_rate_products(request, product_type):
     """
     limit = int(request.GET.get("limit", 10))
 
-    if product_type == "deposit":
-        products = (
-            DepositProduct.objects.all()
-            .select_related("product")
-            .order_by("-intr_rate2")[:limit]
-        )
-        serializer = DepositProductSerializer(products, many=True)
-        return Response(serializer.data)
-    elif product_type == "saving":
-        products = (
-            SavingProduct.objects.all()
-            .select_related("product")
-            .order_by("-intr_rate2")[:limit]
-        )
-        serializer = SavingProductSerializer(products, many=True)
-        return Response(serializer.data)
-    else:
+    if product_type not in ["deposit", "saving"]:
         return Response(
             {
                 "detail": "유효하지 않은 상품 유형입니다. deposit 또는 saving을 사용하세요."
@@ -531,6 +556,16 @@ def top_interest_rate_products(request, product_type):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+    response = leaderboard_response(product_type, limit)
+    if response is not None:
+        return response
+
+    if product_type == "deposit":
+        serializer = DepositProductSerializer(top_deposits(limit), many=True)
+    else:
+        serializer = SavingProductSerializer(top_savings(limit), many=True)
+    return Response(serializer.data)
+
 
 @api_view(["GET"])
 def lowest_rate_loan_products(request):
@@ -539,444 +574,343 @@ def lowest_rate_loan_products(request):
     """
     limit = int(request.GET.get("limit", 10))
 
-    # Get loan products related to mortgage options with lowest min rates
-    from django.db.models import Min
-    from .models import MortgageLoanOption
-
-    mortgage_loans = (
-        MortgageLoanOption.objects.values("product")
-        .annotate(min_rate=Min("lend_rate_min"))
-        .order_by("min_rate")[:limit]
-    )
-    product_ids = [item["product"] for item in mortgage_loans]
-    products = (
-        LoanProduct.objects.filter(product__fin_prdt_cd__in=product_ids)
-        .select_related("product")
-        .prefetch_related("product__mortgage_options", "product__credit_options")
-    )
+    response = leaderboard_response("lowest-loan", limit)
+    if response is not None:
+        return response
 
-    serializer = LoanProductDetailSerializer(products, many=True)
+    serializer = LoanProductDetailSerializer(lowest_rate_loans(limit), many=True)
     return Response(serializer.data)
 
 
-@api_view(["GET"])
-def search_financial_products(request):
+def filter_term_rates(category, term, min_rate=None, max_rate=None, institution=None):
     """
-    Search across all financial product types
+    Best TermRate row of each product offering the term
     """
-    query = request.GET.get("q", "")
-    if not query:
-        return Response(
-            {"detail": "검색어를 입력해주세요."}, status=status.HTTP_400_BAD_REQUEST
-        )  # Search in FinancialProduct model
-    financial_products = FinancialProduct.objects.filter(
-        fin_prdt_nm__icontains=query
-    ) | FinancialProduct.objects.filter(kor_co_nm__icontains=query)
-
-    # Get all the IDs that match
-    product_ids = financial_products.values_list("fin_prdt_cd", flat=True)
-
-    # Find matching deposit products
-    deposits = DepositProduct.objects.filter(
-        product__fin_prdt_cd__in=product_ids
-    ).select_related("product")
-    savings = SavingProduct.objects.filter(
-        product__fin_prdt_cd__in=product_ids
-    ).select_related("product")
-    loans = (
-        LoanProduct.objects.filter(product__fin_prdt_cd__in=product_ids)
-        .select_related("product")
-        .prefetch_related("product__mortgage_options", "product__credit_options")
-    )
+    rows = term_rate_queryset(category, term)
+    if min_rate:
+        rows = rows.filter(intr_rate2__gte=float(min_rate))
+    if max_rate:
+        rows = rows.filter(intr_rate2__lte=float(max_rate))
+    if institution:
+        rows = rows.filter(product__kor_co_nm__icontains=institution)
+    return best_rate_per_product(rows)
+
+
+# sort_by -> (lookup, path in the serialized row) of deposit and saving lists
+DETAIL_SORT_KEYS = {
+    "rate": ("intr_rate2", ["intr_rate2"]),
+    "term": ("save_trm", ["save_trm"]),
+    "institution": ("product__kor_co_nm", ["financial_product", "kor_co_nm"]),
+}
+DETAIL_TIE = ("product_id", ["product"])
+
+LOAN_SORT_KEYS = {
+    "institution": ("product__kor_co_nm", ["product_info", "kor_co_nm"]),
+}
+LOAN_TIE = ("product_id", ["product_info", "fin_prdt_cd"])
+
+
+def paginated_product_lists(request, lists, descending):
+    """
+    Read one keyset page of each list
 
-    # Serialize the results
-    deposit_serializer = DepositProductSerializer(deposits, many=True)
-    saving_serializer = SavingProductSerializer(savings, many=True)
-    loan_serializer = LoanProductDetailSerializer(loans, many=True)
-    # Return combined results
-    return Response(
-        {
-            "deposits": deposit_serializer.data,
-            "savings": saving_serializer.data,
-            "loans": loan_serializer.data,
+    lists maps a result name to (rows, serialize, sort key, tie), rows being a
+    queryset or a list of instances and serialize turning a page of rows
+    into data. Returns the response body with results and pagination.
+    """
+    try:
+        page_size = max(1, min(int(request.GET.get("page_size", 10)), MAX_PAGE_SIZE))
+    except ValueError:
+        page_size = 10
+    positions = decode_cursor(request.GET.get("cursor"))
+
+    results = {}
+    next_positions = {}
+    for name, (rows, serialize, sort_key, tie) in lists.items():
+        if name in positions and positions[name] is None:
+            # This list was exhausted on a previous page
+            results[name], next_positions[name] = [], None
+            continue
+        (key, key_path), (tie_lookup, tie_path) = sort_key, tie
+        page = KeysetPage(key, tie_lookup, descending, page_size, positions.get(name))
+        if isinstance(rows, list):
+            # Rows in memory carry their own position, only the page is serialized
+            page_rows, next_positions[name] = page.trim_rows(page.filter_list(rows))
+            results[name] = serialize(page_rows)
+        else:
+            results[name], next_positions[name] = page.trim(
+                serialize(page.filter_queryset(rows)), key_path, tie_path
+            )
+
+    has_more = {name: position is not None for name, position in next_positions.items()}
+    pagination = {
+        "page_size": page_size,
+        "next_cursor": (
+            encode_cursor(next_positions) if any(has_more.values()) else None
+        ),
+        "has_more": has_more,
+    }
+
+    # Opt-in, cached per filter so that pages do not count the whole list
+    if request.GET.get("include_total") in ["1", "true"]:
+        params = {key: value for key, value in request.GET.items() if key != "cursor"}
+        pagination["approximate_total"] = {
+            name: approximate_total(rows, dict(params, list=name))
+            for name, (rows, serialize, sort_key, tie) in lists.items()
         }
-    )
+
+    return {"results": results, "pagination": pagination}
+
+
+def serialize_deposits(rows):
+    return flat_serializer(DepositProductSerializer).serialize(rows)
+
+
+def serialize_savings(rows):
+    return flat_serializer(SavingProductSerializer).serialize(rows)
+
+
+def serialize_term_rates(rows):
+    return TermRateSerializer(rows, many=True).data
+
+
+def serialize_loans(rows):
+    return LoanProductDetailSerializer(rows, many=True).data
+
+
+class SearchMatch:
+    """
+    Product code and relevance of a search match, paged before any row is read
+    """
+
+    def __init__(self, product_id, score):
+        self.product_id = product_id
+        self.score = score
+
+
+def serialize_matches(queryset, serialize, tie_path):
+    """
+    Serializer of a page of SearchMatch rows keeping their ranking order
+    """
+
+    def serialize_page(matches):
+        order = {match.product_id: rank for rank, match in enumerate(matches)}
+        data = serialize(queryset.filter(product_id__in=list(order)))
+        return sorted(data, key=lambda row: order[read_path(row, tie_path)])
+
+    return serialize_page
+
+
+@api_view(["GET"])
+def autocomplete_products(request):
+    """
+    Product and institution names starting with the typed text
+    Only ids and labels are returned, the full rows come from search
+    """
+    query = request.GET.get("q", "")
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 10)), 50))
+    except ValueError:
+        limit = 10
+    return Response({"query": query, "suggestions": suggest(query, limit)})
 
 
 @api_view(["GET"])
 def filter_products(request):
     """
     Filter products by various criteria
+    Results are paginated with the cursor returned in pagination.next_cursor
     """
     # Get filter parameters
     product_type = request.GET.get("type", "all")  # deposit, saving, loan, all
     min_rate = request.GET.get("min_rate")
     max_rate = request.GET.get("max_rate")
     institution = request.GET.get("institution")
-    term = request.GET.get("term")  # Savings/deposit term in months
+    try:
+        # Savings/deposit term in months
+        term = int(request.GET["term"]) if request.GET.get("term") else None
+    except ValueError:
+        return Response(
+            {"detail": "term은 숫자여야 합니다."}, status=status.HTTP_400_BAD_REQUEST
+        )
     sort_by = request.GET.get("sort_by", "rate")  # rate, term, institution
     sort_order = request.GET.get("sort_order", "desc")  # asc, desc
+    sort_key = DETAIL_SORT_KEYS.get(sort_by, DETAIL_SORT_KEYS["rate"])
 
     # Build query based on product type
-    if product_type == "deposit" or product_type == "all":
-        deposits = DepositProduct.objects.all().select_related("product")
-
-        # Apply filters
-        if min_rate:
-            deposits = deposits.filter(intr_rate2__gte=float(min_rate))
-        if max_rate:
-            deposits = deposits.filter(intr_rate2__lte=float(max_rate))
-        if institution:
-            deposits = deposits.filter(product__kor_co_nm__icontains=institution)
-        if term:
-            deposits = deposits.filter(save_trm=int(term))
-
-        # Apply sorting
-        if sort_by == "rate":
-            sort_field = "-intr_rate2" if sort_order == "desc" else "intr_rate2"
-            deposits = deposits.order_by(sort_field)
-        elif sort_by == "term":
-            sort_field = "-save_trm" if sort_order == "desc" else "save_trm"
-            deposits = deposits.order_by(sort_field)
-        elif sort_by == "institution":
-            sort_field = (
-                "-product__kor_co_nm" if sort_order == "desc" else "product__kor_co_nm"
-            )
-            deposits = deposits.order_by(sort_field)
-    else:
-        deposits = DepositProduct.objects.none()
-
-    if product_type == "saving" or product_type == "all":
-        savings = SavingProduct.objects.all().select_related("product")
-
-        # Apply filters
-        if min_rate:
-            savings = savings.filter(intr_rate2__gte=float(min_rate))
-        if max_rate:
-            savings = savings.filter(intr_rate2__lte=float(max_rate))
-        if institution:
-            savings = savings.filter(product__kor_co_nm__icontains=institution)
-        if term:
-            savings = savings.filter(save_trm=int(term))
-
-        # Apply sorting
-        if sort_by == "rate":
-            sort_field = "-intr_rate2" if sort_order == "desc" else "intr_rate2"
-            savings = savings.order_by(sort_field)
-        elif sort_by == "term":
-            sort_field = "-save_trm" if sort_order == "desc" else "save_trm"
-            savings = savings.order_by(sort_field)
-        elif sort_by == "institution":
-            sort_field = (
-                "-product__kor_co_nm" if sort_order == "desc" else "product__kor_co_nm"
-            )
-            savings = savings.order_by(sort_field)
-    else:
-        savings = SavingProduct.objects.none()
+    lists = {}
+    for name, model, category, serialize in [
+        ("deposits", DepositProduct, DEPOSIT_CATEGORY, serialize_deposits),
+        ("savings", SavingProduct, SAVING_CATEGORY, serialize_savings),
+    ]:
+        if product_type not in [name[:-1], "all"]:
+            lists[name] = (model.objects.none(), serialize, sort_key, DETAIL_TIE)
+        elif term is not None:
+            # Every term option is kept in TermRate, the detail rows only
+            # hold the headline option of each product. One row is kept per
+            # product, so the product code stays a unique tie for the keyset
+            rows = filter_term_rates(category, term, min_rate, max_rate, institution)
+            lists[name] = (rows, serialize_term_rates, sort_key, DETAIL_TIE)
+        else:
+            rows = model.objects.all()
+            if min_rate:
+                rows = rows.filter(intr_rate2__gte=float(min_rate))
+            if max_rate:
+                rows = rows.filter(intr_rate2__lte=float(max_rate))
+            if institution:
+                rows = rows.filter(product__kor_co_nm__icontains=institution)
+            lists[name] = (rows, serialize, sort_key, DETAIL_TIE)
 
     if product_type == "loan" or product_type == "all":
-        loans = (
-            LoanProduct.objects.all()
-            .select_related("product")
-            .prefetch_related("product__mortgage_options", "product__credit_options")
-        )
+        loans = loan_queryset()
 
         # Apply filters
         if institution:
             loans = loans.filter(product__kor_co_nm__icontains=institution)
-
-        # Apply sorting for loans
-        if sort_by == "institution":
-            sort_field = (
-                "-product__kor_co_nm" if sort_order == "desc" else "product__kor_co_nm"
-            )
-            loans = loans.order_by(sort_field)
     else:
         loans = LoanProduct.objects.none()
-
-    # Paginate results
-    page = int(request.GET.get("page", 1))
-    page_size = int(request.GET.get("page_size", 10))
-    start_idx = (page - 1) * page_size
-    end_idx = page * page_size  # Serialize
-    deposit_serializer = DepositProductSerializer(
-        deposits[start_idx:end_idx], many=True
-    )
-    saving_serializer = SavingProductSerializer(savings[start_idx:end_idx], many=True)
-    loan_serializer = LoanProductDetailSerializer(loans[start_idx:end_idx], many=True)
-
-    # Count total results for pagination
-    total_count = {
-        "deposits": deposits.count() if product_type in ["deposit", "all"] else 0,
-        "savings": savings.count() if product_type in ["saving", "all"] else 0,
-        "loans": loans.count() if product_type in ["loan", "all"] else 0,
-    }
-
-    return Response(
-        {
-            "results": {
-                "deposits": deposit_serializer.data,
-                "savings": saving_serializer.data,
-                "loans": loan_serializer.data,
-            },
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total_count": total_count,
-                "total_pages": {
-                    "deposits": (total_count["deposits"] + page_size - 1) // page_size,
-                    "savings": (total_count["savings"] + page_size - 1) // page_size,
-                    "loans": (total_count["loans"] + page_size - 1) // page_size,
-                },
-            },
-        }
+    # Loans have no single rate, they are listed by institution or code
+    lists["loans"] = (
+        loans,
+        serialize_loans,
+        LOAN_SORT_KEYS.get(sort_by, LOAN_TIE),
+        LOAN_TIE,
     )
 
-
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def get_gold_and_silver_prices(request):
-    import requests
-    from datetime import datetime, timedelta
-
-    today = datetime.now().strftime("%Y-%m-%d")
-    previous_day = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
-    type = request.GET.get("type", "AG")
-
-    response = requests.get(
-        "https://prod-api.exgold.co.kr/api/v1/main/chart/period/price/domestic",
-        params={"type": type, "from": previous_day, "to": today},
-    )
-    if response.status_code != 200:
-        return Response(
-            {"detail": "금/은 시세 데이터를 가져오는 데 실패했습니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
-    data = response.json()
-    if not data or "data" not in data:
+    try:
+        body = paginated_product_lists(request, lists, sort_order == "desc")
+    except InvalidCursor:
         return Response(
-            {"detail": "유효하지 않은 금/은 시세 데이터입니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {"detail": "잘못된 cursor 값입니다."}, status=status.HTTP_400_BAD_REQUEST
         )
-    return Response(data, status=status.HTTP_200_OK)
+    return Response(body)
 
 
 @api_view(["GET"])
-@permission_classes([AllowAny])
-def get_exchange_rate(request):
-    import requests
-    from datetime import datetime, timedelta, timezone
-
-    now = datetime.now()
-    if now.weekday() >= 5 or now.hour < 11:
-        day = now
-        while True:
-            day -= timedelta(days=1)
-            if day.weekday() < 5:
-                break
-        day = day.strftime("%Y%m%d")
-    else:
-        day = now.strftime("%Y%m%d")
-
-    response = requests.get(
-        "https://www.koreaexim.go.kr/site/program/financial/exchangeJSON",
-        params={
-            "authkey": settings.EXCHANGE_RATE_API,
-            "searchdate": day,
-            "data": "AP01",
-        },
-        verify=False,
-    )
-
-    if response.status_code != 200:
+def search_financial_products(request):
+    """
+    Search across all financial product types
+    """
+    query = request.GET.get("q", "")
+    if not query:
         return Response(
-            {"detail": "환율 데이터를 가져오는 데 실패했습니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {"detail": "검색어를 입력해주세요."}, status=status.HTTP_400_BAD_REQUEST
+        )  # Search in FinancialProduct model
+    # Ranked matches from the search index
+    scores = dict(search_products(query))
+
+    # Split the matches by product type, best match first
+    lists = {}
+    for name, model, queryset, serialize, tie_path in [
+        (
+            "deposits",
+            DepositProduct,
+            DepositProduct.objects.all(),
+            serialize_deposits,
+            ["product"],
+        ),
+        (
+            "savings",
+            SavingProduct,
+            SavingProduct.objects.all(),
+            serialize_savings,
+            ["product"],
+        ),
+        ("loans", LoanProduct, loan_queryset(), serialize_loans, LOAN_TIE[1]),
+    ]:
+        codes = model.objects.filter(product_id__in=list(scores)).values_list(
+            "product_id", flat=True
         )
-    data = response.json()
-    if not data:
-        return Response(
-            {"detail": "유효하지 않은 환율 데이터입니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        matches = [SearchMatch(code, scores[code]) for code in codes]
+        lists[name] = (
+            matches,
+            serialize_matches(queryset, serialize, tie_path),
+            ("score", ["score"]),
+            ("product_id", ["product_id"]),
         )
-    return Response(data, status=status.HTTP_200_OK)
-
-
-@api_view(["GET"])
-@permission_classes([AllowAny])
-def get_kospi_data(request):
-    import requests
-    import ast
-    from datetime import datetime, timedelta
-
-    now = datetime.now()
-
-    previous_day = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-    response = requests.get(
-        "https://m.stock.naver.com/front-api/external/chart/domestic/info",
-        params={
-            "symbol": "KOSPI",
-            "requestType": 1,
-            "startTime": previous_day,
-            "endTime": now.strftime("%Y%m%d"),
-            "timeframe": "day",
-        },
-        headers={"User-Agent": "Mozilla/5.0"},
-    )
 
-    if response.status_code != 200:
-        return Response(
-            {"detail": "주식 시장 데이터를 가져오는 데 실패했습니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
     try:
-        parsed_data = ast.literal_eval(response.text.strip())
-    except Exception as e:
+        body = paginated_product_lists(request, lists, descending=True)
+    except InvalidCursor:
         return Response(
-            {"detail": f"데이터 파싱 실패: {str(e)}"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {"detail": "잘못된 cursor 값입니다."}, status=status.HTTP_400_BAD_REQUEST
         )
+    # Return combined results
+    return Response(dict(body["results"], pagination=body["pagination"]))
+
 
-    if len(parsed_data) <= 1:
+def market_data_response(read, *args):
+    """
+    Response of a market data gateway read, its failure detail with a 500
+    """
+    try:
+        return Response(read(*args), status=status.HTTP_200_OK)
+    except MarketDataError as e:
         return Response(
-            {"detail": "유효하지 않은 주식 시장 데이터입니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            {"detail": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    COLUMN_MAP = {
-        "날짜": "date",
-        "시가": "open",
-        "고가": "high",
-        "저가": "low",
-        "종가": "close",
-        "거래량": "volume",
-        "외국인소진율": "foreign_rate",
-    }
-
-    columns = parsed_data[0]
-    columns = [COLUMN_MAP.get(col, col) for col in columns]
-    rows = parsed_data[1:]
-    json_ready = [dict(zip(columns, row)) for row in rows]
-
-    return Response(json_ready, status=status.HTTP_200_OK)
-
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
-def get_kosdaq_data(request):
-    import requests
-    import ast
-    from datetime import datetime, timedelta
-
-    now = datetime.now()
-
-    previous_day = (datetime.now() - timedelta(days=30)).strftime("%Y%m%d")
-    response = requests.get(
-        "https://m.stock.naver.com/front-api/external/chart/domestic/info",
-        params={
-            "symbol": "KOSDAQ",
-            "requestType": 1,
-            "startTime": previous_day,
-            "endTime": now.strftime("%Y%m%d"),
-            "timeframe": "day",
-        },
-        headers={"User-Agent": "Mozilla/5.0"},
+def get_gold_and_silver_prices(request):
+    return market_data_response(
+        market_data.gold_and_silver_prices, request.GET.get("type", "AG")
     )
 
-    if response.status_code != 200:
-        return Response(
-            {"detail": "주식 시장 데이터를 가져오는 데 실패했습니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
-    try:
-        parsed_data = ast.literal_eval(response.text.strip())
-    except Exception as e:
-        return Response(
-            {"detail": f"데이터 파싱 실패: {str(e)}"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
 
-    if len(parsed_data) <= 1:
-        return Response(
-            {"detail": "유효하지 않은 주식 시장 데이터입니다."},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        )
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_exchange_rate(request):
+    return market_data_response(market_data.exchange_rates)
 
-    COLUMN_MAP = {
-        "날짜": "date",
-        "시가": "open",
-        "고가": "high",
-        "저가": "low",
-        "종가": "close",
-        "거래량": "volume",
-        "외국인소진율": "foreign_rate",
-    }
 
-    columns = parsed_data[0]
-    columns = [COLUMN_MAP.get(col, col) for col in columns]
-    rows = parsed_data[1:]
-    json_ready = [dict(zip(columns, row)) for row in rows]
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_kospi_data(request):
+    return market_data_response(market_data.index_daily_bars, "KOSPI")
 
-    return Response(json_ready, status=status.HTTP_200_OK)
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+def get_kosdaq_data(request):
+    return market_data_response(market_data.index_daily_bars, "KOSDAQ")
 
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_stock_rankings(request):
-    import requests
-
-    response = requests.post(
-        "https://wts-cert-api.tossinvest.com/api/v2/dashboard/wts/overview/ranking",
-        headers={
-            "Content-Type": "application/json",
-            "X-Xss-Protection": "1; mode=block",
-            "User-Agent": "Mozilla/5.0",
-            "Authorization": "Bearer YOUR_TOKEN",
-        },
-        json={
-            "id": "biggest_total_amount",
-            "filters": [
-                "MARKET_CAP_GREATER_THAN_50M",
-                "STOCKS_PRICE_GREATER_THAN_ONE_DOLLAR",
-                "KRX_MANAGEMENT_STOCK",
-            ],
-            "duration": "realtime",
-            "tag": "all",
-        },
-    )
-
-    if response.status_code == 200:
-        return Response(response.json(), status=status.HTTP_200_OK)
-    return Response(
-        {"detail": "주식 순위 데이터를 가져오는 데 실패했습니다."},
-        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-    )
+    return market_data_response(market_data.stock_rankings)
 
 
 @api_view(["GET"])
 @permission_classes([AllowAny])
 def get_stock_details(request, stock_code):
-    import requests
+    return market_data_response(market_data.stock_details, stock_code)
 
-    API_URL = f"https://wts-info-api.tossinvest.com/api/v1/c-chart/kr-s/{stock_code}/day:1?count=100&useAdjustedRate=true"
 
-    if stock_code.startswith("U"):
-        API_URL = f"https://wts-info-api.tossinvest.com/api/v1/c-chart/us-s/{stock_code}/day:1?count=100&useAdjustedRate=true"
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def get_market_data_metrics(request):
+    """
+    Cache hits, misses, errors and fetch latency per market data source
+    (admin only)
+    """
+    return Response(market_data.metrics.summary())
 
-    response = requests.get(
-        API_URL,
-        headers={
-            "Content-Type": "application/json",
-            "X-Xss-Protection": "1; mode=block",
-            "User-Agent": "Mozilla/5.0",
-        },
-    )
 
-    if response.status_code == 200:
-        return Response(response.json(), status=status.HTTP_200_OK)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def get_ai_metrics(request):
+    """
+    Prompt size and latency of the latest AI recommendation calls (admin only)
+    """
     return Response(
-        {"detail": "주식 상세 정보를 가져오는 데 실패했습니다."},
-        status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        {
+            "prompt_token_budget": PROMPT_TOKEN_BUDGET,
+            "cached_answers": len(recommendation_cache),
+            **call_metrics.summary(),
+        }
     )
 
 
@@ -997,7 +931,7 @@ def batch_update_products(request):
     """
     Batch update specific types of financial products (admin only)
     Request body should contain a list of product types to update:
-    { "types": ["deposit", "saving", "mortgage", "credit"] }
+    { "types": ["deposit", "saving", "mortgage", "credit"], "parallel": true }
     """
     from .utils import fetch_products_by_type
 
@@ -1021,8 +955,9 @@ def batch_update_products(request):
     if not product_types:
         product_types = valid_types
 
-    # Fetch the products
-    results = fetch_products_by_type(product_types)
+    # Fetch the products, optionally downloading all endpoints concurrently
+    parallel = bool(request.data.get("parallel", False))
+    results = fetch_products_by_type(product_types, parallel=parallel)
     return Response(results)
 
 
@@ -1110,91 +1045,163 @@ def update_credit_loan_products(request):
 
 
 @api_view(["GET"])
-def get_product_statistics(request):
+def rank_maturity_payouts(request):
     """
-    Get statistics about available financial products
+    Rank every deposit and saving term option by after-tax payout
+    principal applies to deposits, installment (monthly) to savings; an
+    authenticated user's money is the default principal
     """
-    from django.db.models import Avg, Count, Max, Min
-    from django.db.models.functions import Round
-
-    # Count products by type
-    total_products = FinancialProduct.objects.count()
-    deposit_count = DepositProduct.objects.count()
-    saving_count = SavingProduct.objects.count()
-    loan_count = LoanProduct.objects.count()
-    mortgage_options_count = MortgageLoanOption.objects.count()
-    credit_options_count = CreditLoanOption.objects.count()
-
-    # Get financial institutions counts
-    financial_institutions = (
-        FinancialProduct.objects.values("kor_co_nm")
-        .annotate(product_count=Count("fin_prdt_cd"))
-        .order_by("-product_count")
-    )
+    user = request.user
+    default_principal = getattr(user, "money", 0) or 0
+    try:
+        principal = int(request.GET.get("principal", default_principal))
+        installment = int(request.GET.get("installment", 0))
+        term = request.GET.get("term")
+        term = int(term) if term else None
+        limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+    except ValueError:
+        return Response(
+            {"detail": "금액, 기간과 개수는 숫자여야 합니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if principal < 0 or installment < 0 or (principal == 0 and installment == 0):
+        return Response(
+            {"detail": "예치금(principal) 또는 월 납입액(installment)을 입력해주세요."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
 
-    # Get average interest rates for deposit products
-    deposit_rates = DepositProduct.objects.aggregate(
-        avg_rate=Round(Avg("intr_rate"), 2),
-        avg_max_rate=Round(Avg("intr_rate2"), 2),
-        min_rate=Min("intr_rate"),
-        max_rate=Max("intr_rate2"),
-    )
+    tax = request.GET.get("tax", "normal")
+    if tax not in TAX_RATES:
+        return Response(
+            {"detail": f"tax는 {', '.join(TAX_RATES)} 중 하나여야 합니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    use_max_rate = request.GET.get("rate", "max") != "base"
+    product_type = request.GET.get("type", "all")
 
-    # Get average interest rates for saving products
-    saving_rates = SavingProduct.objects.aggregate(
-        avg_rate=Round(Avg("intr_rate"), 2),
-        avg_max_rate=Round(Avg("intr_rate2"), 2),
-        min_rate=Min("intr_rate"),
-        max_rate=Max("intr_rate2"),
+    table = get_maturity_table()
+    options = dict(
+        term=term, use_max_rate=use_max_rate, tax_rate=TAX_RATES[tax], limit=limit
     )
+    body = {
+        "principal": principal,
+        "installment": installment,
+        "term": term,
+        "tax": tax,
+        "rate": "max" if use_max_rate else "base",
+    }
+    if product_type in ["deposit", "all"] and principal:
+        body["deposits"] = table.rank(principal=principal, saving=False, **options)
+    if product_type in ["saving", "all"] and installment:
+        body["savings"] = table.rank(installment=installment, saving=True, **options)
+    return Response(body)
 
-    # Get loan statistics
-    mortgage_rates = MortgageLoanOption.objects.aggregate(
-        avg_min_rate=Round(Avg("lend_rate_min"), 2),
-        avg_max_rate=Round(Avg("lend_rate_max"), 2),
-        min_rate=Min("lend_rate_min"),
-        max_rate=Max("lend_rate_max"),
-    )
 
-    credit_rates = CreditLoanOption.objects.aggregate(
-        avg_min_rate=Round(Avg("crdt_grad_1"), 2),
-        avg_max_rate=Round(Avg("crdt_grad_10"), 2),
-        min_rate=Min("crdt_grad_1"),
-        max_rate=Max("crdt_grad_10"),
+@api_view(["GET"])
+def simulate_loan_repayments(request):
+    """
+    Rank every mortgage and rent loan option by the total interest and the
+    monthly payment of its repayment methods for an amount and a term
+    """
+    try:
+        amount = int(request.GET.get("amount", 0))
+        term = int(request.GET.get("term", 0))
+        limit = max(1, min(int(request.GET.get("limit", 20)), 100))
+    except ValueError:
+        return Response(
+            {"detail": "금액, 기간과 개수는 숫자여야 합니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if amount <= 0 or not 1 <= term <= MAX_TERM:
+        return Response(
+            {
+                "detail": f"대출 금액(amount)과 1~{MAX_TERM}개월의 기간(term)을 입력해주세요."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    use_max_rate = request.GET.get("rate", "min") == "max"
+
+    rankings = simulate_repayments(amount, term, use_max_rate, limit)
+    return Response(
+        {
+            "amount": amount,
+            "term": term,
+            "rate": "max" if use_max_rate else "min",
+            **rankings,
+        }
     )
 
-    # Get top financial institutions by product count (limit to top 5)
-    top_institutions = list(financial_institutions[:5])
 
+@api_view(["GET"])
+def get_rate_history(request, fin_prdt_cd):
+    """
+    Rate history of a product per option, downsampled for charts
+    Each point gives the rates applying from its disclosure month on
+    """
+    start = request.GET.get("from")
+    end = request.GET.get("to")
+    option = request.GET.get("option")
+    for month in (start, end):
+        if month and not MONTH_FORMAT.match(month):
+            return Response(
+                {"detail": "공시월은 YYYYMM 형식이어야 합니다."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+    try:
+        size = max(
+            3,
+            min(
+                int(request.GET.get("points", DEFAULT_SERIES_POINTS)), MAX_SERIES_POINTS
+            ),
+        )
+    except ValueError:
+        size = DEFAULT_SERIES_POINTS
+
+    product = get_object_or_404(FinancialProduct, fin_prdt_cd=fin_prdt_cd)
+    series = rate_series(fin_prdt_cd, start, end, option)
     return Response(
         {
-            "total_products": total_products,
-            "products_by_type": {
-                "deposits": deposit_count,
-                "savings": saving_count,
-                "loans": loan_count,
-                "mortgage_options": mortgage_options_count,
-                "credit_options": credit_options_count,
+            "product": {
+                "fin_prdt_cd": product.fin_prdt_cd,
+                "fin_prdt_nm": product.fin_prdt_nm,
+                "kor_co_nm": product.kor_co_nm,
             },
-            "deposit_rates": deposit_rates,
-            "saving_rates": saving_rates,
-            "mortgage_rates": mortgage_rates,
-            "credit_rates": credit_rates,
-            "top_institutions": top_institutions,
-            "last_updated": (
-                FinancialProduct.objects.latest("dcls_month").dcls_month
-                if total_products > 0
-                else None
-            ),
+            "from": start,
+            "to": end,
+            "series": [
+                {
+                    "option": name,
+                    "total_points": len(points),
+                    "points": downsample(points, size),
+                }
+                for name, points in series.items()
+            ],
         }
     )
 
 
 @api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def get_ai_recommendations_page(request):
+def get_product_statistics(request):
     """
-    Get dedicated AI-powered financial product recommendations based on user profile and preferences
+    Get statistics about available financial products
+    Served from the snapshot materialized after the last refresh
+    """
+    snapshot = latest_statistics()
+    return Response(
+        {
+            **snapshot.data,
+            "snapshot": {
+                "version": snapshot.id,
+                "created_at": snapshot.created_at,
+            },
+        }
+    )
+
+
+def ai_recommendation_inputs(request):
+    """
+    Bucketed salary and money, period, product type and candidate products
+    of an AI recommendation request
     """
     # Get query parameters
     period = request.GET.get("period", "12")  # Default to 12 months
@@ -1210,6 +1217,11 @@ def get_ai_recommendations_page(request):
     user_salary = user.salary if hasattr(user, "salary") and user.salary else 0
     user_money = user.money if hasattr(user, "money") and user.money else 0
 
+    # Similar profiles send the same prompt and share one cached answer, so
+    # the answer carries no user's exact amounts
+    user_salary = bucket_amount(user_salary)
+    user_money = bucket_amount(user_money)
+
     # Prepare product data for AI recommendation
     product_data_list = []
 
@@ -1259,13 +1271,7 @@ def get_ai_recommendations_page(request):
 
     if product_type in ["loan", "all"]:
         # Load loan products
-        loan_products = (
-            LoanProduct.objects.all()
-            .select_related("product")
-            .prefetch_related("product__mortgage_options", "product__credit_options")[
-                :10
-            ]
-        )
+        loan_products = loan_queryset()[:10]
 
         # Format loan products with their options for AI
         for lp in loan_products:
@@ -1311,6 +1317,21 @@ def get_ai_recommendations_page(request):
                 )
                 product_data_list.append(base_loan_data)
 
+    add_maturity_amounts(product_data_list, user_money)
+
+    return user_salary, user_money, period, product_type, product_data_list
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_ai_recommendations_page(request):
+    """
+    Get dedicated AI-powered financial product recommendations based on user profile and preferences
+    """
+    user_salary, user_money, period, product_type, product_data_list = (
+        ai_recommendation_inputs(request)
+    )
+
     # If no products found for AI recommendations
     if not product_data_list:
         return Response(
@@ -1321,10 +1342,16 @@ def get_ai_recommendations_page(request):
             status=status.HTTP_404_NOT_FOUND,
         )
 
-    # Call OpenAI API for recommendations
+    # Call OpenAI API for recommendations, once per distinct prompt
     try:
-        ai_result = get_ai_product_recommendations(
-            user_salary, user_money, period, product_data_list
+        key = recommendation_key(
+            user_salary, user_money, period, product_type, product_data_list
+        )
+        ai_result, served = cached_recommendation(
+            key,
+            lambda: get_ai_product_recommendations(
+                user_salary, user_money, period, product_data_list
+            ),
         )
 
         if ai_result["status"] == "success":
@@ -1340,6 +1367,7 @@ def get_ai_recommendations_page(request):
                     "recommendations": ai_result["recommendations"],
                     "product_count": len(product_data_list),
                     "product_types_analyzed": product_type,
+                    "cache": served,
                 }
             )
         else:
@@ -1366,3 +1394,162 @@ def get_ai_recommendations_page(request):
             },
             status=status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, EventStreamRenderer])
+def stream_ai_recommendations(request):
+    """
+    Stream AI recommendations as server-sent events while they are generated
+
+    Events: "meta" with the user info and product count, a "token" per text
+    piece, then "done"; "error" when generation fails. A cached answer is
+    sent as a single token. When the client disconnects the server closes
+    the stream and the upstream generation stops with it.
+    """
+    user_salary, user_money, period, product_type, product_data_list = (
+        ai_recommendation_inputs(request)
+    )
+
+    if not product_data_list:
+        return Response(
+            {
+                "status": "error",
+                "message": f"No suitable products found for the specified type ({product_type}) and period ({period} months).",
+            },
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    key = recommendation_key(
+        user_salary, user_money, period, product_type, product_data_list
+    )
+    cached = recommendation_cache.get(key)
+
+    def events():
+        yield sse_event(
+            "meta",
+            {
+                "user_info": {
+                    "salary": user_salary,
+                    "money": user_money,
+                    "period": period,
+                },
+                "product_count": len(product_data_list),
+                "product_types_analyzed": product_type,
+                "cache": "hit" if cached is not None else "miss",
+            },
+        )
+        if cached is not None:
+            yield sse_event("token", cached["recommendations"])
+            yield sse_event("done", {"status": "success"})
+            return
+
+        pieces = []
+        tokens = stream_ai_product_recommendations(
+            user_salary, user_money, period, product_data_list
+        )
+        try:
+            for piece in tokens:
+                pieces.append(piece)
+                yield sse_event("token", piece)
+        except GeneratorExit:
+            logger.info(
+                f"Client disconnected from AI recommendation stream {key[:8]} after {len(pieces)} pieces"
+            )
+            raise
+        except Exception as e:
+            logger.error(f"Exception in AI recommendation stream: {str(e)}")
+            yield sse_event(
+                "error",
+                {
+                    "status": "error",
+                    "message": f"Failed to generate recommendations: {str(e)}",
+                },
+            )
+            return
+        finally:
+            tokens.close()
+
+        recommendation_cache.set(
+            key, {"status": "success", "recommendations": "".join(pieces)}
+        )
+        yield sse_event("done", {"status": "success"})
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def serialize_job(job):
+    data = {
+        "job_id": job.id,
+        "status": job.status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status in [AIRecommendationJob.SUCCESS, AIRecommendationJob.ERROR]:
+        data["result"] = job.result
+    return data
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def enqueue_ai_recommendation_job(request):
+    """
+    Start an AI recommendation in the background and return its job id at once
+
+    Takes the same period and type parameters as the AI recommendations page;
+    poll the job for the result.
+    """
+    user_salary, user_money, period, product_type, product_data_list = (
+        ai_recommendation_inputs(request)
+    )
+
+    if not product_data_list:
+        return Response(
+            {
+                "status": "error",
+                "message": f"No suitable products found for the specified type ({product_type}) and period ({period} months).",
+            },
+            status=status.HTTP_404_NOT_FOUND,
+        )
+
+    key = recommendation_key(
+        user_salary, user_money, period, product_type, product_data_list
+    )
+    job = enqueue_recommendation(
+        request.user,
+        key,
+        {
+            "salary": user_salary,
+            "money": user_money,
+            "period": period,
+            "product_type": product_type,
+            "product_data": product_data_list,
+        },
+    )
+    data = serialize_job(job)
+    data["poll_url"] = reverse("ai-recommendation-job", args=[job.id])
+    response = Response(data, status=status.HTTP_202_ACCEPTED)
+    response["Retry-After"] = 2
+    return response
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_ai_recommendation_job(request, job_id):
+    """
+    Status of one of the user's AI recommendation jobs, with its result when
+    finished. A job that stalled, as after a restart, is submitted again.
+    """
+    job = get_object_or_404(AIRecommendationJob, id=job_id, user=request.user)
+    if resume_stalled_job(job):
+        job.refresh_from_db()
+    response = Response(serialize_job(job))
+    if job.status in [AIRecommendationJob.PENDING, AIRecommendationJob.RUNNING]:
+        response["Retry-After"] = 2
+    return response